@@ -0,0 +1,28 @@
+"""compact note transcript index
+
+Revision ID: d5e1a7c93b42
+Revises: c81e5b0d93f7
+Create Date: 2026-10-18 18:12:44.503127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e1a7c93b42'
+down_revision: Union[str, None] = 'c81e5b0d93f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Indexes in the first format carried per-chunk term counts (about twice the transcript's size);
+    # they are rebuilt in the compact format on the note's next chat
+    op.execute("UPDATE notes SET transcript_index = NULL")
+
+
+def downgrade() -> None:
+    # Nothing to restore: indexes are rebuilt on demand
+    pass
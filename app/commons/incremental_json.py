@@ -0,0 +1,86 @@
+# Incremental extraction of a string field from a JSON object that arrives in chunks
+ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+class JsonStringFieldStream:
+    """Decode the value of one top-level string field while the JSON document is still streaming.
+
+    Feed it the raw chunks of a JSON object (e.g. streamed model output) and it
+    returns the newly decoded characters of `field` each time, so they can be
+    forwarded before the document is complete.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.unicode_digits = None
+        self.high_surrogate = None
+        self.expect_key = False
+        self.is_key = False
+        self.key = ""
+        self.last_key = None
+        self.capturing = False
+
+    def feed(self, chunk: str) -> str:
+        output = []
+        for char in chunk:
+            if self.in_string:
+                self._feed_string_char(char, output)
+            elif char == '"':
+                self.in_string = True
+                self.is_key = self.depth == 1 and self.expect_key
+                self.capturing = self.depth == 1 and not self.is_key and self.last_key == self.field
+                self.key = ""
+            elif char in '{[':
+                self.depth += 1
+                self.expect_key = char == '{' and self.depth == 1
+            elif char in '}]':
+                self.depth -= 1
+            elif char == ',' and self.depth == 1:
+                self.expect_key = True
+            elif char == ':' and self.depth == 1:
+                self.expect_key = False
+        return "".join(output)
+
+    def _feed_string_char(self, char: str, output: list):
+        if self.unicode_digits is not None:
+            self.unicode_digits += char
+            if len(self.unicode_digits) == 4:
+                self._emit(self._decode_unicode(int(self.unicode_digits, 16)), output)
+                self.unicode_digits = None
+            return
+
+        if self.escape:
+            self.escape = False
+            if char == 'u':
+                self.unicode_digits = ""
+            else:
+                self._emit(ESCAPES.get(char, char), output)
+            return
+
+        if char == '\\':
+            self.escape = True
+        elif char == '"':
+            self.in_string = False
+            if self.is_key:
+                self.last_key = self.key
+            self.capturing = False
+        else:
+            self._emit(char, output)
+
+    def _decode_unicode(self, code: int) -> str:
+        if 0xD800 <= code <= 0xDBFF:
+            # First half of a surrogate pair, wait for the second one
+            self.high_surrogate = code
+            return ""
+        if 0xDC00 <= code <= 0xDFFF and self.high_surrogate is not None:
+            code = 0x10000 + ((self.high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self.high_surrogate = None
+        return chr(code)
+
+    def _emit(self, text: str, output: list):
+        if self.is_key:
+            self.key += text
+        elif self.capturing:
+            output.append(text)
@@ -0,0 +1,98 @@
+import math
+import re
+from collections import Counter
+from typing import List, Tuple
+
+from app.commons.text_chunking import CHARS_PER_TOKEN, SENTENCE_BOUNDARY
+
+INDEX_VERSION = 2
+
+# Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# CJK scripts are not space separated, so every character is its own term
+TERM_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[^\W_]+')
+
+def tokenize(text: str) -> List[str]:
+    return [term.lower() for term in TERM_PATTERN.findall(text)]
+
+def _sentence_spans(text: str) -> List[Tuple[int, int]]:
+    spans, start = [], 0
+    for boundary in SENTENCE_BOUNDARY.finditer(text):
+        spans.append((start, boundary.start()))
+        start = boundary.end()
+    spans.append((start, len(text)))
+    return [(start, end) for start, end in spans if text[start:end].strip()]
+
+def chunk_spans(text: str, max_tokens: int) -> List[Tuple[int, int]]:
+    """Group sentences into chunks of at most max_tokens (estimated), returned as character offsets into text."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    for start, end in _sentence_spans(text):
+        # Unpunctuated sentences longer than a chunk are cut on characters
+        pieces = [(offset, min(offset + max_chars, end)) for offset in range(start, end, max_chars)]
+        for piece_start, piece_end in pieces:
+            if chunks and piece_end - chunks[-1][0] <= max_chars:
+                chunks[-1] = (chunks[-1][0], piece_end)
+            else:
+                chunks.append((piece_start, piece_end))
+    return chunks
+
+def build_index(text: str, max_tokens: int) -> dict:
+    """Build the stored index of text: its chunks, as character offsets into text.
+
+    That is all that is stored (a few bytes per chunk); the BM25 term statistics are
+    derived from the chunks when the index is searched, see term_stats.
+    """
+    return {
+        "version": INDEX_VERSION,
+        "spans": [list(span) for span in chunk_spans(text or "", max_tokens)],
+    }
+
+def term_stats(index: dict, text: str) -> dict:
+    """Per-chunk term counts and lengths, document frequencies and average chunk length of an index over text."""
+    term_counts = [Counter(tokenize(text[start:end])) for start, end in index["spans"]]
+    lengths = [sum(counts.values()) for counts in term_counts]
+    return {
+        "tf": term_counts,
+        "lengths": lengths,
+        "df": Counter(term for counts in term_counts for term in counts),
+        "avgdl": sum(lengths) / len(lengths) if lengths else 0.0,
+    }
+
+def is_current_index(index: dict) -> bool:
+    return bool(index) and index.get("version") == INDEX_VERSION
+
+def search(index: dict, text: str, query: str, k: int) -> List[Tuple[int, float]]:
+    """Return up to k (chunk position, score) pairs for query, best first. Chunks that share no term with query are skipped."""
+    query_terms = set(tokenize(query))
+    total = len(index["spans"])
+    if not query_terms or not total:
+        return []
+    stats = term_stats(index, text)
+
+    idf = {}
+    for term in query_terms:
+        df = stats["df"].get(term, 0)
+        if df:
+            idf[term] = math.log(1 + (total - df + 0.5) / (df + 0.5))
+
+    avgdl = stats["avgdl"] or 1.0
+    scores = []
+    for position, (counts, length) in enumerate(zip(stats["tf"], stats["lengths"])):
+        score = 0.0
+        for term, weight in idf.items():
+            tf = counts.get(term, 0)
+            if tf:
+                score += weight * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl))
+        if score > 0:
+            scores.append((position, score))
+
+    scores.sort(key=lambda item: item[1], reverse=True)
+    return scores[:k]
+
+def top_chunks(index: dict, text: str, query: str, k: int) -> List[str]:
+    """Return the k chunks of text most relevant to query, in transcript order."""
+    positions = sorted(position for position, _ in search(index, text, query, k))
+    return [text[slice(*index["spans"][position])].strip() for position in positions]
@@ -0,0 +1,71 @@
+import re
+from typing import List
+
+# Rough average for the OpenAI tokenizers, good enough to size prompts
+CHARS_PER_TOKEN = 4
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?。！？])\s+')
+PARAGRAPH_BOUNDARY = re.compile(r'\n\s*\n')
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+def _split_oversized(sentence: str, max_chars: int) -> List[str]:
+    # A single "sentence" longer than a chunk (e.g. unpunctuated ASR output):
+    # cut on whitespace when there is some, otherwise on characters.
+    words = sentence.split()
+    if len(words) <= 1:
+        return [sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars)]
+
+    pieces, current = [], ""
+    for word in words:
+        if len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.extend(word[i:i + max_chars] for i in range(0, len(word), max_chars))
+            continue
+        candidate = f"{current} {word}" if current else word
+        if len(candidate) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Split text into chunks of at most max_tokens (estimated), cutting on sentence boundaries."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current = [], ""
+    for sentence in split_sentences(text):
+        pieces = [sentence] if len(sentence) <= max_chars else _split_oversized(sentence, max_chars)
+        for piece in pieces:
+            candidate = f"{current} {piece}" if current else piece
+            if len(candidate) > max_chars and current:
+                chunks.append(current)
+                current = piece
+            else:
+                current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+def split_paragraph_segments(text: str, max_tokens: int) -> List[str]:
+    """Split text into paragraphs, cutting paragraphs longer than max_tokens on sentence boundaries."""
+    segments = []
+    for paragraph in PARAGRAPH_BOUNDARY.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) > max_tokens:
+            segments.extend(chunk_text(paragraph, max_tokens))
+        else:
+            segments.append(paragraph)
+    return segments
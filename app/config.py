@@ -1,9 +1,122 @@
+from typing import Dict
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     # Redis settings
     REDIS_URL: str = "redis://redis:6380/0"
     
+    # Transcript cache settings (seconds before a cached transcript is evicted)
+    TRANSCRIPT_CACHE_TTL: int = 60 * 60 * 24 * 30
+    
+    # Long transcript summarization (map-reduce) settings
+    SUMMARY_LONG_TRANSCRIPT_TOKENS: int = 12000
+    SUMMARY_CHUNK_TOKENS: int = 4000
+    SUMMARY_MAX_PARALLEL_CHUNKS: int = 4
+    
+    # Transcript translation settings
+    TRANSLATION_SEGMENT_TOKENS: int = 1500
+    TRANSLATION_MAX_PARALLEL_SEGMENTS: int = 4
+    TRANSLATION_MEMORY_TTL: int = 60 * 60 * 24 * 30
+    
+    # Note chat retrieval settings
+    CHAT_INDEX_CHUNK_TOKENS: int = 200
+    CHAT_CONTEXT_CHUNKS: int = 4
+    
+    # Note chat answer cache settings (per-note entries beyond the limit are evicted least recently used first)
+    CHAT_ANSWER_CACHE_TTL: int = 60 * 60 * 24 * 7
+    CHAT_ANSWER_CACHE_MAX_ENTRIES: int = 50
+    
+    # Chat conversation settings (older turns are summarized once the history exceeds the budget)
+    CHAT_HISTORY_TOKENS: int = 1500
+    CHAT_HISTORY_KEEP_MESSAGES: int = 4
+    
+    # LLM gateway settings (deadlines are in seconds and cover every retry of a call)
+    LLM_DEADLINE_SECONDS: float = 120
+    LLM_TRANSCRIPTION_DEADLINE_SECONDS: float = 600
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 10
+    LLM_MAX_RETRIES: int = 4
+    LLM_BACKOFF_BASE_SECONDS: float = 0.5
+    LLM_BACKOFF_MAX_SECONDS: float = 20
+    LLM_MAX_CONNECTIONS: int = 64
+    LLM_MAX_CONCURRENCY_PER_MODEL: int = 16
+    LLM_MODEL_CONCURRENCY: Dict[str, int] = {"whisper-1": 12}
+    
+    # Cluster-wide request/token budgets per minute, keyed by "provider:model" (0 means unlimited)
+    RATE_LIMITS: Dict[str, Dict[str, int]] = {
+        "openai:gpt-4o-mini": {"rpm": 5000, "tpm": 2000000},
+        "openai:whisper-1": {"rpm": 500, "tpm": 0},
+        "replicate:meta/meta-llama-3-8b-instruct": {"rpm": 600, "tpm": 0},
+    }
+    # Completion tokens reserved up front for a call; corrected once its actual usage is known
+    RATE_LIMIT_COMPLETION_TOKENS: int = 1000
+    RATE_LIMIT_MAX_POLL_SECONDS: float = 2
+    
+    # Generation request coalescing settings (seconds)
+    COALESCE_LOCK_TTL: int = 1800
+    COALESCE_RESULT_TTL: int = 300
+    
+    # Transcription routing settings (latency stats are kept for the last N calls per backend)
+    TRANSCRIPTION_STATS_WINDOW: int = 100
+    TRANSCRIPTION_MIN_SAMPLES: int = 5
+    TRANSCRIPTION_MAX_ERROR_RATE: float = 0.5
+    TRANSCRIPTION_HEDGE: bool = True
+    TRANSCRIPTION_HEDGE_MIN_SECONDS: float = 30
+    TRANSCRIPTION_HEDGE_DEFAULT_SECONDS: float = 300
+    TRANSCRIPTION_PROBE_INTERVAL_SECONDS: int = 300
+    
+    # Circuit breaker settings for external endpoints (a circuit opens after N failures within the window)
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_FAILURE_WINDOW_SECONDS: int = 60
+    CIRCUIT_OPEN_SECONDS: int = 30
+    CIRCUIT_PROBE_TTL_SECONDS: int = 1000
+    
+    # Salad transcription request timeouts
+    SALAD_CONNECT_TIMEOUT_SECONDS: float = 10
+    SALAD_READ_TIMEOUT_SECONDS: float = 900
+    
+    # Salad transcription jobs: polling backs off from the expected processing time, a webhook can end it early
+    SALAD_JOB_REALTIME_FACTOR: float = 0.1
+    SALAD_JOB_POLL_MIN_SECONDS: float = 2
+    SALAD_JOB_POLL_MAX_SECONDS: float = 30
+    SALAD_JOB_TIMEOUT_SECONDS: float = 3600
+    SALAD_WEBHOOK_URL: str = ""
+    SALAD_WEBHOOK_SECRET: str = ""
+    
+    # Audio sent to Whisper is downmixed, resampled and compressed to a speech bitrate first
+    AUDIO_PREPROCESS: bool = True
+    AUDIO_PREPROCESS_SAMPLE_RATE: int = 16000
+    AUDIO_PREPROCESS_BITRATE: str = "32k"
+    AUDIO_PREPROCESS_FORMAT: str = "mp3"
+    # Leading/trailing audio quieter than the clip's average loudness minus this many dB is trimmed
+    AUDIO_SILENCE_THRESHOLD_DB: float = 16
+    AUDIO_SILENCE_PADDING_MS: int = 300
+    
+    # Audio read for transcription is kept in memory up to this size, then spills to an anonymous temp file
+    AUDIO_SPOOL_MAX_BYTES: int = 32 * 1024 * 1024
+    
+    # Uploads are streamed to MinIO in multipart parts of this size (at least 5 MiB)
+    MINIO_UPLOAD_PART_SIZE: int = 10 * 1024 * 1024
+    
+    # Resumable uploads: each chunk is one multipart part (all but the last at least 5 MiB)
+    UPLOAD_SESSION_TTL: int = 60 * 60 * 24
+    UPLOAD_MIN_PART_BYTES: int = 5 * 1024 * 1024
+    UPLOAD_MAX_PART_BYTES: int = 64 * 1024 * 1024
+    UPLOAD_MAX_PARTS: int = 10000
+    UPLOAD_CLEANUP_INTERVAL_MINUTES: int = 30
+    
+    # Lifetime of presigned URLs for direct uploads to and playback from MinIO
+    PRESIGNED_UPLOAD_EXPIRY_SECONDS: int = 60 * 60
+    PRESIGNED_DOWNLOAD_EXPIRY_SECONDS: int = 15 * 60
+    
+    # Long audio is split on silence into chunks transcribed in parallel
+    CHUNKED_TRANSCRIPTION_MIN_SECONDS: float = 900
+    CHUNK_MAX_SECONDS: float = 600
+    CHUNK_OVERLAP_MS: int = 1500
+    CHUNK_MIN_SILENCE_MS: int = 500
+    CHUNK_SEAM_MAX_WORDS: int = 12
+    CHUNK_RETRIES: int = 2
+    CHUNKED_TRANSCRIPTION_WORKERS: int = 12
+    
     # App settings
     APP_NAME: str = "GoMemo"
     API_KEY: str = "fmtpla123"
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, ForeignKey, Integer, String, Text, DateTime, Date, Enum, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from sqlalchemy import JSON 
 from sqlalchemy.dialects.postgresql import JSON as PostgresJSON
@@ -54,12 +54,18 @@ class Note(Base):
     translated = Column(Boolean, nullable=True, default=False)
     flashcards = Column(JSON().with_variant(PostgresJSON, 'postgresql'), nullable=True, default=None)
     quizzes = Column(JSON().with_variant(PostgresJSON, 'postgresql'), nullable=True, default=None)
+    # Hash of the summary and language the flashcards/quizzes were generated from
+    flashcards_source_hash = Column(String(64), nullable=True)
+    quizzes_source_hash = Column(String(64), nullable=True)
+    # Transcript chunks for note chat (see lexical_index); deferred, as only chat reads it
+    transcript_index = deferred(Column(JSON().with_variant(PostgresJSON, 'postgresql'), nullable=True, default=None))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     user = relationship("User", back_populates="notes")
     folder = relationship("Folder", back_populates="notes")
     note_metadata = relationship("NoteMetadata", back_populates="note", uselist=False)
+    conversations = relationship("ChatConversation", back_populates="note", cascade="all, delete-orphan")
 
 class NoteMetadata(Base):
     __tablename__ = "note_metadata"
@@ -74,4 +80,29 @@ class NoteMetadata(Base):
 
     note = relationship("Note", back_populates="note_metadata")
     user = relationship("User", back_populates="note_metadata")
-    folder = relationship("Folder", back_populates="note_metadata")
\ No newline at end of file
+    folder = relationship("Folder", back_populates="note_metadata")
+
+class ChatConversation(Base):
+    __tablename__ = "chat_conversations"
+    id = Column(Integer, primary_key=True, index=True)
+    note_id = Column(Integer, ForeignKey("notes.id", ondelete="CASCADE"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    # Running summary of the turns that were compacted out of the prompt
+    summary = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    note = relationship("Note", back_populates="conversations")
+    messages = relationship("ChatMessage", back_populates="conversation", cascade="all, delete-orphan", order_by="ChatMessage.id")
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("chat_conversations.id", ondelete="CASCADE"), index=True)
+    role = Column(String(20), nullable=False)
+    content = Column(Text, nullable=False)
+    # Set once the message has been rolled into the conversation summary
+    compacted = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    conversation = relationship("ChatConversation", back_populates="messages")
@@ -0,0 +1,27 @@
+# app/database/schemas/chat.py
+
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional, List
+
+class ChatMessageResponse(BaseModel):
+    id: int
+    role: str
+    content: str
+    created_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class ChatConversationResponse(BaseModel):
+    id: int
+    note_id: int
+    summary: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class ChatConversationDetailResponse(ChatConversationResponse):
+    messages: List[ChatMessageResponse] = []
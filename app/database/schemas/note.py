@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class NoteBase(BaseModel):
     title: str
@@ -11,8 +11,10 @@ class NoteBase(BaseModel):
     language: str
     translated: bool = False
     content_url: Optional[str] = None
-    flashcards: Optional[Dict[str, Any]] = None
-    quizzes: Optional[Dict[str, Any]] = None
+    flashcards: Optional[List[Dict[str, Any]]] = None
+    quizzes: Optional[List[Dict[str, Any]]] = None
+    flashcards_source_hash: Optional[str] = None
+    quizzes_source_hash: Optional[str] = None
 
 class NoteCreate(NoteBase):
     pass
@@ -28,8 +30,8 @@ class NoteInFolderResponse(BaseModel):
     transcript_text: str
     language: str
     content_url: Optional[str] = None
-    flashcards: Optional[Dict[str, Any]] = None
-    quizzes: Optional[Dict[str, Any]] = None
+    flashcards: Optional[List[Dict[str, Any]]] = None
+    quizzes: Optional[List[Dict[str, Any]]] = None
 
     class Config:
         orm_mode = True
@@ -6,6 +6,7 @@ import os
 from app.route.user import router as user_router
 from app.route.note import router as note_router
 from app.route.folder import router as folder_router
+from app.route.webhook import router as webhook_router
 
 
 load_env()
@@ -18,6 +19,7 @@ async def startup_event():
 app.include_router(user_router)
 app.include_router(note_router)
 app.include_router(folder_router)
+app.include_router(webhook_router)
 
 # app.include_router(text_router, prefix="/v1/text", tags=["text"])
 
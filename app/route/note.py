@@ -1,45 +1,70 @@
 # app/route/notes.py
 import json
-import os
-import time
-import traceback
-import uuid
 
 from datetime import datetime
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, BackgroundTasks
-from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Request, UploadFile, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 from app.commons.pydantic_to_json import metadata_to_dict
 from app.database.db import get_db
 from app.database.schemas.note import NoteCreate, NoteMetadataCreate, NoteUpdate
 from app.usecases.auth_guard import auth_guard
-from app.usecases.generation.chat_generation import generate_chat
+from app.usecases.generation.chat_generation import generate_chat, stream_chat_async
+from app.usecases.generation.chat_cache import cache_answer, cached_chat_response, get_cached_answer
 from app.usecases.note.note import (
     add_metadata,
     add_note,
+    create_note_with_metadata,
     get_folder_by_note_id_usecase, 
     update_note,
     get_note_by_id,  
     get_all_notes,
+    get_chat_context,
     move_note_to_folder_usecase,
     remove_note_folder_usecase,
 )
-from app.usecases.generation.youtube_transcript_extraction import generate_transcript, generate_youtube_transcript
-from app.usecases.generation.audio_transcribe_extraction import transcribe_audio, transcribe_audio_salad, transcribe_audio_whisper_openai
-from app.usecases.generation.summary_generation import generate_summary
-from app.usecases.generation.summary_translation_generation import translate_summary
-from app.usecases.generation.flashcard_generation import generate_flashcards
-from app.usecases.generation.quiz_generation import generate_quizzes
+from app.usecases.generation.note_generation import summary_events_async
+from app.usecases.generation.summary_translation_generation import translate_transcript_events_async
+from app.usecases.generation.transcript_cache import remember_audio_hash
+from app.usecases.generation.rate_limiter import rate_limit_wait_message, with_rate_limit_waits
 from app.database.models import NoteMetadata, User, Note
-
+from app.database.schemas.chat import ChatConversationDetailResponse, ChatConversationResponse
+
+from app.usecases.note.conversation import (
+    add_chat_turn,
+    compact_conversation,
+    create_conversation,
+    delete_conversation,
+    get_conversation,
+    get_note_conversations,
+    get_prompt_history,
+)
+from app.usecases.note.study_material import ensure_flashcards_async, ensure_quizzes_async, study_material_etag
 from app.usecases.storage.audio_store import delete_object, extract_audio_filename, put_object
+from app.usecases.storage.direct_transfer import confirm_presigned_upload, create_presigned_upload, presigned_download_url
+from app.usecases.storage.resumable_upload import (
+    abort_upload,
+    complete_upload,
+    create_upload_session,
+    get_upload_session,
+    upload_part,
+)
 
-from redis import Redis
+from app.tasks.audio_processor import enqueue_coalesced_audio_note
+from app.tasks.audio_queue import get_task_owner, get_task_status, task_events_key
+from app.tasks.study_material import schedule_study_material_precompute
+
+from redis.asyncio import Redis as AsyncRedis
 from app.config import settings
 
 
 # Initialize Redis client
-redis_client = Redis.from_url(settings.REDIS_URL)
+async_redis_client = AsyncRedis.from_url(settings.REDIS_URL)
+
+# How long a progress stream waits for a new task event before sending a keep-alive
+TASK_EVENTS_BLOCK_MS = 15000
 
 router = APIRouter(
     prefix="/notes",
@@ -62,162 +87,24 @@ async def get_note(note_id: int, current_user: User = Depends(auth_guard), db: S
 async def generate_youtube_summary(
     youtube_url: str,
     lang: str = "",
+    stream: bool = False,
+    study_pack: bool = False,
     current_user: User = Depends(auth_guard),
-    db: Session = Depends(get_db)
 ):
-    async def event_generator():
-        try:
-            print(f"Starting transcription for URL: {youtube_url}")
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Generating transcript...'})}\n\n"
-
-            # Add timing information
-            start_time = time.time()
-            transcript_response = generate_transcript(youtube_url)
-            transcription_time = time.time() - start_time
-            print(f"Transcription took {transcription_time:.2f} seconds")
-            print(f"Transcript response: {transcript_response}")
-            
-            if not transcript_response['success']:
-                error_details = transcript_response.get('error', {})
-                print(f"Transcription failed with error: {error_details}")
-                yield f"data: {json.dumps({'status': 'error', 'message': f'Failed to transcribe the YouTube video: {error_details}'})}\n\n"
-                return
-            
-            transcript = transcript_response['data']['transcript']
-            print(f"Transcript length: {len(transcript)} characters")
-
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Generating summary...'})}\n\n"
-
-            start_time = time.time()
-            summary_response = generate_summary(transcript, lang)
-            summary_time = time.time() - start_time
-            print(f"Summary generation took {summary_time:.2f} seconds")
-            
-            if not summary_response['success']:
-                error_details = summary_response.get('error', {})
-                print(f"Summary generation failed with error: {error_details}")
-                yield f"data: {json.dumps({'status': 'error', 'message': f'Failed to generate summary: {error_details}'})}\n\n"
-                return
-
-            summary_data = summary_response['data']
-            print("Summary generated successfully")
-
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Creating note...'})}\n\n"
-
-            try:
-                note_create = NoteCreate(
-                    title=summary_data['title'],
-                    summary=summary_data['markdown'],
-                    transcript_text=transcript,
-                    language=summary_data['lang'],
-                    content_url=youtube_url,
-                )
-                
-                new_note = add_note(
-                    db=db,
-                    user_id=current_user.id,
-                    folder_id=None,
-                    note_create=note_create
-                )
-                print(f"Note created successfully with ID: {new_note.id}")
-
-                metadata_create = NoteMetadataCreate(
-                    title=summary_data['title'],
-                    content_category=summary_data['content_category'],
-                    emoji_representation=summary_data['emoji_representation'],
-                    date_created=datetime.now()
-                )
-
-                note_metadata = add_metadata(
-                    db=db,
-                    user_id=current_user.id,
-                    note_id=new_note.id,
-                    metadata_create=metadata_create
-                )
-                print("Metadata added successfully")
-
-                note_metadata_json = json.dumps(metadata_to_dict(note_metadata))
-                yield f"data: {json.dumps({'status': 'complete', 'message': note_metadata_json})}\n\n"
-
-            except Exception as db_error:
-                print(f"Database operation failed: {str(db_error)}")
-                raise
-
-        except Exception as e:
-            print(f"Process failed with error: {str(e)}")
-            print(f"Full error traceback: {traceback.format_exc()}")
-            yield f"data: {json.dumps({'status': 'error', 'message': f'Process failed on generate_youtube_summary: {str(e)}'})}\n\n"
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    task_id = enqueue_coalesced_audio_note(youtube_url, current_user.id, lang=lang, backend="youtube_auto", stream=stream, study_pack=study_pack)
+    return StreamingResponse(stream_task_progress(task_id), media_type="text/event-stream")
 
 @router.get("/generate/youtube/2/")
 async def generate_youtube_summary_2(
     youtube_url: str,
     transcript: str,
     lang: str = "",
+    stream: bool = False,
+    study_pack: bool = False,
     current_user: User = Depends(auth_guard),
-    db: Session = Depends(get_db)
 ):
-    async def event_generator():
-        try:
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Transcribing audio...'})}\n\n"
-            
-            transcription_response = generate_youtube_transcript(youtube_url=youtube_url)
-            if not transcription_response['success']:
-                print(transcription_response["error"])
-                yield f"data: {json.dumps({'status': 'error', 'message': 'Failed to transcribe audio'})}\n\n"
-                return
-            
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Generating summary...'})}\n\n"
-            
-            transcript = transcription_response["data"]["transcript"]
-        
-            summary_response = generate_summary(transcript, lang)
-            if not summary_response['success']:
-                print(summary_response["error"])
-                yield f"data: {json.dumps({'status': 'error', 'message': f'Failed to generate summary'})}\n\n"
-                return
-
-            summary_data = summary_response['data']
-
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Creating note...'})}\n\n"
-
-            note_create = NoteCreate(
-                title=summary_data['title'],
-                summary=summary_data['markdown'],
-                transcript_text=transcript,
-                language=summary_data['lang'],
-                content_url=youtube_url,
-            )
-            new_note = add_note(
-                db=db,
-                user_id=current_user.id,
-                folder_id=None,  # Or specify a folder_id if needed
-                note_create=note_create
-            )
-
-            metadata_create = NoteMetadataCreate(
-                title=summary_data['title'],
-                content_category=summary_data['content_category'],
-                emoji_representation=summary_data['emoji_representation'],
-                date_created=datetime.now()
-            )
-
-            note_metadata = add_metadata(
-                db=db,
-                user_id=current_user.id,
-                note_id=new_note.id,
-                metadata_create=metadata_create
-            )
-
-            note_metadata_json = json.dumps(metadata_to_dict(note_metadata))
-
-            yield f"data: {json.dumps({'status': 'complete', 'message': note_metadata_json})}\n\n"
-
-        except Exception as e:
-            yield f"data: {json.dumps({'status': 'error', 'message': f'Process failed on generate_youtube_summary_2: {str(e)}'})}\n\n"
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    task_id = enqueue_coalesced_audio_note(youtube_url, current_user.id, lang=lang, backend="youtube_captions", stream=stream, study_pack=study_pack)
+    return StreamingResponse(stream_task_progress(task_id), media_type="text/event-stream")
 
 
 @router.post("/audio/store")
@@ -225,90 +112,121 @@ async def store_audio(
     audio_file: UploadFile = File(...),
     current_user: User = Depends(auth_guard),
 ):
-    audio_path = f"/tmp/{audio_file.filename}"
     try:
-        # Save the uploaded file to a temporary location
-        with open(audio_path, "wb") as buffer:
-            buffer.write(await audio_file.read())
-        
-        object_url = put_object(audio_file, audio_path)
+        # Stream the upload (spooled by Starlette) to MinIO part by part, hashing it on the way
+        object_url, audio_sha256, size = await run_in_threadpool(
+            put_object, audio_file.file, audio_file.filename, audio_file.content_type
+        )
+
+        # Let later transcriptions of this object hit the shared transcript cache without re-downloading it
+        remember_audio_hash(object_url, audio_sha256)
         
         # Return the URL or any other necessary responseZ
         print("object_url: ", object_url)
-        return {"success": True, "url": object_url}
+        return {"success": True, "url": object_url, "size": size}
     
+    except HTTPException:
+        raise
     except Exception as e:
-        if 'object_url' in locals():
-            delete_object(object_url)
         print(e)
         raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
             
+@router.post("/audio/presigned-uploads")
+async def start_presigned_audio_upload(filename: str, current_user: User = Depends(auth_guard)):
+    """Grant a presigned URL to PUT the file straight into MinIO; confirm it once uploaded."""
+    return await run_in_threadpool(create_presigned_upload, current_user.id, filename)
+
+@router.post("/audio/presigned-uploads/confirm")
+async def confirm_presigned_audio_upload(object_name: str, current_user: User = Depends(auth_guard)):
+    result = await run_in_threadpool(confirm_presigned_upload, current_user.id, object_name)
+    return {"success": True, **result}
+
+@router.post("/audio/uploads")
+async def start_audio_upload(
+    filename: str,
+    content_type: Optional[str] = None,
+    current_user: User = Depends(auth_guard),
+):
+    """Open a resumable upload; send the file as numbered parts, then complete it."""
+    return await run_in_threadpool(create_upload_session, current_user.id, filename, content_type)
+
+@router.get("/audio/uploads/{session_id}")
+async def get_audio_upload(session_id: str, current_user: User = Depends(auth_guard)):
+    """The parts received so far; an interrupted upload resumes at `next_part`."""
+    return await run_in_threadpool(get_upload_session, session_id, current_user.id)
+
+@router.put("/audio/uploads/{session_id}/parts/{part_number}")
+async def put_audio_upload_part(
+    session_id: str,
+    part_number: int,
+    request: Request,
+    current_user: User = Depends(auth_guard),
+):
+    """Upload one part as the raw request body (every part but the last at least UPLOAD_MIN_PART_BYTES)."""
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > settings.UPLOAD_MAX_PART_BYTES:
+            raise HTTPException(status_code=413, detail=f"Parts are limited to {settings.UPLOAD_MAX_PART_BYTES} bytes")
+    return await run_in_threadpool(upload_part, session_id, current_user.id, part_number, bytes(data))
+
+@router.post("/audio/uploads/{session_id}/complete")
+async def complete_audio_upload(session_id: str, current_user: User = Depends(auth_guard)):
+    result = await run_in_threadpool(complete_upload, session_id, current_user.id)
+    return {"success": True, **result}
+
+@router.delete("/audio/uploads/{session_id}")
+async def abort_audio_upload(session_id: str, current_user: User = Depends(auth_guard)):
+    await run_in_threadpool(abort_upload, session_id, current_user.id)
+    return {"success": True}
+
+async def stream_task_progress(task_id: str, last_event_id: str = "0-0"):
+    """Tail a generation task's Redis Stream as SSE, starting after last_event_id.
+
+    Every event carries its stream entry ID as the SSE `id`, so a client that
+    reconnects with `Last-Event-ID` only receives the events it missed.
+    """
+    key = task_events_key(task_id)
+    while True:
+        entries = await async_redis_client.xread({key: last_event_id}, count=100, block=TASK_EVENTS_BLOCK_MS)
+        if not entries:
+            status, _ = get_task_status(task_id)
+            if status is None:
+                yield f"data: {json.dumps({'status': 'error', 'message': 'Task not found or expired', 'task_id': task_id})}\n\n"
+                return
+            # Nothing new yet: keep the connection open through proxies
+            yield ": keep-alive\n\n"
+            continue
+
+        for entry_id, fields in entries[0][1]:
+            last_event_id = entry_id.decode()
+            event = json.loads(fields[b"data"])
+            yield f"id: {last_event_id}\ndata: {json.dumps(event)}\n\n"
+            if event["status"] in ("complete", "error"):
+                return
+
+@router.get("/tasks/{task_id}/events")
+async def get_task_events(
+    task_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: User = Depends(auth_guard),
+):
+    """Resume the progress stream of a generation task after a dropped connection."""
+    if get_task_owner(task_id) != current_user.id:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return StreamingResponse(stream_task_progress(task_id, last_event_id or "0-0"), media_type="text/event-stream")
+
 @router.get("/generate/audio")
 async def generate_audio_summary(
     audio_url: str,
     lang: str = "",
     context: str = "",  
+    stream: bool = False,
+    study_pack: bool = False,
     current_user: User = Depends(auth_guard),
-    db: Session = Depends(get_db)
 ):
-    async def event_generator():
-        task_id = None
-        try:
-            # Generate unique task ID
-            task_id = str(uuid.uuid4())
-            redis_client.set(f"task_status:{task_id}", "QUEUED")
-            
-            yield f"data: {json.dumps({'status': 'queued', 'task_id': task_id})}\n\n"
-            
-            # Process transcription
-            transcription_response = transcribe_audio(audio_url=audio_url)
-            if not transcription_response['success']:
-                raise Exception(transcription_response['error'])
-            
-            redis_client.set(f"task_status:{task_id}", "TRANSCRIBING")
-            yield f"data: {json.dumps({'status': 'transcribing'})}\n\n"
-            
-            transcript = transcription_response["data"]["transcript"]
-            
-            # Generate summary
-            redis_client.set(f"task_status:{task_id}", "SUMMARIZING")
-            yield f"data: {json.dumps({'status': 'summarizing'})}\n\n"
-            
-            summary_response = generate_summary(transcript, lang, context=context)
-            if not summary_response['success']:
-                raise Exception(summary_response['error'])
-            
-            summary_data = summary_response['data']
-            
-            # Create note
-            note_create = NoteCreate(
-                title=summary_data['title'],
-                summary=summary_data['markdown'],
-                transcript_text=transcript,
-                language=summary_data['lang'],
-                content_url=audio_url,
-            )
-            
-            new_note = add_note(db=db, user_id=current_user.id, 
-                              folder_id=None, note_create=note_create)
-            
-            redis_client.set(f"task_status:{task_id}", "COMPLETE")
-            yield f"data: {json.dumps({'status': 'complete', 'note_id': new_note.id})}\n\n"
-
-        except Exception as e:
-            if task_id:
-                redis_client.set(f"task_status:{task_id}", "FAILED")
-            yield f"data: {json.dumps({'status': 'error', 'error': str(e)})}\n\n"
-        finally:
-            if task_id:
-                # Cleanup task status after 1 hour
-                redis_client.expire(f"task_status:{task_id}", 3600)
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    task_id = enqueue_coalesced_audio_note(audio_url, current_user.id, lang=lang, context=context, backend="auto", stream=stream, study_pack=study_pack)
+    return StreamingResponse(stream_task_progress(task_id), media_type="text/event-stream")
 
 
 @router.get("/generate/audio/2/")
@@ -316,156 +234,31 @@ async def generate_audio_summary_2(
     audio_url: str,
     lang: str = "",
     context: str = "",  
+    stream: bool = False,
+    study_pack: bool = False,
     current_user: User = Depends(auth_guard),
-    db: Session = Depends(get_db)
 ):
-    async def event_generator():
-        try:
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Transcribing audio...'})}\n\n"
-            
-            transcription_response = transcribe_audio_whisper_openai(audio_url=audio_url)
-            if not transcription_response['success']:
-                print(transcription_response["error"])
-                yield f"data: {json.dumps({'status': 'error', 'message': 'Failed to transcribe audio'})}\n\n"
-                return
-            
-            print("transcription_response: ", transcription_response)
-            
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Generating summary...'})}\n\n"
-            
-            transcript = transcription_response["data"]["transcript"]
-            
-            summary_response = generate_summary(transcript, lang, context=context)
-            if not summary_response['success']:
-                print(summary_response["error"])
-                yield f"data: {json.dumps({'status': 'error', 'message': f'Failed to generate summary'})}\n\n"
-                return
-            
-            summary_data = summary_response['data']
-
-            # Step 3: Create a new note
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Creating note...'})}\n\n"
-            
-            note_create = NoteCreate(
-                title=summary_data['title'],
-                summary=summary_data['markdown'],
-                transcript_text=transcript,
-                language=summary_data['lang'],
-                content_url=audio_url,
-            )
-            new_note = add_note(
-                db=db,
-                user_id=current_user.id,
-                folder_id=None,
-                note_create=note_create
-            )
-
-            metadata_create = NoteMetadataCreate(
-                title=summary_data['title'],
-                content_category=summary_data['content_category'],
-                emoji_representation=summary_data['emoji_representation'],
-                date_created=datetime.now()
-            )
-            note_metadata = add_metadata(
-                db=db,
-                user_id=current_user.id,
-                note_id=new_note.id,
-                metadata_create=metadata_create
-            )
-
-            # Convert metadata to JSON
-            note_metadata_json = json.dumps(metadata_to_dict(note_metadata))
-
-            # Final status with the note metadata JSON
-            yield f"data: {json.dumps({'status': 'complete', 'message': note_metadata_json})}\n\n"
-
-        except Exception as e:
-            yield f"data: {json.dumps({'status': 'error', 'message': f'Process failed on generate_audio_summary_2: {str(e)}'})}\n\n"
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    task_id = enqueue_coalesced_audio_note(audio_url, current_user.id, lang=lang, context=context, backend="whisper", stream=stream, study_pack=study_pack)
+    return StreamingResponse(stream_task_progress(task_id), media_type="text/event-stream")
 
 @router.get("/generate/audio/3/")
 async def generate_audio_summary_3(
     audio_url: str,
     lang: str = "",
     context: str = "",  
+    stream: bool = False,
+    study_pack: bool = False,
     current_user: User = Depends(auth_guard),
-    db: Session = Depends(get_db)
 ):
-    async def event_generator():
-        temp_audio_file = None  # Initialize temp_audio_file to None
-        try:
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Transcribing audio...'})}\n\n"
-            
-            transcription_response = transcribe_audio_salad(audio_url=audio_url)
-            if not transcription_response['success']:
-                print(transcription_response["error"])
-                yield f"data: {json.dumps({'status': 'error', 'message': 'Failed to transcribe audio'})}\n\n"
-                return
-            
-            # print("transcription_response: ", transcription_response)
-            
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Generating summary...'})}\n\n"
-            
-            transcript = transcription_response["data"]["transcript"]
-            
-            summary_response = generate_summary(transcript, lang, context=context)
-            if not summary_response['success']:
-                print(summary_response["error"])
-                yield f"data: {json.dumps({'status': 'error', 'message': 'Failed to generate summary'})}\n\n"
-                return
-            
-            summary_data = summary_response['data']
-
-            # Step 3: Create a new note
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Creating note...'})}\n\n"
-            
-            note_create = NoteCreate(
-                title=summary_data['title'],
-                summary=summary_data['markdown'],
-                transcript_text=transcript,
-                language=summary_data['lang'],
-                content_url=audio_url,
-            )
-            new_note = add_note(
-                db=db,
-                user_id=current_user.id,
-                folder_id=None,
-                note_create=note_create
-            )
-
-            metadata_create = NoteMetadataCreate(
-                title=summary_data['title'],
-                content_category=summary_data['content_category'],
-                emoji_representation=summary_data['emoji_representation'],
-                date_created=datetime.now()
-            )
-            note_metadata = add_metadata(
-                db=db,
-                user_id=current_user.id,
-                note_id=new_note.id,
-                metadata_create=metadata_create
-            )
-
-            # Convert metadata to JSON
-            note_metadata_json = json.dumps(metadata_to_dict(note_metadata))
-
-            # Final status with the note metadata JSON
-            yield f"data: {json.dumps({'status': 'complete', 'message': note_metadata_json})}\n\n"
-
-        except Exception as e:
-            print(f"Error: {str(e)}")
-            print(f"Traceback: {traceback.format_exc()}")
-            yield f"data: {json.dumps({'status': 'error', 'message': f'Process failed on generate_audio_summary_3: {str(e)}'})}\n\n"
-            if temp_audio_file and os.path.exists(temp_audio_file):
-                os.remove(temp_audio_file)
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    task_id = enqueue_coalesced_audio_note(audio_url, current_user.id, lang=lang, context=context, backend="salad_jobs", stream=stream, study_pack=study_pack)
+    return StreamingResponse(stream_task_progress(task_id), media_type="text/event-stream")
 
 @router.get("/generate/context/")
 async def generate_context_note(
     context: str,
     lang: str = "",
+    stream: bool = False,
+    study_pack: bool = False,
     current_user: User = Depends(auth_guard),
     db: Session = Depends(get_db)
 ):
@@ -473,7 +266,13 @@ async def generate_context_note(
         try:
             yield f"data: {json.dumps({'status': 'progress', 'message': 'Générer un résumé...'})}\n\n"
             
-            summary_response = generate_summary(context, lang, context=context)
+            async for event in with_rate_limit_waits(summary_events_async(context, lang, context=context, stream=stream, study_pack=study_pack)):
+                if event['type'] == 'rate_limited':
+                    yield f"data: {json.dumps({'status': 'progress', 'message': rate_limit_wait_message(event['wait']), 'wait': event['wait']})}\n\n"
+                elif event['type'] == 'partial':
+                    yield f"data: {json.dumps({'status': 'partial', 'message': event['delta']})}\n\n"
+                else:
+                    summary_response = event['response']
             if not summary_response['success']:
                 print(summary_response["error"])
                 yield f"data: {json.dumps({'status': 'error', 'message': f'Échec de la génération du résumé'})}\n\n"
@@ -483,31 +282,15 @@ async def generate_context_note(
 
             yield f"data: {json.dumps({'status': 'progress', 'message': 'Créer une note...'})}\n\n"
             
-            note_create = NoteCreate(
-                title=summary_data['title'],
-                summary=summary_data['markdown'],
-                transcript_text=context,
-                language=summary_data['lang'],
-                content_url="",
-            )
-            new_note = add_note(
-                db=db,
-                user_id=current_user.id,
-                folder_id=None,
-                note_create=note_create
-            )
-            metadata_create = NoteMetadataCreate(
-                title=summary_data['title'],
-                content_category=summary_data['content_category'],
-                emoji_representation=summary_data['emoji_representation'],
-                date_created=datetime.now()
-            )
-            note_metadata = add_metadata(
+            note_metadata = create_note_with_metadata(
                 db=db,
                 user_id=current_user.id,
-                note_id=new_note.id,
-                metadata_create=metadata_create
+                summary_data=summary_data,
+                transcript_text=context,
+                content_url="",
             )
+            if not study_pack:
+                schedule_study_material_precompute(note_metadata.note_id)
             
             note_metadata_json = json.dumps(metadata_to_dict(note_metadata))
 
@@ -557,6 +340,8 @@ async def delete_note(
 async def translate_note_endpoint(
     note_id: int,
     target_language: str,
+    stream: bool = False,
+    study_pack: bool = False,
     current_user: User = Depends(auth_guard),
     db: Session = Depends(get_db)
 ):
@@ -569,8 +354,15 @@ async def translate_note_endpoint(
             
             note.translated = True
 
-            # Step 2: Translate the note's transcript
-            translation = translate_summary(note.transcript_text, target_language)
+            # Step 2: Translate the note's transcript, segment by segment
+            async for event in with_rate_limit_waits(translate_transcript_events_async(note.transcript_text, target_language)):
+                if event['type'] == 'rate_limited':
+                    yield f"data: {json.dumps({'status': 'progress', 'message': rate_limit_wait_message(event['wait']), 'wait': event['wait']})}\n\n"
+                elif event['type'] == 'progress':
+                    message = f"Translating transcript ({event['completed']}/{event['total']})..."
+                    yield f"data: {json.dumps({'status': 'progress', 'message': message, 'completed': event['completed'], 'total': event['total']})}\n\n"
+                else:
+                    translation = event['response']
             if not translation['success']:
                 yield f"data: {json.dumps({'status': 'error', 'message': 'Failed to translate summary'})}\n\n"
                 return
@@ -581,7 +373,13 @@ async def translate_note_endpoint(
             yield f"data: {json.dumps({'status': 'progress', 'message': 'Generating translated summary...'})}\n\n"
             
             # new_public_url = copy_file_from_url(public_url=note.content_url)
-            summary_response = generate_summary(translated_text, target_language)
+            async for event in with_rate_limit_waits(summary_events_async(translated_text, target_language, stream=stream, study_pack=study_pack)):
+                if event['type'] == 'rate_limited':
+                    yield f"data: {json.dumps({'status': 'progress', 'message': rate_limit_wait_message(event['wait']), 'wait': event['wait']})}\n\n"
+                elif event['type'] == 'partial':
+                    yield f"data: {json.dumps({'status': 'partial', 'message': event['delta']})}\n\n"
+                else:
+                    summary_response = event['response']
             if not summary_response['success']:
                 yield f"data: {json.dumps({'status': 'error', 'message': f'Failed to generate summary'})}\n\n"
                 return
@@ -591,33 +389,16 @@ async def translate_note_endpoint(
             # Step 4: Create a new note
             yield f"data: {json.dumps({'status': 'progress', 'message': 'Creating note...'})}\n\n"
             
-            note_create = NoteCreate(
-                title=summary_data['title'],
-                summary=summary_data['markdown'],
+            note_metadata = create_note_with_metadata(
+                db=db,
+                user_id=current_user.id,
+                summary_data=summary_data,
                 transcript_text=translated_text,
-                language=summary_data['lang'],
                 content_url=note.content_url,
                 translated=True,
             )
-            new_note = add_note(
-                db=db,
-                user_id=current_user.id,
-                folder_id=None,
-                note_create=note_create
-            )
-
-            metadata_create = NoteMetadataCreate(
-                title=summary_data['title'],
-                content_category=summary_data['content_category'],
-                emoji_representation=summary_data['emoji_representation'],
-                date_created=datetime.now()
-            )
-            note_metadata = add_metadata(
-                db=db,
-                user_id=current_user.id,
-                note_id=new_note.id,
-                metadata_create=metadata_create
-            )
+            if not study_pack:
+                schedule_study_material_precompute(note_metadata.note_id)
 
             # Convert metadata to JSON
             note_metadata_json = json.dumps(metadata_to_dict(note_metadata))
@@ -633,9 +414,19 @@ async def translate_note_endpoint(
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+def study_material_response(artifact, if_none_match: Optional[str]) -> Response:
+    """Serve a flashcard/quiz deck with an ETag, answering 304 when the client already has this version."""
+    etag = study_material_etag(artifact)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=artifact, headers=headers)
+
 @router.get("/flashcard/{note_id}")
 async def create_flashcards(
     note_id: int,
+    regenerate: bool = False,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(auth_guard),
     db: Session = Depends(get_db)
 ):
@@ -643,22 +434,19 @@ async def create_flashcards(
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
     
-    if note.flashcards :
-        note.flashcards.clear()
-
-    flashcard_data = generate_flashcards(note.summary, note.language)
+    # Reused while the summary is unchanged: usually precomputed after note creation
+    flashcard_data = await ensure_flashcards_async(db, note, regenerate=regenerate)
     if not flashcard_data['success'] :
        print(flashcard_data['error'])
        raise HTTPException(status_code=500, detail="Server fail")
      
-    note.flashcards = flashcard_data['data']['flashcards']
-    db.commit()
-    db.refresh(note)
-    return note.flashcards
+    return study_material_response(flashcard_data['data']['flashcards'], if_none_match)
 
 @router.get("/quizzes/{note_id}")
 async def create_quizzes(
     note_id: int,
+    regenerate: bool = False,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(auth_guard),
     db: Session = Depends(get_db)
 ):
@@ -666,18 +454,13 @@ async def create_quizzes(
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
     
-    if note.quizzes :
-        note.quizzes.clear()
-    
-    quiz_data = generate_quizzes(note.summary, note.language)
+    # Reused while the summary is unchanged: usually precomputed after note creation
+    quiz_data = await ensure_quizzes_async(db, note, regenerate=regenerate)
     if not quiz_data['success'] :
        print(quiz_data['error'])
        raise HTTPException(status_code=500, detail="Server fail")
      
-    note.quizzes = quiz_data['data']['quizzes']
-    db.commit()
-    db.refresh(note)
-    return note.quizzes
+    return study_material_response(quiz_data['data']['quizzes'], if_none_match)
 
 @router.put("/{note_id}/move-folder")
 async def move_note_to_folder(note_id: int, new_folder_id: int, current_user: User = Depends(auth_guard), 
@@ -699,6 +482,21 @@ async def remove_note_folder(note_id: int, current_user: User = Depends(auth_gua
     updated_note = remove_note_folder_usecase(db=db, note_id=note_id)
     return updated_note
 
+@router.get("/{note_id}/audio")
+async def get_note_audio(note_id: int, current_user: User = Depends(auth_guard), db: Session = Depends(get_db)):
+    """Where to play the note's audio from: a short-lived presigned URL for our own uploads."""
+    note = get_note_by_id(db, note_id, current_user.id)
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+    if not note.content_url:
+        raise HTTPException(status_code=404, detail="Note has no audio")
+
+    url = await run_in_threadpool(presigned_download_url, note.content_url)
+    if url is None:
+        # Not in our bucket (e.g. a YouTube video), play it from its source
+        return {"url": note.content_url, "expires_in": None}
+    return {"url": url, "expires_in": settings.PRESIGNED_DOWNLOAD_EXPIRY_SECONDS}
+
 @router.get("/{note_id}/folder/")
 async def get_folder_by_note_id(note_id: int, current_user: User = Depends(auth_guard), db: Session = Depends(get_db)):
     folder = get_folder_by_note_id_usecase(db, note_id=note_id, user_id=current_user.id)
@@ -774,45 +572,167 @@ async def generate_chat_response(
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
     
-    summary = note.summary
+    cached_answer = await run_in_threadpool(get_cached_answer, note, chat_input)
+    if cached_answer is not None:
+        return cached_chat_response(cached_answer)
+
+    context = await run_in_threadpool(get_chat_context, db, note, chat_input)
     lang = note.language
-    chat_response = generate_chat(chat_input, summary, lang)
+    chat_response = await run_in_threadpool(generate_chat, chat_input, context, lang)
 
     if not chat_response['success']:
         return {"status": "error", "chatInput": chat_input, "answer": "Failed to generate chat response"}
 
+    await run_in_threadpool(cache_answer, note, chat_input, chat_response['data']['answer'])
     return chat_response
 
-# @router.get("/chat/")
-# async def generate_chat_response(
-#     chat_input: str,
-#     note_id: int,
-#     current_user: User = Depends(auth_guard),
-#     db: Session = Depends(get_db)
-# ):
-#     async def event_generator():
-#         try:
-#             yield f"data: {json.dumps({'status': 'progress', 'message': 'Generating chat response...'})}\n\n"
-            
-#             note = get_note_by_id(db, note_id=note_id, user_id=current_user.id)
-            
-#             if not note:
-#                 raise HTTPException(status_code=404, detail="Note not found")
-            
-#             summary = note.summary
-#             lang = note.language
-#             chat_response = generate_chat(chat_input, summary, lang)
+@router.get("/chat/stream/")
+async def stream_chat_response(
+    note_id: int,
+    chat_input: str,
+    current_user: User = Depends(auth_guard),
+    db: Session = Depends(get_db)
+):
+    note = get_note_by_id(db, note_id=note_id, user_id=current_user.id)
+    
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
 
-#             if not chat_response['success']:
-#                 print(chat_response["error"])
-#                 yield f"data: {json.dumps({'status': 'error', 'message': 'Failed to generate chat response'})}\n\n"
-#                 return
+    async def event_generator():
+        try:
+            cached_answer = await run_in_threadpool(get_cached_answer, note, chat_input)
+            if cached_answer is not None:
+                yield f"data: {json.dumps({'status': 'complete', 'message': cached_chat_response(cached_answer)['data']})}\n\n"
+                return
 
-#             chat_response_data = chat_response['data']
+            yield f"data: {json.dumps({'status': 'progress', 'message': 'Generating chat response...'})}\n\n"
+
+            context = await run_in_threadpool(get_chat_context, db, note, chat_input)
+            chat_response = None
+            async for event in with_rate_limit_waits(stream_chat_async(chat_input, context, note.language)):
+                if event['type'] == 'rate_limited':
+                    yield f"data: {json.dumps({'status': 'progress', 'message': rate_limit_wait_message(event['wait']), 'wait': event['wait']})}\n\n"
+                elif event['type'] == 'partial':
+                    yield f"data: {json.dumps({'status': 'partial', 'message': event['delta']})}\n\n"
+                else:
+                    chat_response = event['response']
+
+            if not chat_response['success']:
+                print(chat_response["error"])
+                yield f"data: {json.dumps({'status': 'error', 'message': 'Failed to generate chat response'})}\n\n"
+                return
 
-#             yield f"data: {json.dumps({'status': 'complete', 'message': chat_response_data})}\n\n"
+            await run_in_threadpool(cache_answer, note, chat_input, chat_response['data']['answer'])
+            yield f"data: {json.dumps({'status': 'complete', 'message': chat_response['data']})}\n\n"
 
-#         except Exception as e:
-#             yield f"data: {json.dumps({'status': 'error', 'message': f'Process failed: {str(e)}'})}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'status': 'error', 'message': f'Process failed: {str(e)}'})}\n\n"
 
-#     return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+@router.post("/{note_id}/conversations", response_model=ChatConversationResponse)
+async def create_chat_conversation(
+    note_id: int,
+    current_user: User = Depends(auth_guard),
+    db: Session = Depends(get_db)
+):
+    note = get_note_by_id(db, note_id=note_id, user_id=current_user.id)
+
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+
+    return create_conversation(db, note, current_user.id)
+
+@router.get("/{note_id}/conversations", response_model=List[ChatConversationResponse])
+async def get_chat_conversations(
+    note_id: int,
+    current_user: User = Depends(auth_guard),
+    db: Session = Depends(get_db)
+):
+    return get_note_conversations(db, note_id=note_id, user_id=current_user.id)
+
+@router.get("/conversations/{conversation_id}", response_model=ChatConversationDetailResponse)
+async def get_chat_conversation(
+    conversation_id: int,
+    current_user: User = Depends(auth_guard),
+    db: Session = Depends(get_db)
+):
+    conversation = get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
+
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    return conversation
+
+@router.delete("/conversations/{conversation_id}")
+async def delete_chat_conversation(
+    conversation_id: int,
+    current_user: User = Depends(auth_guard),
+    db: Session = Depends(get_db)
+):
+    conversation = get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
+
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    delete_conversation(db, conversation)
+    return {"message": "Conversation deleted successfully"}
+
+@router.post("/conversations/{conversation_id}/messages")
+async def send_chat_message(
+    conversation_id: int,
+    chat_input: str,
+    stream: bool = False,
+    current_user: User = Depends(auth_guard),
+    db: Session = Depends(get_db)
+):
+    conversation = get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
+
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    note = conversation.note
+
+    async def prepare_prompt():
+        # Summarize older turns first so the prompt stays within the history budget
+        await run_in_threadpool(compact_conversation, db, conversation)
+        history_summary, history = get_prompt_history(conversation)
+        context = await run_in_threadpool(get_chat_context, db, note, chat_input)
+        return context, history_summary, history
+
+    if not stream:
+        context, history_summary, history = await prepare_prompt()
+        chat_response = await run_in_threadpool(generate_chat, chat_input, context, note.language, history_summary, history)
+
+        if not chat_response['success']:
+            return {"status": "error", "chatInput": chat_input, "answer": "Failed to generate chat response"}
+
+        await run_in_threadpool(add_chat_turn, db, conversation, chat_input, chat_response['data']['answer'])
+        return chat_response
+
+    async def event_generator():
+        try:
+            yield f"data: {json.dumps({'status': 'progress', 'message': 'Generating chat response...'})}\n\n"
+
+            context, history_summary, history = await prepare_prompt()
+            chat_response = None
+            async for event in with_rate_limit_waits(stream_chat_async(chat_input, context, note.language, history_summary, history)):
+                if event['type'] == 'rate_limited':
+                    yield f"data: {json.dumps({'status': 'progress', 'message': rate_limit_wait_message(event['wait']), 'wait': event['wait']})}\n\n"
+                elif event['type'] == 'partial':
+                    yield f"data: {json.dumps({'status': 'partial', 'message': event['delta']})}\n\n"
+                else:
+                    chat_response = event['response']
+
+            if not chat_response['success']:
+                print(chat_response["error"])
+                yield f"data: {json.dumps({'status': 'error', 'message': 'Failed to generate chat response'})}\n\n"
+                return
+
+            await run_in_threadpool(add_chat_turn, db, conversation, chat_input, chat_response['data']['answer'])
+            yield f"data: {json.dumps({'status': 'complete', 'message': chat_response['data']})}\n\n"
+
+        except Exception as e:
+            yield f"data: {json.dumps({'status': 'error', 'message': f'Process failed: {str(e)}'})}\n\n"
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
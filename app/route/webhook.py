@@ -0,0 +1,43 @@
+import json
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.usecases.generation.salad_jobs import FINAL_STATUSES, notify_job_done, verify_webhook_signature, webhook_enabled
+
+router = APIRouter(
+    prefix="/webhooks",
+    tags=["webhooks"]
+)
+
+@router.post("/salad")
+async def salad_job_webhook(
+    request: Request,
+    webhook_id: Optional[str] = Header(None),
+    webhook_timestamp: Optional[str] = Header(None),
+    webhook_signature: Optional[str] = Header(None),
+):
+    """Receive Salad job updates and wake the pipelines waiting for finished jobs.
+
+    Deliveries are never trusted for content: waiters re-fetch the job from the jobs API.
+    """
+    if not webhook_enabled():
+        # Unsigned deliveries can't be told apart from anyone else's requests
+        raise HTTPException(status_code=404, detail="Webhook not configured")
+    body = await request.body()
+    if not (webhook_id and webhook_timestamp and webhook_signature) or not verify_webhook_signature(
+        settings.SALAD_WEBHOOK_SECRET, webhook_id, webhook_timestamp, webhook_signature, body
+    ):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    job = payload.get("data", payload) if isinstance(payload, dict) else None
+    if not isinstance(job, dict) or "id" not in job:
+        raise HTTPException(status_code=400, detail="Missing job id")
+
+    if job.get("status") in FINAL_STATUSES:
+        await run_in_threadpool(notify_job_done, str(job["id"]))
+    return {"received": True}
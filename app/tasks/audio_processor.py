@@ -1,11 +1,222 @@
-from app.tasks.audio_queue import celery_app
-from app.usecases.generation.audio_transcribe_extraction import transcribe_audio
-from app.usecases.generation.summary_generation import generate_summary
+import time
+import uuid
+
+from celery import chain
+
+from app.commons.pydantic_to_json import metadata_to_dict
+from app.database.db import DatabaseSingleton
+from app.tasks.audio_queue import celery_app, get_task_status, publish_task_event, run_async, set_task_owner, set_task_status
+from app.tasks.coalescing import complete_flight, fail_flight, flight_key, join_flight
+from app.tasks.study_material import schedule_study_material_precompute
+from app.usecases.generation.audio_transcribe_extraction import (
+    transcribe_audio,
+    transcribe_audio_salad,
+    transcribe_audio_whisper_openai,
+)
+from app.usecases.generation.note_generation import summary_events_async
+from app.usecases.generation.rate_limiter import on_rate_limit_wait, rate_limit_wait_message
+from app.usecases.generation.transcript_cache import lookup_audio_hash
+from app.usecases.generation.transcription_router import transcribe_routed
+from app.usecases.generation.youtube_transcript_extraction import generate_transcript, generate_youtube_transcript, get_video_id
+from app.usecases.note.note import create_note_with_metadata
+
+# Transcription backends selectable by the generation endpoints, keyed by name.
+# Each one takes the source URL (audio file or YouTube video) as its only argument.
+TRANSCRIBERS = {
+    "salad": transcribe_audio,
+    "salad_jobs": transcribe_audio_salad,
+    "whisper": transcribe_audio_whisper_openai,
+    "youtube": generate_transcript,
+    "youtube_captions": generate_youtube_transcript,
+    # Routed to the fastest healthy backend, hedging slow calls
+    "auto": lambda url: transcribe_routed(url, "audio"),
+    "youtube_auto": lambda url: transcribe_routed(url, "youtube"),
+}
+
+# Streamed markdown is published in batches to keep the task's event stream short
+PARTIAL_FLUSH_CHARS = 200
+PARTIAL_FLUSH_SECONDS = 0.5
+
+class PipelineStageError(Exception):
+    pass
+
+def _dispatch_followers(followers: list, result: dict = None):
+    """Hand the leader's summary to the requests that coalesced into its flight, or, if it failed,
+    run the pipeline for each of them after all."""
+    for follower in followers:
+        if result is not None:
+            persist_audio_note.apply_async(
+                args=[result, follower["user_id"], follower["audio_url"]], kwargs={"task_id": follower["task_id"]}
+            )
+        else:
+            enqueue_audio_note(follower["audio_url"], follower["user_id"], task_id=follower["task_id"], **follower["enqueue_kwargs"])
+
+def _fail(task_id: str, message: str, flight: str = None):
+    if task_id:
+        set_task_status(task_id, "FAILED", {"error": message})
+    if flight:
+        _dispatch_followers(fail_flight(flight, task_id))
+    raise PipelineStageError(message)
+
+def _publish_rate_limit_waits(task_id: str):
+    """Report calls queued by the LLM rate limiter on the task's event stream."""
+    def listener(provider: str, model: str, seconds: float):
+        if task_id:
+            publish_task_event(task_id, {"status": "progress", "message": rate_limit_wait_message(seconds), "wait": seconds, "task_id": task_id})
+    return on_rate_limit_wait(listener)
 
 @celery_app.task(name="process_audio_transcription")
-def process_audio_transcription(audio_url: str):
-    return transcribe_audio(audio_url=audio_url)
+def process_audio_transcription(audio_url: str, task_id: str = None, backend: str = "salad", flight: str = None):
+    if task_id:
+        set_task_status(task_id, "TRANSCRIBING")
+
+    with _publish_rate_limit_waits(task_id):
+        transcription_response = TRANSCRIBERS[backend](audio_url)
+    if not transcription_response or not transcription_response['success']:
+        error = transcription_response['error'] if transcription_response else "no response from the transcription server"
+        _fail(task_id, f"Failed to transcribe audio: {error}", flight)
+    return transcription_response
+
+async def _generate_summary(transcript: str, lang: str, context: str, task_id: str, stream: bool, study_pack: bool) -> dict:
+    """Generate the note content; when streaming, publish its markdown to the task's event stream as `partial` events."""
+    pending, last_flush = "", time.monotonic()
+    async for event in summary_events_async(transcript, lang, context, stream=stream and task_id is not None, study_pack=study_pack):
+        if event["type"] == "complete":
+            if pending:
+                publish_task_event(task_id, {"status": "partial", "message": pending, "task_id": task_id})
+            return event["response"]
+
+        pending += event["delta"]
+        if len(pending) >= PARTIAL_FLUSH_CHARS or time.monotonic() - last_flush >= PARTIAL_FLUSH_SECONDS:
+            publish_task_event(task_id, {"status": "partial", "message": pending, "task_id": task_id})
+            pending, last_flush = "", time.monotonic()
 
 @celery_app.task(name="process_audio_summary") 
-def process_audio_summary(transcript: str, lang: str, context: str):
-    return generate_summary(transcript, lang, context=context)
+def process_audio_summary(transcription_response: dict, lang: str, context: str, task_id: str = None, stream: bool = False, study_pack: bool = False, flight: str = None):
+    if task_id:
+        set_task_status(task_id, "SUMMARIZING")
+
+    transcript = transcription_response["data"]["transcript"]
+    with _publish_rate_limit_waits(task_id):
+        summary_response = run_async(_generate_summary(transcript, lang, context, task_id, stream, study_pack))
+    if not summary_response['success']:
+        _fail(task_id, f"Failed to generate summary: {summary_response['error']}", flight)
+    result = {
+        "transcript": transcript,
+        "summary": summary_response['data'],
+    }
+    if flight:
+        _dispatch_followers(complete_flight(flight, task_id, result), result)
+    return result
+
+@celery_app.task(name="persist_audio_note")
+def persist_audio_note(summary_response: dict, user_id: int, audio_url: str, task_id: str = None):
+    if task_id:
+        set_task_status(task_id, "PERSISTING")
+
+    db = DatabaseSingleton.getInstance().SessionLocal()
+    try:
+        note_metadata = create_note_with_metadata(
+            db=db,
+            user_id=user_id,
+            summary_data=summary_response["summary"],
+            transcript_text=summary_response["transcript"],
+            content_url=audio_url,
+        )
+        result = metadata_to_dict(note_metadata)
+    except Exception as e:
+        _fail(task_id, f"Failed to create note: {str(e)}")
+    finally:
+        db.close()
+
+    if task_id:
+        set_task_status(task_id, "COMPLETE", result)
+
+    if not (summary_response["summary"].get("flashcards") and summary_response["summary"].get("quizzes")):
+        schedule_study_material_precompute(result["note_id"])
+    return result
+
+@celery_app.task(name="audio_note_failed")
+def audio_note_failed(request, exc, traceback, task_id: str = None, flight: str = None):
+    """Errback of the note chain, for stages that died without going through _fail
+    (an unexpected exception, a lost worker): fail the task and release its flight."""
+    message = f"Note generation failed: {exc}"
+    if task_id:
+        status, _ = get_task_status(task_id)
+        if status not in ("FAILED", "COMPLETE"):
+            set_task_status(task_id, "FAILED", {"error": message})
+    # A no-op if the flight was already settled, e.g. when only the note creation failed
+    if flight:
+        _dispatch_followers(fail_flight(flight, task_id))
+
+def enqueue_audio_note(
+    audio_url: str,
+    user_id: int,
+    lang: str = "",
+    context: str = "",
+    backend: str = "salad",
+    stream: bool = False,
+    study_pack: bool = False,
+    task_id: str = None,
+    flight: str = None,
+) -> str:
+    """Queue the transcribe -> summarize -> persist chain for a note and return its task id.
+
+    The work runs on the Celery worker, so it carries on even if the client that
+    requested it disconnects; progress is replayable from the task's event stream.
+    With `stream`, the summary markdown is also published as `partial` events.
+    With `study_pack`, flashcards and quizzes are generated with the summary.
+    With `flight`, the summary is shared with coalesced identical requests.
+    """
+    if task_id is None:
+        task_id = str(uuid.uuid4())
+        set_task_owner(task_id, user_id)
+        set_task_status(task_id, "QUEUED")
+    chain(
+        process_audio_transcription.s(audio_url, task_id=task_id, backend=backend, flight=flight),
+        process_audio_summary.s(lang, context, task_id=task_id, stream=stream, study_pack=study_pack, flight=flight),
+        persist_audio_note.s(user_id, audio_url, task_id=task_id),
+    ).apply_async(link_error=audio_note_failed.s(task_id=task_id, flight=flight))
+    return task_id
+
+def generation_source(url: str, backend: str) -> str:
+    """Normalize what a generation request is about: the YouTube video, or the audio's content hash when known."""
+    if backend.startswith("youtube"):
+        video_id = get_video_id(url)
+        if video_id:
+            return f"youtube:{video_id}"
+    audio_sha256 = lookup_audio_hash(url)
+    if audio_sha256:
+        return f"audio:{audio_sha256}"
+    return f"url:{url.split('://', 1)[-1]}"
+
+def enqueue_coalesced_audio_note(
+    audio_url: str,
+    user_id: int,
+    lang: str = "",
+    context: str = "",
+    backend: str = "salad",
+    stream: bool = False,
+    study_pack: bool = False,
+) -> str:
+    """Like enqueue_audio_note, but identical concurrent requests share one transcription and summary.
+
+    The first request leads the flight and runs the pipeline; the others are queued on
+    the flight and, once the leader has its summary, only create their own note. Their
+    task ids and event streams behave exactly as if they had run the pipeline themselves.
+    """
+    enqueue_kwargs = {"lang": lang, "context": context, "backend": backend, "stream": stream, "study_pack": study_pack}
+    flight = flight_key(generation_source(audio_url, backend), lang, context, study_pack)
+    task_id = str(uuid.uuid4())
+    set_task_owner(task_id, user_id)
+    set_task_status(task_id, "QUEUED")
+
+    follower = {"task_id": task_id, "user_id": user_id, "audio_url": audio_url, "enqueue_kwargs": enqueue_kwargs}
+    role, result = join_flight(flight, task_id, follower)
+    if role == "done":
+        persist_audio_note.apply_async(args=[result, user_id, audio_url], kwargs={"task_id": task_id})
+    elif role == "lead":
+        enqueue_audio_note(audio_url, user_id, task_id=task_id, flight=flight, **enqueue_kwargs)
+    else:
+        publish_task_event(task_id, {"status": "progress", "message": "Waiting for an identical request in progress...", "task_id": task_id})
+    return task_id
@@ -1,3 +1,6 @@
+import asyncio
+import json
+import os
 from celery import Celery
 from redis import Redis
 from app.config import settings
@@ -6,7 +9,8 @@ from app.config import settings
 celery_app = Celery(
     'audio_tasks',
     broker='redis://redis:6380/0',
-    backend='redis://redis:6380/0'
+    backend='redis://redis:6380/0',
+    include=['app.tasks.audio_processor', 'app.tasks.study_material'],
 )
 
 # Optional configurations
@@ -18,4 +22,79 @@ celery_app.conf.update(
     enable_utc=True,
 )
 
+# Speculative work runs on its own queue so it never delays note generation;
+# it is consumed by a separate, smaller worker (see start.sh)
+LOW_PRIORITY_QUEUE = 'low_priority'
+
 redis_client = Redis.from_url(settings.REDIS_URL)
+
+# One event loop per worker process, so the async clients' pooled connections stay usable across tasks.
+# It is created lazily: a loop made at import time in the prefork parent would be shared (epoll fd,
+# self-pipe and all) by every forked child.
+_event_loop = None
+_event_loop_pid = None
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    global _event_loop, _event_loop_pid
+    if _event_loop is None or _event_loop_pid != os.getpid():
+        _event_loop = asyncio.new_event_loop()
+        _event_loop_pid = os.getpid()
+    return _event_loop
+
+def run_async(coroutine):
+    return _get_event_loop().run_until_complete(coroutine)
+
+# Task progress keys are kept for an hour after their last update
+TASK_STATUS_TTL = 3600
+
+# Upper bound on the number of events kept in a task's progress stream
+TASK_EVENTS_MAXLEN = 1000
+
+TASK_STAGE_MESSAGES = {
+    "QUEUED": "Waiting for a worker...",
+    "TRANSCRIBING": "Transcribing audio...",
+    "SUMMARIZING": "Generating summary...",
+    "PERSISTING": "Creating note...",
+}
+
+def task_events_key(task_id: str) -> str:
+    return f"task_events:{task_id}"
+
+def build_task_event(task_id: str, status: str, result: dict = None) -> dict:
+    """Build the SSE payload describing a task reaching the given stage."""
+    if status == "QUEUED":
+        return {"status": "queued", "task_id": task_id}
+    if status == "COMPLETE":
+        return {"status": "complete", "message": json.dumps(result), "note_id": result["note_id"], "task_id": task_id}
+    if status == "FAILED":
+        return {"status": "error", "message": (result or {}).get("error", "Process failed"), "task_id": task_id}
+    return {"status": "progress", "message": TASK_STAGE_MESSAGES.get(status, status), "task_id": task_id}
+
+def publish_task_event(task_id: str, event: dict):
+    """Append an event to the task's Redis Stream so clients can replay it after reconnecting."""
+    key = task_events_key(task_id)
+    redis_client.xadd(key, {"data": json.dumps(event)}, maxlen=TASK_EVENTS_MAXLEN, approximate=True)
+    redis_client.expire(key, TASK_STATUS_TTL)
+
+def set_task_status(task_id: str, status: str, result: dict = None):
+    """Record the current stage of a generation task, and its final payload if any."""
+    redis_client.set(f"task_status:{task_id}", status, ex=TASK_STATUS_TTL)
+    if result is not None:
+        redis_client.set(f"task_result:{task_id}", json.dumps(result), ex=TASK_STATUS_TTL)
+    publish_task_event(task_id, build_task_event(task_id, status, result))
+
+def set_task_owner(task_id: str, user_id: int):
+    redis_client.set(f"task_owner:{task_id}", user_id, ex=TASK_STATUS_TTL)
+
+def get_task_owner(task_id: str):
+    owner = redis_client.get(f"task_owner:{task_id}")
+    return int(owner) if owner else None
+
+def get_task_status(task_id: str) -> tuple:
+    """Return the (status, result) pair recorded for a generation task."""
+    status = redis_client.get(f"task_status:{task_id}")
+    result = redis_client.get(f"task_result:{task_id}")
+    return (
+        status.decode() if status else None,
+        json.loads(result) if result else None,
+    )
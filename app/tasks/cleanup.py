@@ -4,6 +4,8 @@ from sqlalchemy.orm import Session
 from apscheduler.schedulers.background import BackgroundScheduler
 from app.database.db import get_db
 from app.usecases.note.note import delete_old_notes
+from app.usecases.storage.resumable_upload import abort_abandoned_uploads
+from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,6 +26,18 @@ def cleanup_old_notes(db: Session):
         for error in result["errors"]:
             logger.error(error)
 
+def cleanup_abandoned_uploads():
+    try:
+        result = abort_abandoned_uploads()
+    except Exception as e:
+        logger.error(f"Failed to cleanup abandoned uploads: {str(e)}")
+        return
+
+    if result["aborted_count"]:
+        logger.info(f"Aborted {result['aborted_count']} abandoned uploads")
+    for error in result["errors"]:
+        logger.warning(error)
+
 def init_cleanup_scheduler():
     scheduler = BackgroundScheduler()
     
@@ -36,6 +50,14 @@ def init_cleanup_scheduler():
         args=[next(get_db())]
     )
     
+    # Abort multipart uploads of resumable upload sessions that were never completed
+    scheduler.add_job(
+        cleanup_abandoned_uploads,
+        'interval',
+        minutes=settings.UPLOAD_CLEANUP_INTERVAL_MINUTES,
+        id='cleanup_abandoned_uploads'
+    )
+    
     # Activate this for testing:
     # scheduler.add_job(
     #     cleanup_old_notes,
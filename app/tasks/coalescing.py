@@ -0,0 +1,107 @@
+# Single-flight coalescing of identical generation requests.
+#
+# The first request for a given source/language/context claims a "flight" and runs the
+# pipeline; identical requests arriving while it runs join the flight's follower list in
+# Redis instead of transcribing and summarizing the same content again. When the leader
+# settles the flight it gets the followers back, and hands each one the shared result
+# (or, if it failed, lets each run its own pipeline). Nothing waits in an API process, so
+# followers survive API restarts.
+import hashlib
+import json
+from typing import List, Optional, Tuple
+
+from redis import Redis
+
+from app.config import settings
+
+redis_client = Redis.from_url(settings.REDIS_URL)
+
+# Returns {"done", outcome} when a result is already shared, {"lead", ""} when the caller claimed
+# the flight, or {"follow", ""} after queuing the caller as a follower; atomically, so a
+# leader settling in between can't be missed
+JOIN_SCRIPT = """
+local outcome = redis.call('GET', KEYS[2])
+if outcome then
+    return {'done', outcome}
+end
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return {'lead', ''}
+end
+redis.call('RPUSH', KEYS[3], ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+return {'follow', ''}
+"""
+
+# Stores the outcome (if any), then, unless another leader has taken over the flight, releases
+# it and returns (and removes) its followers
+SETTLE_SCRIPT = """
+if ARGV[1] ~= '' then
+    redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[2])
+end
+local leader = redis.call('GET', KEYS[1])
+if leader and leader ~= ARGV[3] then
+    return {}
+end
+redis.call('DEL', KEYS[1])
+local followers = redis.call('LRANGE', KEYS[3], 0, -1)
+redis.call('DEL', KEYS[3])
+return followers
+"""
+
+_join = redis_client.register_script(JOIN_SCRIPT)
+_settle = redis_client.register_script(SETTLE_SCRIPT)
+
+def flight_key(source: str, lang: str = "", context: str = "", study_pack: bool = False) -> str:
+    """Identify a generation by its normalized source (video id, audio hash or URL), language and context."""
+    parts = [source, lang.strip().lower(), " ".join(context.split()), "study_pack" if study_pack else "summary"]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+def _lock_key(key: str) -> str:
+    return f"flight:{key}"
+
+def _outcome_key(key: str) -> str:
+    return f"flight_outcome:{key}"
+
+def _followers_key(key: str) -> str:
+    return f"flight_followers:{key}"
+
+def _keys(key: str) -> list:
+    return [_lock_key(key), _outcome_key(key), _followers_key(key)]
+
+def join_flight(key: str, task_id: str, follower: dict) -> Tuple[str, Optional[dict]]:
+    """Join the flight for key as task_id.
+
+    Returns ("done", result) if an identical request's result is still shared, ("lead", None)
+    if task_id now leads the flight, or ("follow", None) if `follower` was queued to receive
+    the leader's result. Coalescing is best effort: if Redis is unavailable every request leads.
+    """
+    try:
+        role, payload = _join(keys=_keys(key), args=[task_id, settings.COALESCE_LOCK_TTL, json.dumps(follower)])
+    except Exception as e:
+        print(f"Failed to join flight {key}: {str(e)}")
+        return "lead", None
+    role = role.decode()
+    if role == "done":
+        return role, json.loads(payload)
+    return role, None
+
+def _settle_flight(key: str, leader_task_id: str, result: Optional[dict]) -> List[dict]:
+    try:
+        outcome = json.dumps(result) if result is not None else ""
+        followers = _settle(keys=_keys(key), args=[outcome, settings.COALESCE_RESULT_TTL, leader_task_id])
+    except Exception as e:
+        print(f"Failed to settle flight {key}: {str(e)}")
+        return []
+    return [json.loads(follower) for follower in followers]
+
+def complete_flight(key: str, leader_task_id: str, result: dict) -> List[dict]:
+    """Share the leader's result (with identical requests in the next COALESCE_RESULT_TTL seconds too)
+    and return the followers that were waiting for it."""
+    return _settle_flight(key, leader_task_id, result)
+
+def fail_flight(key: str, leader_task_id: str) -> List[dict]:
+    """Release a failed flight and return its followers, who now have to generate for themselves.
+
+    Does nothing if the flight was already settled or another request leads it now.
+    """
+    return _settle_flight(key, leader_task_id, None)
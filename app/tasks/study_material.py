@@ -0,0 +1,37 @@
+import asyncio
+
+from app.database.db import DatabaseSingleton
+from app.database.models import Note
+from app.tasks.audio_queue import LOW_PRIORITY_QUEUE, celery_app, run_async
+from app.usecases.note.study_material import (
+    ensure_flashcards_async,
+    ensure_quizzes_async,
+    has_current_flashcards,
+    has_current_quizzes,
+)
+
+@celery_app.task(name="precompute_study_material")
+def precompute_study_material(note_id: int):
+    """Generate a new note's flashcards and quizzes ahead of the user opening them."""
+    db = DatabaseSingleton.getInstance().SessionLocal()
+    try:
+        note = db.query(Note).filter(Note.id == note_id).first()
+        if not note or (has_current_flashcards(note) and has_current_quizzes(note)):
+            return
+
+        async def precompute():
+            return await asyncio.gather(ensure_flashcards_async(db, note), ensure_quizzes_async(db, note))
+
+        for response in run_async(precompute()):
+            if not response['success']:
+                print(f"Failed to precompute study material for note {note_id}: {response['error']}")
+    finally:
+        db.close()
+
+def schedule_study_material_precompute(note_id: int):
+    """Post-creation hook: queue flashcard and quiz generation as low-priority background work."""
+    try:
+        precompute_study_material.apply_async(args=[note_id], queue=LOW_PRIORITY_QUEUE)
+    except Exception as e:
+        # The GET routes fall back to on-demand generation
+        print(f"Failed to schedule study material precompute for note {note_id}: {str(e)}")
@@ -0,0 +1,130 @@
+# Shrinks audio before it is uploaded for transcription.
+#
+# Speech recognition only needs mono 16 kHz audio, so voice memos and downloads are downmixed,
+# resampled and re-encoded at a speech bitrate (a long WAV/M4A recording drops well under
+# Whisper's 25 MB upload limit). Leading and trailing silence is cut, keeping a little padding.
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+from pydub import AudioSegment
+from pydub.silence import detect_leading_silence
+
+from app.config import settings
+
+# A path on disk, or a seekable binary file object (e.g. audio streamed from object storage)
+AudioSource = Union[str, BinaryIO]
+
+def trim_silence(audio: AudioSegment) -> AudioSegment:
+    """Cut leading and trailing silence, relative to the clip's average loudness."""
+    if len(audio) == 0 or audio.dBFS == float("-inf"):
+        return audio
+    threshold = audio.dBFS - settings.AUDIO_SILENCE_THRESHOLD_DB
+    start = detect_leading_silence(audio, silence_threshold=threshold)
+    end = len(audio) - detect_leading_silence(audio.reverse(), silence_threshold=threshold)
+    if start >= end:
+        return audio
+    padding = settings.AUDIO_SILENCE_PADDING_MS
+    return audio[max(0, start - padding):min(len(audio), end + padding)]
+
+def format_savings(original_bytes: int, processed_bytes: int) -> str:
+    saved = original_bytes - processed_bytes
+    percent = 100 * saved / original_bytes if original_bytes else 0
+    return f"{original_bytes / 1e6:.1f} MB -> {processed_bytes / 1e6:.1f} MB ({percent:.0f}% smaller)"
+
+def source_size(source: AudioSource) -> int:
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+    return size
+
+def ffmpeg_input(source: AudioSource) -> AudioSource:
+    """What to hand pydub for the source: a path when the audio is on disk.
+
+    pydub reads a file object whole into memory to pipe it to ffmpeg, which would undo the bound on a
+    spooled upload or download that has rolled over to an (anonymous) temporary file; ffmpeg opens
+    such a file through its descriptor instead. Spools still in memory are already small.
+    """
+    if isinstance(source, str):
+        return source
+    source.seek(0)
+    if isinstance(source, tempfile.SpooledTemporaryFile) and not source._rolled:
+        return source
+    try:
+        path = f"/proc/{os.getpid()}/fd/{source.fileno()}"
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return source
+    return path if os.path.exists(path) else source
+
+def load_audio(source: AudioSource) -> AudioSegment:
+    """Decode the audio as mono at the transcription sample rate."""
+    source = ffmpeg_input(source)
+    # Let ffmpeg downmix and resample while decoding, so long recordings stay small in memory
+    audio = AudioSegment.from_file(source, parameters=["-ac", "1", "-ar", str(settings.AUDIO_PREPROCESS_SAMPLE_RATE)])
+    return audio.set_channels(1).set_frame_rate(settings.AUDIO_PREPROCESS_SAMPLE_RATE)
+
+def export_audio(audio: AudioSegment) -> str:
+    """Encode audio at the speech bitrate into a temporary file and return its path (the caller deletes it)."""
+    with tempfile.NamedTemporaryFile(suffix=f".{settings.AUDIO_PREPROCESS_FORMAT}", delete=False) as temp:
+        out_path = temp.name
+    try:
+        audio.export(out_path, format=settings.AUDIO_PREPROCESS_FORMAT, bitrate=settings.AUDIO_PREPROCESS_BITRATE)
+    except Exception:
+        os.remove(out_path)
+        raise
+    return out_path
+
+def preprocess_audio(source: AudioSource, audio: Optional[AudioSegment] = None) -> Tuple[str, dict]:
+    """Transcode the audio for transcription; return the new file's path and size stats.
+
+    `audio` is the source already decoded with load_audio, if the caller has it.
+    The caller owns (and must delete) the returned file.
+    """
+    if audio is None:
+        audio = load_audio(source)
+    trimmed = trim_silence(audio)
+    out_path = export_audio(trimmed)
+
+    stats = {
+        "original_bytes": source_size(source),
+        "processed_bytes": os.path.getsize(out_path),
+        "duration_seconds": len(audio) / 1000,
+        "trimmed_seconds": (len(audio) - len(trimmed)) / 1000,
+    }
+    return out_path, stats
+
+@contextmanager
+def preprocessed_audio(source: AudioSource, audio: Optional[AudioSegment] = None) -> Iterator[AudioSource]:
+    """Yield the audio to transcribe: the path of a preprocessed copy, or source itself
+    if preprocessing is disabled or fails (e.g. ffmpeg can't decode the file).
+
+    Pass `audio` if the source was already decoded, so it isn't decoded again."""
+    if not settings.AUDIO_PREPROCESS:
+        yield source
+        return
+
+    try:
+        out_path, stats = preprocess_audio(source, audio)
+    except Exception as e:
+        print(f"Audio preprocessing failed, sending the audio as is: {str(e)}")
+        yield source
+        return
+
+    print(
+        f"Preprocessed audio: {format_savings(stats['original_bytes'], stats['processed_bytes'])}, "
+        f"{stats['trimmed_seconds']:.1f}s of silence trimmed"
+    )
+    if stats["processed_bytes"] >= stats["original_bytes"]:
+        # Already compact (e.g. a low bitrate download), re-encoding only costs quality
+        os.remove(out_path)
+        yield source
+        return
+    try:
+        yield out_path
+    finally:
+        if os.path.exists(out_path):
+            os.remove(out_path)
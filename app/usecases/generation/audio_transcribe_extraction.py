@@ -1,15 +1,27 @@
-import time
+import asyncio
+import hashlib
+import tempfile
+from typing import Tuple
+from urllib.parse import urlparse
 from click import File
 from app.commons.environment_manager import load_env
-from openai import OpenAI
-import os
+from app.config import settings
+from app.usecases.generation.circuit_breaker import SALAD_ENDPOINT_CIRCUIT, guarded_request, salad_timeout
+from app.usecases.generation.salad_jobs import create_job, estimate_audio_seconds, wait_for_job
+from app.usecases.storage.audio_store import own_object_name, read_object
+from app.usecases.generation.transcript_cache import (
+    audio_cache_key,
+    cache_transcript,
+    cached_transcript_response,
+    get_cached_transcript,
+    lookup_audio_hash,
+    remember_audio_hash,
+)
+from app.usecases.generation.chunked_transcription import transcribe_audio_file
 import requests
 import json
 
 load_env()
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
       
 def transcribe_audio(audio_url: str) -> dict:
      # """Transcribe an audio file using the local Whisper model, downloading it first to a static temporary file."""
@@ -24,9 +36,19 @@ def transcribe_audio(audio_url: str) -> dict:
         'Content-Type': 'application/json'
     }
     try:
-        response = requests.request("POST", url, headers=headers, data=payload)
+        # Salad fetches the audio itself, so only a hash recorded where the bytes were read (upload, streaming) is used
+        audio_sha256 = lookup_audio_hash(audio_url)
+        cache_key = audio_cache_key(audio_sha256) if audio_sha256 else None
+        if cache_key:
+            cached_transcript = get_cached_transcript(cache_key)
+            if cached_transcript is not None:
+                return cached_transcript_response(cached_transcript)
+
+        response = guarded_request(SALAD_ENDPOINT_CIRCUIT, "POST", url, headers=headers, data=payload, timeout=salad_timeout())
         if response.status_code == 200:
             transcription_data = response.json()
+            if cache_key:
+                cache_transcript(cache_key, transcription_data["transcription"])
             return {
                 "success": True,
                 "data": {
@@ -79,37 +101,53 @@ def print_audio_info(file_path: str):
         
         
 
+def _download_audio(audio_url: str) -> Tuple[tempfile.SpooledTemporaryFile, str]:
+    """Stream audio from a public URL into a spooled temporary file; return it rewound, and its SHA-256."""
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.AUDIO_SPOOL_MAX_BYTES)
+    sha256 = hashlib.sha256()
+    try:
+        with requests.get(audio_url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=65536):
+                spool.write(chunk)
+                sha256.update(chunk)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, sha256.hexdigest()
+
 def transcribe_audio_whisper_openai(audio_url: str) -> dict:
-    """Transcribe an audio file using OpenAI, downloading it first to a static temporary file."""
+    """Transcribe an audio file using OpenAI, streaming it into memory (or an anonymous temporary file) first."""
+    audio_file = None
     try:
         if not audio_url.startswith("https://"):
             audio_url = "https://" + audio_url
-            
-        # Send a GET request to the URL
-        response = requests.get(audio_url, stream=True)
-        response.raise_for_status()  # Check for request errors
-        
-        # Extract the filename from the URL
-        filename = audio_url.split("/")[-1].split("?")[0]
-        temp_audio_file = filename 
-        # print_audio_info(temp_audio_file)
-
-        # Save the file locally
-        with open(temp_audio_file, "wb") as file:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    file.write(chunk)
-
-        # Open the temporary file for transcription
-        with open(temp_audio_file, "rb") as audio_file:
-            transcription = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="text"
-            )
-
-        # Clean up the temporary file
-        os.remove(temp_audio_file)
+
+        # Skip the download entirely when the content is already known and transcribed
+        audio_sha256 = lookup_audio_hash(audio_url)
+        if audio_sha256:
+            cached_transcript = get_cached_transcript(audio_cache_key(audio_sha256))
+            if cached_transcript is not None:
+                return cached_transcript_response(cached_transcript)
+
+        # Our own uploads are read straight from the bucket rather than through the public endpoint
+        object_name = own_object_name(audio_url)
+        if object_name:
+            audio_file, audio_sha256 = read_object(object_name)
+        else:
+            audio_file, audio_sha256 = _download_audio(audio_url)
+
+        remember_audio_hash(audio_url, audio_sha256)
+        cache_key = audio_cache_key(audio_sha256)
+        cached_transcript = get_cached_transcript(cache_key)
+        if cached_transcript is not None:
+            return cached_transcript_response(cached_transcript)
+
+        # Transcribe the audio (in parallel chunks when it is long); its name tells Whisper the format
+        filename = urlparse(audio_url).path.split("/")[-1]
+        transcription = transcribe_audio_file(audio_file, filename)
+        cache_transcript(cache_key, transcription)
 
         return {
             "success": True,
@@ -120,10 +158,6 @@ def transcribe_audio_whisper_openai(audio_url: str) -> dict:
         }        
 
     except Exception as e:
-        # Clean up in case of an error
-        if os.path.exists(temp_audio_file):
-            os.remove(temp_audio_file)
-
         print("Error when transcribing content", e)
         return {
             "success": False,
@@ -132,51 +166,33 @@ def transcribe_audio_whisper_openai(audio_url: str) -> dict:
                 "message": str(e)
             }
         }
+    finally:
+        if audio_file:
+            audio_file.close()
 
-def transcribe_audio_salad(audio_url: str) -> dict:
+async def transcribe_audio_salad_async(audio_url: str) -> dict:
+    """Transcribe audio with a Salad transcription job, awaiting its completion without blocking a thread."""
     try:
         if not audio_url.startswith("https://"):
             audio_url = "https://" + audio_url
-            
-        # Send a GET request to the URL
-        response = requests.get(audio_url, stream=True)
-        response.raise_for_status()
-
-        # Create transcription job using Salad API
-        salad_url = "https://api.salad.com/api/public/organizations/fmtpla/inference-endpoints/transcribe/jobs"
-        headers = {
-            "Content-Type": "application/json",
-            "Salad-Api-key": os.getenv("SALAD_API_KEY")
-        }
-        data = {
-            "input": {
-                "url": audio_url
-                # "language_code": "en",
-                # "word_level_timestamps": True,
-                # "diarization": True,
-                # "srt": True
-            }
-        }
 
-        response = requests.post(salad_url, headers=headers, json=data)
-        response.raise_for_status()
-        job_id = response.json()["id"]
-        # print(f"Transcription job created with ID: {job_id}")
+        # Salad fetches the audio itself, so only a hash recorded at upload is used for the cache
+        audio_sha256 = lookup_audio_hash(audio_url)
+        cache_key = audio_cache_key(audio_sha256) if audio_sha256 else None
+        if cache_key:
+            cached_transcript = get_cached_transcript(cache_key)
+            if cached_transcript is not None:
+                return cached_transcript_response(cached_transcript)
 
-        # Poll for transcription job status
-        status_url = f"{salad_url}/{job_id}"
-        while True:
-            response = requests.get(status_url, headers={"Salad-Api-key": os.getenv("SALAD_API_KEY")})
-            response.raise_for_status()
-            status = response.json()["status"]
-            if status == "succeeded":
-                transcription = response.json()["output"]["text"]
-                # print(f"Transcription job succeeded: {transcription}")
-                break
-            elif status in ["failed", "canceled"]:
-                raise Exception(f"Transcription job failed with status: {status}")
-            time.sleep(5) 
+        audio_seconds = await asyncio.to_thread(estimate_audio_seconds, audio_url)
+        job_id = await asyncio.to_thread(create_job, audio_url)
+        job = await wait_for_job(job_id, audio_seconds)
+        if job["status"] != "succeeded":
+            raise Exception(f"Transcription job failed with status: {job['status']}")
+        transcription = job["output"]["text"]
 
+        if cache_key:
+            cache_transcript(cache_key, transcription)
         return {
             "success": True,
             "data": {
@@ -193,4 +209,7 @@ def transcribe_audio_salad(audio_url: str) -> dict:
                 "type": "TranslationError",
                 "message": str(e)
             }
-        }
\ No newline at end of file
+        }
+
+def transcribe_audio_salad(audio_url: str) -> dict:
+    return asyncio.run(transcribe_audio_salad_async(audio_url))
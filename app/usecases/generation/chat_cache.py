@@ -0,0 +1,77 @@
+# Per-note cache of chat answers, so repeated questions skip the model
+import hashlib
+import re
+import time
+from typing import Optional
+
+from redis import Redis
+
+from app.config import settings
+from app.database.models import Note
+
+redis_client = Redis.from_url(settings.REDIS_URL)
+
+WHITESPACE = re.compile(r'\s+')
+
+def normalize_question(question: str) -> str:
+    return WHITESPACE.sub(" ", question).strip().rstrip("?!.").strip().casefold()
+
+def note_content_hash(note: Note) -> str:
+    """Hash of everything a chat answer is derived from, so edits to a note invalidate its cached answers."""
+    content = "\x00".join([note.summary or "", note.transcript_text or "", note.language or ""])
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def chat_answer_key(note_id: int, content_hash: str, question: str) -> str:
+    question_hash = hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+    return f"chat_answer:{note_id}:{content_hash}:{question_hash}"
+
+def _recency_key(note_id: int) -> str:
+    return f"chat_answer_lru:{note_id}"
+
+def get_cached_answer(note: Note, question: str) -> Optional[str]:
+    key = chat_answer_key(note.id, note_content_hash(note), question)
+    try:
+        answer = redis_client.get(key)
+        if answer is None:
+            return None
+        pipeline = redis_client.pipeline()
+        pipeline.expire(key, settings.CHAT_ANSWER_CACHE_TTL)
+        pipeline.zadd(_recency_key(note.id), {key: time.time()})
+        pipeline.expire(_recency_key(note.id), settings.CHAT_ANSWER_CACHE_TTL)
+        pipeline.execute()
+        return answer.decode()
+    except Exception as e:
+        print(f"Chat answer cache lookup failed for {key}: {str(e)}")
+    return None
+
+def cache_answer(note: Note, question: str, answer: str):
+    if not answer:
+        return
+    key = chat_answer_key(note.id, note_content_hash(note), question)
+    recency_key = _recency_key(note.id)
+    try:
+        pipeline = redis_client.pipeline()
+        pipeline.set(key, answer, ex=settings.CHAT_ANSWER_CACHE_TTL)
+        pipeline.zadd(recency_key, {key: time.time()})
+        pipeline.expire(recency_key, settings.CHAT_ANSWER_CACHE_TTL)
+        pipeline.execute()
+
+        # Evict the least recently used answers beyond the per-note limit
+        evicted = redis_client.zrange(recency_key, 0, -settings.CHAT_ANSWER_CACHE_MAX_ENTRIES - 1)
+        if evicted:
+            pipeline = redis_client.pipeline()
+            pipeline.delete(*evicted)
+            pipeline.zrem(recency_key, *evicted)
+            pipeline.execute()
+    except Exception as e:
+        print(f"Chat answer cache write failed for {key}: {str(e)}")
+
+def cached_chat_response(answer: str) -> dict:
+    return {
+        "success": True,
+        "data": {
+            "answer": answer,
+            "cached": True
+        },
+        "error": None
+    }
@@ -1,30 +1,44 @@
 from app.commons.environment_manager import load_env
 # from openai import OpenAI
 # from groq import Groq
-import replicate
-import os
+from app.usecases.generation.llm_gateway import replicate_run, replicate_stream_async
 
 load_env()
 
-client = replicate.Client(
-    api_token=os.getenv("REPLICATE_API_TOKEN")
-)
+def format_history(history_summary: str="", history: list=None) -> str:
+    lines = []
+    if history_summary:
+        lines.append(f"Summary of the earlier conversation: {history_summary}")
+    for message in history or []:
+        speaker = "User" if message["role"] == "user" else "Assistant"
+        lines.append(f"{speaker}: {message['content']}")
+    return "\n".join(lines)
 
-def generate_chat(chat_input: str="", summary: str="", language: str="") -> dict:
+def build_chat_input(chat_input: str="", context: str="", language: str="", history_summary: str="", history: list=None) -> dict:
+    conversation = format_history(history_summary, history)
+    if conversation:
+        conversation = f"""
+            Use the conversation so far to resolve follow-up questions:
+            
+            {conversation}
+            """
+    return {
+        "system_prompt": f"""
+            You are an assistant that answers questions solely based on the following context:
+            
+            {context}
+            {conversation}
+            If the user's question is not relevant to this context, respond with 'This question doesn't seem related to the note. Do you have another question?'. 
+            Answer in the specified language {language}. If {language} is empty or not provided, automatically detect the language of the context and respond in that language.
+        """,
+        "prompt": chat_input,
+    }
+
+def generate_chat(chat_input: str="", context: str="", language: str="", history_summary: str="", history: list=None) -> dict:
     try:
-        input_data = {
-            "system_prompt": f"""
-                You are an assistant that answers questions solely based on the following context:
-                
-                {summary}
-                
-                If the user's question is not relevant to this context, respond with 'This question doesn't seem related to the note. Do you have another question?'. 
-                Answer in the specified language {language}. If {language} is empty or not provided, automatically detect the language of the context and respond in that language.
-            """,
-            "prompt": chat_input,
-        }
+        input_data = build_chat_input(chat_input, context, language, history_summary, history)
 
-        output = client.run(
+        output = replicate_run(
             "meta/meta-llama-3-8b-instruct",
             input=input_data                  
         )
@@ -57,4 +71,77 @@ def generate_chat(chat_input: str="", summary: str="", language: str="") -> dict
                 "type": "ChatGenerationError",
                 "message": str(e)
             }
-        }
\ No newline at end of file
+        }
+
+async def stream_chat_async(chat_input: str="", context: str="", language: str="", history_summary: str="", history: list=None):
+    """Stream a chat answer as Replicate produces it.
+
+    Yields {"type": "partial", "delta": ...} events, then a single {"type": "complete", "response": ...}
+    event with the same response generate_chat would have returned.
+    """
+    try:
+        answer = []
+        async for event in replicate_stream_async(
+            "meta/meta-llama-3-8b-instruct",
+            input=build_chat_input(chat_input, context, language, history_summary, history)
+        ):
+            if event.event == event.EventType.ERROR:
+                raise RuntimeError(event.data)
+            delta = str(event).replace("\n", "")
+            if delta:
+                answer.append(delta)
+                yield {"type": "partial", "delta": delta}
+
+        yield {
+            "type": "complete",
+            "response": {
+                "success": True,
+                "data": {
+                    "answer": "".join(answer)
+                },
+                "error": None
+            }
+        }
+
+    except Exception as e:
+        yield {
+            "type": "complete",
+            "response": {
+                "success": False,
+                "error": {
+                    "type": "ChatGenerationError",
+                    "message": str(e)
+                }
+            }
+        }
+
+def summarize_conversation(history_summary: str="", history: list=None) -> dict:
+    """Fold older chat turns into the running conversation summary."""
+    try:
+        output = replicate_run(
+            "meta/meta-llama-3-8b-instruct",
+            input={
+                "system_prompt": """
+                    You maintain a running summary of a conversation between a user and an assistant about a note.
+                    Merge the existing summary and the new messages into one concise summary that keeps every question,
+                    fact and decision a follow-up question might refer to. Reply with the summary only, in the language of the conversation.
+                """,
+                "prompt": format_history(history_summary, history),
+            }
+        )
+        return {
+            "success": True,
+            "data": {
+                "summary": ''.join(output).strip()
+            },
+            "error": None
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": {
+                "type": "ChatSummaryError",
+                "message": str(e)
+            }
+        }
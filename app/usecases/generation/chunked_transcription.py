@@ -0,0 +1,117 @@
+# Transcribes long audio as chunks in parallel.
+#
+# The audio is cut at pauses into chunks of at most CHUNK_MAX_SECONDS (a hard cut only when a
+# stretch has no pause at all). Each chunk also starts CHUNK_OVERLAP_MS early, so a word cut at a
+# seam is heard whole by one of the two chunks; the words both transcripts share at a seam are
+# then dropped from the second one. Chunks are transcribed concurrently and retried on their own,
+# so a long lecture takes about as long as its slowest chunk.
+import contextvars
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from pydub import AudioSegment
+from pydub.silence import detect_silence
+
+from app.config import settings
+from app.usecases.generation.audio_preprocessing import AudioSource, export_audio, load_audio, preprocessed_audio, trim_silence
+from app.usecases.generation.llm_gateway import transcription as transcribe_with_openai
+
+# Silence is looked for in steps of this many ms, finer steps are much slower on long audio
+SILENCE_SEEK_STEP_MS = 100
+
+def plan_chunks(duration_ms: int, silences: List[Tuple[int, int]], max_ms: int, overlap_ms: int) -> List[Tuple[int, int]]:
+    """Return (start, end) spans covering the audio, cut in the middle of the latest pause
+    that keeps a chunk within max_ms. Every chunk but the first starts overlap_ms early."""
+    pauses = sorted((start + end) // 2 for start, end in silences)
+    cuts, start = [], 0
+    while duration_ms - start > max_ms:
+        limit = start + max_ms
+        # Don't cut in the first half, so a pause right after a cut doesn't leave a tiny chunk
+        candidates = [pause for pause in pauses if start + max_ms // 2 <= pause <= limit]
+        start = candidates[-1] if candidates else limit
+        cuts.append(start)
+
+    bounds = [0] + cuts + [duration_ms]
+    return [(max(0, begin - overlap_ms) if index else begin, end) for index, (begin, end) in enumerate(zip(bounds, bounds[1:]))]
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+def stitch_transcripts(transcripts: List[str]) -> str:
+    """Join chunk transcripts in order, dropping the words repeated at each seam by the overlap."""
+    words: List[str] = []
+    for transcript in transcripts:
+        chunk_words = transcript.split()
+        tail = [_normalize_word(word) for word in words[-settings.CHUNK_SEAM_MAX_WORDS:]]
+        head = [_normalize_word(word) for word in chunk_words[:settings.CHUNK_SEAM_MAX_WORDS]]
+        repeated = 0
+        for size in range(min(len(tail), len(head)), 0, -1):
+            if tail[-size:] == head[:size]:
+                repeated = size
+                break
+        words.extend(chunk_words[repeated:])
+    return " ".join(words)
+
+def _transcribe_chunk(audio: AudioSegment, start: int, end: int, index: int) -> str:
+    last_error = None
+    for attempt in range(settings.CHUNK_RETRIES + 1):
+        path = None
+        try:
+            # Sliced here rather than when queued, so only the chunks being worked on are copied out of the audio
+            path = export_audio(audio[start:end])
+            with open(path, "rb") as audio_file:
+                return transcribe_with_openai(model="whisper-1", file=audio_file, response_format="text")
+        except Exception as e:
+            print(f"Transcription of chunk {index} failed (attempt {attempt + 1}): {str(e)}")
+            last_error = e
+        finally:
+            if path and os.path.exists(path):
+                os.remove(path)
+    raise last_error
+
+def transcribe_chunked(audio: AudioSegment) -> str:
+    audio = trim_silence(audio)
+    silences = []
+    if audio.dBFS != float("-inf"):
+        silences = detect_silence(
+            audio,
+            min_silence_len=settings.CHUNK_MIN_SILENCE_MS,
+            silence_thresh=audio.dBFS - settings.AUDIO_SILENCE_THRESHOLD_DB,
+            seek_step=SILENCE_SEEK_STEP_MS,
+        )
+    spans = plan_chunks(len(audio), silences, int(settings.CHUNK_MAX_SECONDS * 1000), settings.CHUNK_OVERLAP_MS)
+    print(f"Transcribing {len(audio) / 1000:.0f}s of audio as {len(spans)} chunks")
+
+    with ThreadPoolExecutor(max_workers=min(settings.CHUNKED_TRANSCRIPTION_WORKERS, len(spans))) as executor:
+        # Each chunk carries the caller's context, so rate limit waits are still reported
+        futures = [
+            executor.submit(contextvars.copy_context().run, _transcribe_chunk, audio, start, end, index)
+            for index, (start, end) in enumerate(spans)
+        ]
+        transcripts = [future.result() for future in futures]
+    return stitch_transcripts(transcripts)
+
+def _transcribe_whole(source: AudioSource, filename: Optional[str]) -> str:
+    if isinstance(source, str):
+        with open(source, "rb") as audio_file:
+            return transcribe_with_openai(model="whisper-1", file=audio_file, response_format="text")
+    # The upload's name tells Whisper the format
+    return transcribe_with_openai(model="whisper-1", file=(filename or "audio", source), response_format="text")
+
+def transcribe_audio_file(source: AudioSource, filename: Optional[str] = None) -> str:
+    """Transcribe audio (a local path, or a file object named `filename`) with Whisper,
+    in parallel chunks when it is longer than CHUNKED_TRANSCRIPTION_MIN_SECONDS."""
+    try:
+        audio = load_audio(source)
+    except Exception as e:
+        # Preprocessing couldn't decode it either, let Whisper try the original
+        print(f"Failed to decode {filename or source}, transcribing it whole: {str(e)}")
+        return _transcribe_whole(source, filename)
+
+    if len(audio) <= settings.CHUNKED_TRANSCRIPTION_MIN_SECONDS * 1000:
+        # Decoded once: the same audio is preprocessed
+        with preprocessed_audio(source, audio) as audio_source:
+            return _transcribe_whole(audio_source, filename)
+    return transcribe_chunked(audio)
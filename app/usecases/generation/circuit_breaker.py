@@ -0,0 +1,101 @@
+# Circuit breakers for external endpoints, shared by every API and Celery worker through Redis.
+#
+# Closed: requests go through; failures (connection errors, timeouts, 429 and 5xx) are counted.
+# Open: after CIRCUIT_FAILURE_THRESHOLD failures within CIRCUIT_FAILURE_WINDOW_SECONDS, requests
+#   fail immediately for CIRCUIT_OPEN_SECONDS.
+# Half-open: then a single probe request is let through; its success closes the circuit,
+#   its failure opens it again.
+import requests
+from redis import Redis
+
+from app.config import settings
+
+redis_client = Redis.from_url(settings.REDIS_URL)
+
+# The Salad Cloud transcription service behind transcribe_audio and generate_transcript
+SALAD_ENDPOINT_CIRCUIT = "salad_endpoint"
+# Job submissions to the Salad inference jobs API (status polls of submitted jobs bypass it)
+SALAD_JOBS_CIRCUIT = "salad_jobs"
+
+class CircuitOpenError(Exception):
+    pass
+
+def _key(name: str, field: str) -> str:
+    return f"circuit:{name}:{field}"
+
+def is_open(name: str) -> bool:
+    """Whether requests to the endpoint would currently be refused (open, or half-open with a probe in flight)."""
+    try:
+        return bool(redis_client.exists(_key(name, "open"), _key(name, "probe")))
+    except Exception as e:
+        print(f"Circuit breaker unavailable for {name}: {str(e)}")
+        return False
+
+def allow_request(name: str) -> bool:
+    """Whether a request may be sent now; in half-open state only the caller that wins the probe may.
+
+    The breaker fails open: if Redis is unreachable requests go through.
+    """
+    try:
+        if redis_client.exists(_key(name, "open")):
+            return False
+        if redis_client.exists(_key(name, "tripped")):
+            return bool(redis_client.set(_key(name, "probe"), 1, nx=True, ex=settings.CIRCUIT_PROBE_TTL_SECONDS))
+        return True
+    except Exception as e:
+        print(f"Circuit breaker unavailable for {name}: {str(e)}")
+        return True
+
+def _open(name: str):
+    pipeline = redis_client.pipeline()
+    pipeline.set(_key(name, "open"), 1, ex=settings.CIRCUIT_OPEN_SECONDS)
+    pipeline.set(_key(name, "tripped"), 1)
+    pipeline.delete(_key(name, "failures"), _key(name, "probe"))
+    pipeline.execute()
+    print(f"Circuit {name} opened for {settings.CIRCUIT_OPEN_SECONDS}s")
+
+def record_success(name: str):
+    try:
+        if redis_client.delete(_key(name, "tripped")):
+            print(f"Circuit {name} closed")
+        redis_client.delete(_key(name, "failures"), _key(name, "probe"))
+    except Exception as e:
+        print(f"Circuit breaker unavailable for {name}: {str(e)}")
+
+def record_failure(name: str):
+    try:
+        if redis_client.exists(_key(name, "tripped")):
+            # The half-open probe failed
+            _open(name)
+            return
+        failures = redis_client.incr(_key(name, "failures"))
+        if failures == 1:
+            redis_client.expire(_key(name, "failures"), settings.CIRCUIT_FAILURE_WINDOW_SECONDS)
+        if failures >= settings.CIRCUIT_FAILURE_THRESHOLD:
+            _open(name)
+    except Exception as e:
+        print(f"Circuit breaker unavailable for {name}: {str(e)}")
+
+def is_failure_status(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+def guarded_request(name: str, method: str, url: str, **kwargs) -> requests.Response:
+    """Send an HTTP request through the endpoint's circuit breaker, recording its outcome.
+
+    Raises CircuitOpenError without sending anything while the circuit is open.
+    """
+    if not allow_request(name):
+        raise CircuitOpenError(f"{name} is unavailable, its circuit breaker is open")
+    try:
+        response = requests.request(method, url, **kwargs)
+    except requests.RequestException:
+        record_failure(name)
+        raise
+    if is_failure_status(response.status_code):
+        record_failure(name)
+    else:
+        record_success(name)
+    return response
+
+def salad_timeout() -> tuple:
+    return (settings.SALAD_CONNECT_TIMEOUT_SECONDS, settings.SALAD_READ_TIMEOUT_SECONDS)
@@ -1,54 +1,55 @@
 from app.commons.environment_manager import load_env
-from openai import OpenAI
-import os
+from app.usecases.generation.llm_gateway import chat_completion, chat_completion_async
 import json
 
 load_env()
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
 
-def generate_flashcards(transcript: str, language: str = "") -> dict:
-    """Generate a set of flashcards from the provided transcript using OpenAI."""
-    try:
-        flashcards_text = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"Please generate a set of flashcards based on the following content using the language of {language}. If the language is empty or not provided, then autodetect the language."
-                },
-                {
-                    "role": "user",
-                    "content": transcript
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "flashcard_generation",
-                    "schema": {
+FLASHCARD_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "flashcard_generation",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "flashcards": {
+                    "type": "array",
+                    "items": {
                         "type": "object",
                         "properties": {
-                            "flashcards": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "question": {"type": "string"},
-                                        "answer": {"type": "string"}
-                                    },
-                                    "required": ["question", "answer"],
-                                    "additionalProperties": False
-                                }
-                            }
+                            "question": {"type": "string"},
+                            "answer": {"type": "string"}
                         },
-                        "required": ["flashcards"],
+                        "required": ["question", "answer"],
                         "additionalProperties": False
-                    },
-                    "strict": True
+                    }
                 }
-            }
+            },
+            "required": ["flashcards"],
+            "additionalProperties": False
+        },
+        "strict": True
+    }
+}
+
+def build_flashcard_messages(transcript: str, language: str = "") -> list:
+    return [
+        {
+            "role": "system",
+            "content": f"Please generate a set of flashcards based on the following content using the language of {language}. If the language is empty or not provided, then autodetect the language."
+        },
+        {
+            "role": "user",
+            "content": transcript
+        }
+    ]
+
+def generate_flashcards(transcript: str, language: str = "") -> dict:
+    """Generate a set of flashcards from the provided transcript using OpenAI."""
+    try:
+        flashcards_text = chat_completion(
+            model="gpt-4o-mini",
+            messages=build_flashcard_messages(transcript, language),
+            response_format=FLASHCARD_RESPONSE_FORMAT
         )
         # Extract the 'content' field
         flashcards_json_str = flashcards_text.choices[0].message.content
@@ -69,3 +70,29 @@ def generate_flashcards(transcript: str, language: str = "") -> dict:
                 "message": str(e)
             }
         }
+
+async def generate_flashcards_async(transcript: str, language: str = "") -> dict:
+    """Generate a set of flashcards without blocking the event loop, through the async LLM gateway."""
+    try:
+        flashcards_text = await chat_completion_async(
+            model="gpt-4o-mini",
+            messages=build_flashcard_messages(transcript, language),
+            response_format=FLASHCARD_RESPONSE_FORMAT
+        )
+        flashcards = json.loads(flashcards_text.choices[0].message.content)
+
+        return {
+            "success": True,
+            "data": {
+                "flashcards": flashcards["flashcards"]
+            },
+            "error": None
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": {
+                "type": "FlashcardGenerationError",
+                "message": str(e)
+            }
+        }
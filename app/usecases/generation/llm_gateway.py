@@ -0,0 +1,351 @@
+# Single entry point for every call to an LLM provider (OpenAI and Replicate).
+#
+# The gateway owns pooled HTTP connections, retries rate limits, server errors and
+# dropped connections with jittered exponential backoff, enforces a deadline per call
+# (covering all of its retries) and caps the number of in-flight calls per model.
+# Calls also draw from the cluster-wide rate limit budget of their model (see rate_limiter).
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from typing import AsyncIterator, Optional
+
+import httpx
+import openai
+import replicate
+from replicate.exceptions import ModelError, ReplicateError
+
+from app.commons.environment_manager import load_env
+from app.config import settings
+from app.usecases.generation.rate_limiter import (
+    estimate_request_tokens,
+    notify_wait,
+    reconcile,
+    reconcile_async,
+    try_acquire,
+    try_acquire_async,
+)
+
+load_env()
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+REPLICATE_TERMINAL_STATUSES = {"succeeded", "failed", "canceled"}
+REPLICATE_POLL_SECONDS = 0.5
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+def _http_timeout(deadline_seconds: float) -> httpx.Timeout:
+    return httpx.Timeout(deadline_seconds, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+
+_http_limits = httpx.Limits(
+    max_connections=settings.LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+)
+
+# Retries are handled here, so the SDKs' own retry loops are disabled
+openai_client = openai.OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=0,
+    timeout=_http_timeout(settings.LLM_DEADLINE_SECONDS),
+    http_client=openai.DefaultHttpxClient(limits=_http_limits)
+)
+async_openai_client = openai.AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=0,
+    timeout=_http_timeout(settings.LLM_DEADLINE_SECONDS),
+    http_client=openai.DefaultAsyncHttpxClient(limits=_http_limits)
+)
+replicate_client = replicate.Client(
+    api_token=os.getenv("REPLICATE_API_TOKEN"),
+    timeout=_http_timeout(settings.LLM_DEADLINE_SECONDS),
+    limits=_http_limits
+)
+
+def model_concurrency(model: str) -> int:
+    return settings.LLM_MODEL_CONCURRENCY.get(model, settings.LLM_MAX_CONCURRENCY_PER_MODEL)
+
+_semaphores_lock = threading.Lock()
+_semaphores = {}
+# asyncio semaphores belong to the loop they are used on (Celery workers and the API run different loops)
+_async_semaphores = weakref.WeakKeyDictionary()
+
+def _model_semaphore(model: str) -> threading.BoundedSemaphore:
+    with _semaphores_lock:
+        if model not in _semaphores:
+            _semaphores[model] = threading.BoundedSemaphore(model_concurrency(model))
+        return _semaphores[model]
+
+def _async_model_semaphore(model: str) -> asyncio.Semaphore:
+    semaphores = _async_semaphores.setdefault(asyncio.get_running_loop(), {})
+    if model not in semaphores:
+        semaphores[model] = asyncio.Semaphore(model_concurrency(model))
+    return semaphores[model]
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, ReplicateError):
+        return error.status in RETRYABLE_STATUS_CODES
+    return False
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, error: Optional[Exception] = None) -> float:
+    """Full-jitter exponential backoff, honouring the provider's Retry-After header when it sends one."""
+    retry_after = _retry_after(error) if error is not None else None
+    if retry_after is not None:
+        return min(retry_after, settings.LLM_BACKOFF_MAX_SECONDS)
+    ceiling = min(settings.LLM_BACKOFF_MAX_SECONDS, settings.LLM_BACKOFF_BASE_SECONDS * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+class _Deadline:
+    def __init__(self, seconds: Optional[float]):
+        self.expires_at = time.monotonic() + (seconds or settings.LLM_DEADLINE_SECONDS)
+
+    def remaining(self) -> float:
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise LLMDeadlineExceeded("LLM call deadline exceeded")
+        return remaining
+
+    def next_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """Delay before retrying after error, or None when the call should fail now."""
+        if attempt >= settings.LLM_MAX_RETRIES or not is_retryable(error):
+            return None
+        delay = backoff_delay(attempt, error)
+        if time.monotonic() + delay >= self.expires_at:
+            return None
+        return delay
+
+def _acquire_model_slot(model: str, deadline: _Deadline) -> threading.BoundedSemaphore:
+    semaphore = _model_semaphore(model)
+    if not semaphore.acquire(timeout=deadline.remaining()):
+        raise LLMDeadlineExceeded(f"Timed out waiting for a free {model} slot")
+    return semaphore
+
+async def _acquire_model_slot_async(model: str, deadline: _Deadline) -> asyncio.Semaphore:
+    semaphore = _async_model_semaphore(model)
+    try:
+        await asyncio.wait_for(semaphore.acquire(), deadline.remaining())
+    except asyncio.TimeoutError:
+        raise LLMDeadlineExceeded(f"Timed out waiting for a free {model} slot")
+    return semaphore
+
+def _budget_wait(provider: str, model: str, wait: float, deadline: _Deadline, notified: bool) -> float:
+    """Seconds to sleep before asking for budget again, reporting the wait the first time."""
+    if wait >= deadline.remaining():
+        raise LLMDeadlineExceeded(f"Rate limit budget for {provider}:{model} is exhausted past the call's deadline")
+    if not notified:
+        notify_wait(provider, model, wait)
+    # Re-check periodically: budget given back by other calls may arrive sooner
+    return min(wait, settings.RATE_LIMIT_MAX_POLL_SECONDS) + random.uniform(0, 0.1)
+
+def _wait_for_budget(provider: str, model: str, tokens: int, deadline: _Deadline):
+    notified = False
+    while True:
+        wait = try_acquire(provider, model, tokens)
+        if wait <= 0:
+            return
+        time.sleep(_budget_wait(provider, model, wait, deadline, notified))
+        notified = True
+
+async def _wait_for_budget_async(provider: str, model: str, tokens: int, deadline: _Deadline):
+    notified = False
+    while True:
+        wait = await try_acquire_async(provider, model, tokens)
+        if wait <= 0:
+            return
+        await asyncio.sleep(_budget_wait(provider, model, wait, deadline, notified))
+        notified = True
+
+def _usage_tokens(response) -> int:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", 0) or 0
+
+def _call_with_retries(model: str, deadline_seconds: Optional[float], call, provider: str = "openai", tokens: int = 0):
+    deadline = _Deadline(deadline_seconds)
+    attempt = 0
+    while True:
+        _wait_for_budget(provider, model, tokens, deadline)
+        semaphore = _acquire_model_slot(model, deadline)
+        try:
+            response = call(deadline.remaining())
+            if tokens:
+                reconcile(provider, model, tokens, _usage_tokens(response))
+            return response
+        except Exception as e:
+            error = e
+            # A failed call doesn't use its budget, give the reservation back
+            reconcile(provider, model, tokens, 0, failed=True)
+        finally:
+            semaphore.release()
+
+        delay = deadline.next_delay(attempt, error)
+        if delay is None:
+            raise error
+        print(f"Retrying {model} call in {delay:.1f}s after error: {str(error)}")
+        time.sleep(delay)
+        attempt += 1
+
+async def _call_with_retries_async(model: str, deadline_seconds: Optional[float], call, provider: str = "openai", tokens: int = 0):
+    deadline = _Deadline(deadline_seconds)
+    attempt = 0
+    while True:
+        await _wait_for_budget_async(provider, model, tokens, deadline)
+        semaphore = await _acquire_model_slot_async(model, deadline)
+        try:
+            response = await call(deadline.remaining())
+            if tokens:
+                await reconcile_async(provider, model, tokens, _usage_tokens(response))
+            return response
+        except Exception as e:
+            error = e
+            await reconcile_async(provider, model, tokens, 0, failed=True)
+        finally:
+            semaphore.release()
+
+        delay = deadline.next_delay(attempt, error)
+        if delay is None:
+            raise error
+        print(f"Retrying {model} call in {delay:.1f}s after error: {str(error)}")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+def chat_completion(model: str, messages: list, deadline_seconds: Optional[float] = None, **kwargs):
+    return _call_with_retries(
+        model,
+        deadline_seconds,
+        lambda remaining: openai_client.chat.completions.create(
+            model=model, messages=messages, timeout=_http_timeout(remaining), **kwargs
+        ),
+        tokens=estimate_request_tokens(messages)
+    )
+
+async def chat_completion_async(model: str, messages: list, deadline_seconds: Optional[float] = None, **kwargs):
+    return await _call_with_retries_async(
+        model,
+        deadline_seconds,
+        lambda remaining: async_openai_client.chat.completions.create(
+            model=model, messages=messages, timeout=_http_timeout(remaining), **kwargs
+        ),
+        tokens=estimate_request_tokens(messages)
+    )
+
+async def chat_completion_stream_async(model: str, messages: list, deadline_seconds: Optional[float] = None, **kwargs) -> AsyncIterator:
+    """Yield the chunks of a streamed chat completion.
+
+    Opening the stream is retried like any other call; once chunks have been
+    yielded a failure is raised to the caller, since the output can't be replayed.
+    The model's concurrency slot is held until the stream is consumed.
+    """
+    deadline = _Deadline(deadline_seconds)
+    tokens = estimate_request_tokens(messages)
+    attempt = 0
+    while True:
+        await _wait_for_budget_async("openai", model, tokens, deadline)
+        semaphore = await _acquire_model_slot_async(model, deadline)
+        try:
+            stream = await async_openai_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                # The final chunk then carries the usage, to settle the rate limit reservation
+                stream_options={"include_usage": True},
+                timeout=_http_timeout(deadline.remaining()),
+                **kwargs
+            )
+        except Exception as e:
+            semaphore.release()
+            await reconcile_async("openai", model, tokens, 0, failed=True)
+            delay = deadline.next_delay(attempt, e)
+            if delay is None:
+                raise
+            print(f"Retrying {model} stream in {delay:.1f}s after error: {str(e)}")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+
+        used_tokens = tokens
+        try:
+            async for chunk in stream:
+                if chunk.usage:
+                    used_tokens = chunk.usage.total_tokens
+                deadline.remaining()
+                yield chunk
+            return
+        finally:
+            await stream.close()
+            semaphore.release()
+            await reconcile_async("openai", model, tokens, used_tokens)
+
+def transcription(file, model: str = "whisper-1", deadline_seconds: Optional[float] = None, **kwargs):
+    """Transcribe an open audio file, or a (filename, file) pair for files without a usable name."""
+    def call(remaining: float):
+        # A retry re-uploads the file from the start
+        (file[1] if isinstance(file, tuple) else file).seek(0)
+        return openai_client.audio.transcriptions.create(
+            model=model, file=file, timeout=_http_timeout(remaining), **kwargs
+        )
+    return _call_with_retries(model, deadline_seconds or settings.LLM_TRANSCRIPTION_DEADLINE_SECONDS, call)
+
+def replicate_run(model: str, input: dict, deadline_seconds: Optional[float] = None):
+    """Run a Replicate model to completion and return its output, cancelling the prediction if the deadline passes."""
+    def call(remaining: float):
+        expires_at = time.monotonic() + remaining
+        prediction = replicate_client.models.predictions.create(model=model, input=input)
+        while prediction.status not in REPLICATE_TERMINAL_STATUSES:
+            if time.monotonic() >= expires_at:
+                prediction.cancel()
+                raise LLMDeadlineExceeded(f"Replicate prediction {prediction.id} exceeded its deadline")
+            time.sleep(REPLICATE_POLL_SECONDS)
+            prediction.reload()
+        if prediction.status != "succeeded":
+            raise ModelError(prediction)
+        return prediction.output
+    return _call_with_retries(model, deadline_seconds, call, provider="replicate")
+
+async def replicate_stream_async(model: str, input: dict, deadline_seconds: Optional[float] = None) -> AsyncIterator:
+    """Yield the server-sent events of a streamed Replicate prediction.
+
+    Like chat_completion_stream_async, only starting the prediction is retried.
+    """
+    deadline = _Deadline(deadline_seconds)
+    attempt = 0
+    while True:
+        await _wait_for_budget_async("replicate", model, 0, deadline)
+        semaphore = await _acquire_model_slot_async(model, deadline)
+        try:
+            prediction = await replicate_client.models.predictions.async_create(model=model, input=input, stream=True)
+        except Exception as e:
+            semaphore.release()
+            await reconcile_async("replicate", model, 0, 0, failed=True)
+            delay = deadline.next_delay(attempt, e)
+            if delay is None:
+                raise
+            print(f"Retrying {model} stream in {delay:.1f}s after error: {str(e)}")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+
+        try:
+            async for event in prediction.async_stream():
+                deadline.remaining()
+                yield event
+            return
+        except LLMDeadlineExceeded:
+            await prediction.async_cancel()
+            raise
+        finally:
+            semaphore.release()
@@ -0,0 +1,19 @@
+# pick the summary generation mode requested by a generation endpoint
+from app.usecases.generation.study_pack_generation import generate_study_pack_async, stream_study_pack_async
+from app.usecases.generation.summary_generation import generate_summary_async, stream_summary_async
+
+async def summary_events_async(transcript: str, language: str = "", context: str = "", stream: bool = False, study_pack: bool = False):
+    """Generate the content of a new note, as the events stream_summary_async yields.
+
+    With `stream`, markdown deltas are yielded as `partial` events before the
+    final `complete` event; otherwise only the `complete` event is yielded.
+    With `study_pack`, the response data also carries `flashcards` and `quizzes`.
+    """
+    if stream:
+        summarize = stream_study_pack_async if study_pack else stream_summary_async
+        async for event in summarize(transcript, language, context):
+            yield event
+        return
+
+    generate = generate_study_pack_async if study_pack else generate_summary_async
+    yield {"type": "complete", "response": await generate(transcript, language, context)}
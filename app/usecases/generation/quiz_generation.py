@@ -1,60 +1,59 @@
 from app.commons.environment_manager import load_env
-from openai import OpenAI
-import os
+from app.usecases.generation.llm_gateway import chat_completion, chat_completion_async
 import json
 
 load_env()
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
 
-import json
-
-def generate_quizzes(transcript: str, language: str = "") -> dict:
-    """Generate a set of quizzes with multiple-choice questions and answer indices from the provided transcript using OpenAI."""
-    try:
-        quizzes_text = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"Please generate a set of quiz questions based on the following content using the language of {language}. If the language is empty or not provided, then autodetect the language."
-                },
-                {
-                    "role": "user",
-                    "content": transcript
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "quiz_generation",
-                    "schema": {
+QUIZ_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "quiz_generation",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "quizzes": {
+                    "type": "array",
+                    "items": {
                         "type": "object",
                         "properties": {
-                            "quizzes": {
+                            "question": {"type": "string"},
+                            "choices": {
                                 "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "question": {"type": "string"},
-                                        "choices": {
-                                            "type": "array",
-                                            "items": {"type": "string"}
-                                        },
-                                        "answer": {"type": "integer"}
-                                    },
-                                    "required": ["question", "choices", "answer"],
-                                    "additionalProperties": False
-                                }
-                            }
+                                "items": {"type": "string"}
+                            },
+                            "answer": {"type": "integer"}
                         },
-                        "required": ["quizzes"],
+                        "required": ["question", "choices", "answer"],
                         "additionalProperties": False
-                    },
-                    "strict": True
+                    }
                 }
-            }
+            },
+            "required": ["quizzes"],
+            "additionalProperties": False
+        },
+        "strict": True
+    }
+}
+
+def build_quiz_messages(transcript: str, language: str = "") -> list:
+    return [
+        {
+            "role": "system",
+            "content": f"Please generate a set of quiz questions based on the following content using the language of {language}. If the language is empty or not provided, then autodetect the language."
+        },
+        {
+            "role": "user",
+            "content": transcript
+        }
+    ]
+
+def generate_quizzes(transcript: str, language: str = "") -> dict:
+    """Generate a set of quizzes with multiple-choice questions and answer indices from the provided transcript using OpenAI."""
+    try:
+        quizzes_text = chat_completion(
+            model="gpt-4o-mini",
+            messages=build_quiz_messages(transcript, language),
+            response_format=QUIZ_RESPONSE_FORMAT
         )
       
         # Extract the 'content' field
@@ -76,3 +75,29 @@ def generate_quizzes(transcript: str, language: str = "") -> dict:
                 "message": str(e)
             }
         }
+
+async def generate_quizzes_async(transcript: str, language: str = "") -> dict:
+    """Generate a set of quizzes without blocking the event loop, through the async LLM gateway."""
+    try:
+        quizzes_text = await chat_completion_async(
+            model="gpt-4o-mini",
+            messages=build_quiz_messages(transcript, language),
+            response_format=QUIZ_RESPONSE_FORMAT
+        )
+        quizzes = json.loads(quizzes_text.choices[0].message.content)
+
+        return {
+            "success": True,
+            "data": {
+                "quizzes": quizzes["quizzes"]
+            },
+            "error": None
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": {
+                "type": "QuizGenerationError",
+                "message": str(e)
+            }
+        }
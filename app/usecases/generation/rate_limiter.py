@@ -0,0 +1,199 @@
+# Cluster-wide token buckets for LLM providers, shared by every API and Celery worker through Redis.
+#
+# Each "provider:model" pair has a request bucket (rpm) and a token bucket (tpm) that refill
+# continuously. A call reserves one request and its estimated tokens before it is sent; once
+# the provider reports the real usage the token bucket is corrected, and a failed call gives
+# back its whole reservation, request included. When a bucket is empty
+# callers wait for it to refill instead of failing, and whoever is listening is told about it.
+import asyncio
+import contextvars
+import math
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Optional
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.commons.text_chunking import estimate_tokens
+from app.config import settings
+
+redis_client = Redis.from_url(settings.REDIS_URL)
+async_redis_client = AsyncRedis.from_url(settings.REDIS_URL)
+
+# Buckets untouched for this long are full again, so they can be dropped
+BUCKET_TTL = 120
+
+# Returns the seconds to wait before the reservation fits (as a string, Lua numbers are truncated to integers)
+ACQUIRE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rpm, tpm = tonumber(ARGV[1]), tonumber(ARGV[2])
+local want_requests, want_tokens = tonumber(ARGV[3]), math.min(tonumber(ARGV[4]), tpm)
+local bucket = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'ts')
+local requests = tonumber(bucket[1]) or rpm
+local tokens = tonumber(bucket[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(bucket[3]) or now))
+requests = math.min(rpm, requests + elapsed * rpm / 60)
+tokens = math.min(tpm, tokens + elapsed * tpm / 60)
+local wait = 0
+if rpm > 0 and requests < want_requests then
+    wait = math.max(wait, (want_requests - requests) * 60 / rpm)
+end
+if tpm > 0 and tokens < want_tokens then
+    wait = math.max(wait, (want_tokens - tokens) * 60 / tpm)
+end
+if wait == 0 then
+    if rpm > 0 then requests = requests - want_requests end
+    if tpm > 0 then tokens = tokens - want_tokens end
+end
+redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return tostring(wait)
+"""
+
+# Gives back (or takes) the difference between the reserved and the actual token usage,
+# and gives back the request of a failed call
+RECONCILE_SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'requests', 'tokens')
+local requests, tokens = tonumber(bucket[1]), tonumber(bucket[2])
+if tokens and tonumber(ARGV[1]) > 0 then
+    redis.call('HSET', KEYS[1], 'tokens', math.min(tonumber(ARGV[1]), tokens + tonumber(ARGV[2])))
+end
+if requests and tonumber(ARGV[3]) > 0 then
+    redis.call('HSET', KEYS[1], 'requests', math.min(tonumber(ARGV[3]), requests + tonumber(ARGV[4])))
+end
+return 0
+"""
+
+_acquire = redis_client.register_script(ACQUIRE_SCRIPT)
+_acquire_async = async_redis_client.register_script(ACQUIRE_SCRIPT)
+_reconcile = redis_client.register_script(RECONCILE_SCRIPT)
+_reconcile_async = async_redis_client.register_script(RECONCILE_SCRIPT)
+
+# Called with (provider, model, seconds) whenever a call has to wait for its budget
+rate_limit_listener: contextvars.ContextVar[Optional[Callable[[str, str, float], None]]] = contextvars.ContextVar(
+    "rate_limit_listener", default=None
+)
+
+def rate_limit_key(provider: str, model: str) -> str:
+    return f"rate_limit:{provider}:{model}"
+
+def get_limits(provider: str, model: str) -> Optional[dict]:
+    limits = settings.RATE_LIMITS.get(f"{provider}:{model}")
+    if not limits or not (limits.get("rpm") or limits.get("tpm")):
+        return None
+    return limits
+
+def estimate_request_tokens(messages: list) -> int:
+    """Tokens to reserve for a chat call: its prompt plus the completion we expect back."""
+    prompt = "".join(message["content"] for message in messages if isinstance(message.get("content"), str))
+    return estimate_tokens(prompt) + settings.RATE_LIMIT_COMPLETION_TOKENS
+
+def _acquire_args(limits: dict, tokens: int) -> list:
+    return [limits.get("rpm", 0), limits.get("tpm", 0), 1, tokens, BUCKET_TTL]
+
+def notify_wait(provider: str, model: str, seconds: float):
+    listener = rate_limit_listener.get()
+    if listener is None:
+        return
+    try:
+        listener(provider, model, seconds)
+    except Exception as e:
+        print(f"Rate limit listener failed: {str(e)}")
+
+def try_acquire(provider: str, model: str, tokens: int) -> float:
+    """Reserve one request and `tokens` tokens; return 0 when granted, otherwise the seconds until they would fit.
+
+    The limiter fails open: if Redis is unreachable the call goes ahead.
+    """
+    limits = get_limits(provider, model)
+    if limits is None:
+        return 0
+    try:
+        return float(_acquire(keys=[rate_limit_key(provider, model)], args=_acquire_args(limits, tokens)))
+    except Exception as e:
+        print(f"Rate limiter unavailable for {provider}:{model}: {str(e)}")
+        return 0
+
+async def try_acquire_async(provider: str, model: str, tokens: int) -> float:
+    limits = get_limits(provider, model)
+    if limits is None:
+        return 0
+    try:
+        return float(await _acquire_async(keys=[rate_limit_key(provider, model)], args=_acquire_args(limits, tokens)))
+    except Exception as e:
+        print(f"Rate limiter unavailable for {provider}:{model}: {str(e)}")
+        return 0
+
+def _reconcile_args(limits: Optional[dict], reserved_tokens: int, actual_tokens: int, failed: bool) -> Optional[list]:
+    """Script arguments to settle a reservation, or None when there is nothing to give back."""
+    if limits is None:
+        return None
+    tokens = reserved_tokens - actual_tokens if limits.get("tpm") else 0
+    requests = 1 if failed and limits.get("rpm") else 0
+    if not tokens and not requests:
+        return None
+    return [limits.get("tpm", 0), tokens, limits.get("rpm", 0), requests]
+
+def reconcile(provider: str, model: str, reserved_tokens: int, actual_tokens: int, failed: bool = False):
+    """Settle a reservation with the tokens actually used; a `failed` call also gives back its request."""
+    args = _reconcile_args(get_limits(provider, model), reserved_tokens, actual_tokens, failed)
+    if args is None:
+        return
+    try:
+        _reconcile(keys=[rate_limit_key(provider, model)], args=args)
+    except Exception as e:
+        print(f"Rate limiter unavailable for {provider}:{model}: {str(e)}")
+
+async def reconcile_async(provider: str, model: str, reserved_tokens: int, actual_tokens: int, failed: bool = False):
+    args = _reconcile_args(get_limits(provider, model), reserved_tokens, actual_tokens, failed)
+    if args is None:
+        return
+    try:
+        await _reconcile_async(keys=[rate_limit_key(provider, model)], args=args)
+    except Exception as e:
+        print(f"Rate limiter unavailable for {provider}:{model}: {str(e)}")
+
+def rate_limit_wait_message(seconds: float) -> str:
+    return f"Waiting for model capacity (about {math.ceil(seconds)}s)..."
+
+@contextmanager
+def on_rate_limit_wait(listener: Callable[[str, str, float], None]):
+    """Report every wait for rate limit budget made in this context (and tasks/threads started from it) to listener."""
+    token = rate_limit_listener.set(listener)
+    try:
+        yield
+    finally:
+        rate_limit_listener.reset(token)
+
+async def with_rate_limit_waits(events: AsyncIterator) -> AsyncIterator:
+    """Iterate events, interleaving {"type": "rate_limited", "model": ..., "wait": seconds} events
+    whenever an LLM call made while producing them has to wait for budget."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def listener(provider: str, model: str, seconds: float):
+        # Calls may be made from worker threads (run_in_threadpool)
+        loop.call_soon_threadsafe(queue.put_nowait, ("event", {"type": "rate_limited", "model": model, "wait": seconds}))
+
+    async def produce():
+        try:
+            async for event in events:
+                await queue.put(("event", event))
+            await queue.put(("done", None))
+        except Exception as e:
+            await queue.put(("error", e))
+
+    context = contextvars.copy_context()
+    context.run(rate_limit_listener.set, listener)
+    producer = asyncio.create_task(produce(), context=context)
+    try:
+        while True:
+            kind, item = await queue.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise item
+            yield item
+    finally:
+        producer.cancel()
@@ -0,0 +1,207 @@
+# Waiting for Salad transcription jobs without blocking a thread.
+#
+# A job is polled on a schedule derived from the expected processing time of its audio: the
+# first check comes around when the job should be done, later ones back off geometrically.
+# When Salad calls our webhook the job is flagged as finished on Redis, which wakes every waiter
+# (in any API or Celery worker) immediately instead of at its next poll. The webhook only wakes
+# waiters: the job itself is always read back from the jobs API, never taken from the delivery.
+#
+# A caller racing the job against other backends (the transcription router's hedging) can set
+# cancel_event; the wait then cancels the job on Salad instead of following it to the end.
+import asyncio
+import base64
+import contextvars
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
+import requests
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.config import settings
+from app.usecases.generation.circuit_breaker import SALAD_JOBS_CIRCUIT, guarded_request, salad_timeout
+
+redis_client = Redis.from_url(settings.REDIS_URL)
+
+SALAD_JOBS_URL = "https://api.salad.com/api/public/organizations/fmtpla/inference-endpoints/transcribe/jobs"
+
+FINAL_STATUSES = ("succeeded", "failed", "canceled")
+
+# Used to estimate the duration of audio from its size (128 kbps)
+AUDIO_BYTES_PER_SECOND = 16000
+
+# Duration assumed when the audio size is unknown
+DEFAULT_AUDIO_SECONDS = 600
+
+# Jobs flagged finished by the webhook stay flagged this long, for waiters that subscribe late
+JOB_DONE_TTL = 600
+
+# Webhook deliveries older than this are rejected, so captured requests can't be replayed
+WEBHOOK_TOLERANCE_SECONDS = 300
+
+# How often a cancellable wait checks whether its job is still wanted
+CANCEL_CHECK_SECONDS = 1
+
+# Set (to an event of the caller's) when the job may become unneeded; once the event is set, the job is canceled
+cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar("salad_job_cancel_event", default=None)
+
+class JobCanceledError(Exception):
+    pass
+
+def _done_key(job_id: str) -> str:
+    return f"salad_job_done_flag:{job_id}"
+
+def _channel(job_id: str) -> str:
+    return f"salad_job_done:{job_id}"
+
+def _headers() -> dict:
+    return {"Salad-Api-key": os.getenv("SALAD_API_KEY")}
+
+def estimate_audio_seconds(audio_url: str) -> float:
+    """Estimate the duration of the audio from its Content-Length, without downloading it."""
+    try:
+        response = requests.head(audio_url, allow_redirects=True, timeout=salad_timeout())
+        size = int(response.headers.get("Content-Length", 0))
+    except Exception as e:
+        print(f"Failed to read the size of {audio_url}: {str(e)}")
+        size = 0
+    return size / AUDIO_BYTES_PER_SECOND if size else DEFAULT_AUDIO_SECONDS
+
+def poll_delays(audio_seconds: float) -> Iterator[float]:
+    """Delays between status checks: first around the expected processing time, then growing by half each time."""
+    delay = audio_seconds * settings.SALAD_JOB_REALTIME_FACTOR
+    while True:
+        delay = min(max(delay, settings.SALAD_JOB_POLL_MIN_SECONDS), settings.SALAD_JOB_POLL_MAX_SECONDS)
+        yield delay
+        delay *= 1.5
+
+def webhook_enabled() -> bool:
+    """The webhook is only registered (and accepted) when deliveries can be verified."""
+    return bool(settings.SALAD_WEBHOOK_URL and settings.SALAD_WEBHOOK_SECRET)
+
+def create_job(audio_url: str) -> str:
+    """Submit a transcription job for the audio and return its id."""
+    data = {"input": {"url": audio_url}}
+    if webhook_enabled():
+        data["webhook"] = settings.SALAD_WEBHOOK_URL
+    elif settings.SALAD_WEBHOOK_URL:
+        print("SALAD_WEBHOOK_URL is set without SALAD_WEBHOOK_SECRET, not registering the webhook")
+    response = guarded_request(
+        SALAD_JOBS_CIRCUIT, "POST", SALAD_JOBS_URL,
+        headers={"Content-Type": "application/json", **_headers()}, json=data, timeout=salad_timeout(),
+    )
+    response.raise_for_status()
+    return response.json()["id"]
+
+def get_job(job_id: str) -> dict:
+    # Not behind the circuit breaker: a job already submitted (and paid for) is followed to the end
+    response = requests.get(f"{SALAD_JOBS_URL}/{job_id}", headers=_headers(), timeout=salad_timeout())
+    response.raise_for_status()
+    return response.json()
+
+def cancel_job(job_id: str):
+    """Cancel a job nobody needs any more, so Salad stops processing (and billing) it."""
+    try:
+        response = requests.delete(f"{SALAD_JOBS_URL}/{job_id}", headers=_headers(), timeout=salad_timeout())
+        response.raise_for_status()
+    except Exception as e:
+        print(f"Failed to cancel Salad job {job_id}: {str(e)}")
+
+def notify_job_done(job_id: str):
+    """Wake whoever is waiting for the job, so they fetch its final state now."""
+    try:
+        redis_client.set(_done_key(job_id), 1, ex=JOB_DONE_TTL)
+        redis_client.publish(_channel(job_id), "done")
+    except Exception as e:
+        print(f"Failed to notify Salad job {job_id}: {str(e)}")
+
+async def wait_for_job(job_id: str, audio_seconds: float, timeout: Optional[float] = None) -> dict:
+    """Wait until the job reaches a final state and return it.
+
+    Polls the jobs API on the poll_delays schedule, polling early when the webhook flags the job finished.
+    Raises JobCanceledError, after canceling the job, once the caller's cancel_event is set.
+    """
+    timeout = settings.SALAD_JOB_TIMEOUT_SECONDS if timeout is None else timeout
+    cancelled = cancel_event.get()
+    flagged_done = False
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    # Bound to this event loop, the sync wrapper runs every wait in a loop of its own
+    client = AsyncRedis.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub()
+    try:
+        try:
+            # Subscribe before the first check, so a webhook arriving in between isn't missed
+            await pubsub.subscribe(_channel(job_id))
+        except Exception as e:
+            print(f"Salad job notifications unavailable, polling only: {str(e)}")
+            pubsub = None
+
+        for delay in poll_delays(audio_seconds):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"Transcription job {job_id} did not finish within {timeout}s")
+            wake_at = loop.time() + min(delay, remaining)
+            try:
+                # The flag stays set, so it only cuts one wait short: if the jobs API doesn't show
+                # the job finished yet, polling goes back to the schedule
+                if pubsub is not None and not flagged_done and await client.exists(_done_key(job_id)):
+                    flagged_done = True
+                    wake_at = loop.time()
+            except Exception as e:
+                print(f"Salad job notifications unavailable, polling only: {str(e)}")
+                pubsub = None
+            # Waited in slices when cancellable, to notice a cancellation soon
+            while not (cancelled is not None and cancelled.is_set()) and (left := wake_at - loop.time()) > 0:
+                if cancelled is not None:
+                    left = min(left, CANCEL_CHECK_SECONDS)
+                if pubsub is None:
+                    await asyncio.sleep(left)
+                    continue
+                try:
+                    if await pubsub.get_message(ignore_subscribe_messages=True, timeout=left):
+                        break
+                except Exception as e:
+                    print(f"Salad job notifications unavailable, polling only: {str(e)}")
+                    pubsub = None
+
+            if cancelled is not None and cancelled.is_set():
+                await asyncio.to_thread(cancel_job, job_id)
+                raise JobCanceledError(f"Transcription job {job_id} was canceled, its result is no longer needed")
+
+            try:
+                job = await asyncio.to_thread(get_job, job_id)
+            except requests.RequestException as e:
+                # Salad having trouble doesn't lose the job, keep polling until the timeout
+                print(f"Failed to poll Salad job {job_id}: {str(e)}")
+                continue
+            if job["status"] in FINAL_STATUSES:
+                return job
+    finally:
+        try:
+            if pubsub is not None:
+                await pubsub.reset()
+            await client.connection_pool.disconnect()
+        except Exception:
+            pass
+
+def verify_webhook_signature(secret: str, webhook_id: str, timestamp: str, signature: str, body: bytes) -> bool:
+    """Check a Standard Webhooks signature ("v1,<base64 HMAC-SHA256 of id.timestamp.body>", space separated)."""
+    try:
+        if abs(time.time() - int(timestamp)) > WEBHOOK_TOLERANCE_SECONDS:
+            return False
+        key = base64.b64decode(secret.removeprefix("whsec_"))
+    except (TypeError, ValueError):
+        return False
+    signed = f"{webhook_id}.{timestamp}.".encode() + body
+    expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest()).decode()
+    for candidate in signature.split():
+        version, _, value = candidate.partition(",")
+        if version == "v1" and hmac.compare_digest(value, expected):
+            return True
+    return False
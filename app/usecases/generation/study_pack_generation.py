@@ -0,0 +1,94 @@
+# generate the summary, flashcards and quizzes of a note in a single completion
+from app.usecases.generation.flashcard_generation import FLASHCARD_RESPONSE_FORMAT
+from app.usecases.generation.quiz_generation import QUIZ_RESPONSE_FORMAT
+from app.usecases.generation.summary_generation import (
+    SUMMARY_RESPONSE_FORMAT,
+    build_summary_messages,
+    parse_summary_content,
+    prepare_summary_input_async,
+    stream_markdown_completion_async,
+)
+from app.usecases.generation.llm_gateway import chat_completion_async
+import json
+
+_summary_schema = SUMMARY_RESPONSE_FORMAT["json_schema"]["schema"]
+_flashcard_schema = FLASHCARD_RESPONSE_FORMAT["json_schema"]["schema"]["properties"]["flashcards"]
+_quiz_schema = QUIZ_RESPONSE_FORMAT["json_schema"]["schema"]["properties"]["quizzes"]
+
+STUDY_PACK_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "study_pack_generation",
+        "schema": {
+            "type": "object",
+            "properties": {
+                **_summary_schema["properties"],
+                "flashcards": _flashcard_schema,
+                "quizzes": _quiz_schema
+            },
+            "required": _summary_schema["required"] + ["flashcards", "quizzes"],
+            "additionalProperties": False
+        },
+        "strict": True
+    }
+}
+
+def build_study_pack_messages(transcript: str, language: str = "", context: str = "") -> list:
+    return build_summary_messages(transcript, language, context) + [
+        {
+            "role": "user",
+            "content": f"""
+                In the same JSON object, also add, using the same language as the summary:
+                - "flashcards": a set of flashcards, each with a "question" and an "answer"
+                - "quizzes": a set of multiple-choice quiz questions, each with a "question", its "choices" and the index of the correct choice as "answer"
+            """
+        }
+    ]
+
+def parse_study_pack_content(content: str) -> dict:
+    """Parse a study pack completion into the summary response, extended with flashcards and quizzes."""
+    summary_response = parse_summary_content(content)
+    if not summary_response['success']:
+        return summary_response
+
+    parsed_content = json.loads(content)
+    summary_response['data']['flashcards'] = parsed_content.get("flashcards", [])
+    summary_response['data']['quizzes'] = parsed_content.get("quizzes", [])
+    return summary_response
+
+async def generate_study_pack_async(transcript: str, language: str = "", context: str = "") -> dict:
+    """Generate the summary fields, flashcards and quizzes of a note in one structured completion."""
+    summary_input = await prepare_summary_input_async(transcript, language, context)
+    if not summary_input['success']:
+        return summary_input
+
+    try:
+        study_pack = await chat_completion_async(
+            model="gpt-4o-mini",
+            messages=build_study_pack_messages(summary_input['data']['transcript'], language, context),
+            response_format=STUDY_PACK_RESPONSE_FORMAT
+        )
+        return parse_study_pack_content(study_pack.choices[0].message.content.strip())
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": {
+                "type": "StudyPackGenerationError",
+                "message": str(e)
+            }
+        }
+
+async def stream_study_pack_async(transcript: str, language: str = "", context: str = ""):
+    """Same as generate_study_pack_async, streaming the markdown like stream_summary_async."""
+    summary_input = await prepare_summary_input_async(transcript, language, context)
+    if not summary_input['success']:
+        yield {"type": "complete", "response": summary_input}
+        return
+
+    async for event in stream_markdown_completion_async(
+        build_study_pack_messages(summary_input['data']['transcript'], language, context),
+        STUDY_PACK_RESPONSE_FORMAT,
+        parse_study_pack_content,
+    ):
+        yield event
@@ -1,102 +1,187 @@
 # generate the summary in md format
 from app.commons.environment_manager import load_env
-from openai import OpenAI
-import os
+from app.commons.incremental_json import JsonStringFieldStream
+from app.commons.text_chunking import chunk_text, estimate_tokens
+from app.config import settings
+from app.usecases.generation.llm_gateway import chat_completion_async, chat_completion_stream_async
+import asyncio
+import json
 
 load_env()
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
 
-def generate_summary(transcript: str, language: str="", context: str = "") -> dict:
-    """Generate a summary from the provided transcript using OpenAI."""
+SUMMARY_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "summary_generation",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "title": {"type": "string"},
+                "content_category": {"type": "string"},
+                "emoji_representation": {"type": "string"},
+                "lang": {"type": "string"},
+                "markdown": {"type": "string"}
+            },
+            "required": ["title", "content_category", "emoji_representation", "lang", "markdown"],
+            "additionalProperties": False
+        },
+        "strict": True
+    }
+}
+
+def build_summary_messages(transcript: str, language: str = "", context: str = "") -> list:
+    """Build the chat messages used to request a summary of the transcript."""
+    return [
+        {
+            "role": "system",
+            "content": f"Please generate a detailed markdown summary of the following content using the language of {language}. If the language is empty or not provided, then autodetect the language."
+        },
+        {
+            "role": "user",
+            "content": f"""
+                {transcript}
+
+                The context of the transcript is context = {context}. If the context is not provided, then interpret it from the transcript.
+
+                Please generate a detailed markdown summary that includes:
+                - A title (using `#` for the main title)
+                - Subheadings (using `##` for subtitles)
+                - Bullet points for key points
+                - Code blocks or other markdown features if applicable
+                - A conclusion section
+
+                Additionally, provide:
+                - A single phrase to categorize the content, e.g., technology, physics, food, animal
+                - An emoji that represents the content category
+                - Provide the language code of the content using ISO 639 language codes, e.g., eng, fra.
+
+                The output must be in the following JSON format:
+
+                {{
+                    "title" : "A concise title separate from the markdown title. Title using the language of {language}. If the language is empty or not provided, then autodetect the language. Do not translate the title.",
+                    "content_category": "Category Phrase (capitalize the first letter)",
+                    "emoji_representation": "Emoji",
+                    "lang": "language code here",
+                    "markdown": "Markdown content with properly escaped characters"
+                }}
+
+                The output must be well-structured, JSON formatted, and handle escape characters. Only return the JSON object, no additional tags or prefixes.
+            """
+        }
+    ]
+
+def parse_summary_content(content: str) -> dict:
+    """Parse the JSON content returned by the model into the summary response."""
     try:
-        summary_text = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"Please generate a detailed markdown summary of the following content using the language of {language}. If the language is empty or not provided, then autodetect the language."
-                },
-                {
-                    "role": "user",
-                    "content": f"""
-                        {transcript}
-
-                        The context of the transcript is context = {context}. If the context is not provided, then interpret it from the transcript.
-
-                        Please generate a detailed markdown summary that includes:
-                        - A title (using `#` for the main title)
-                        - Subheadings (using `##` for subtitles)
-                        - Bullet points for key points
-                        - Code blocks or other markdown features if applicable
-                        - A conclusion section
-
-                        Additionally, provide:
-                        - A single phrase to categorize the content, e.g., technology, physics, food, animal
-                        - An emoji that represents the content category
-                        - Provide the language code of the content using ISO 639 language codes, e.g., eng, fra.
-
-                        The output must be in the following JSON format:
-
-                        {{
-                            "title" : "A concise title separate from the markdown title. Title using the language of {language}. If the language is empty or not provided, then autodetect the language. Do not translate the title.",
-                            "content_category": "Category Phrase (capitalize the first letter)",
-                            "emoji_representation": "Emoji",
-                            "lang": "language code here",
-                            "markdown": "Markdown content with properly escaped characters"
-                        }}
-
-                        The output must be well-structured, JSON formatted, and handle escape characters. Only return the JSON object, no additional tags or prefixes.
-                    """
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "summary_generation",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "title": {"type": "string"},
-                            "content_category": {"type": "string"},
-                            "emoji_representation": {"type": "string"},
-                            "lang": {"type": "string"},
-                            "markdown": {"type": "string"}
-                        },
-                        "required": ["title", "content_category", "emoji_representation", "lang", "markdown"],
-                        "additionalProperties": False
-                    },
-                    "strict": True
-                }
+        parsed_content = json.loads(content)
+        return {
+            "success": True,
+            "data": {
+                "title": parsed_content.get("title"),
+                "content_category": parsed_content.get("content_category", ""),
+                "emoji_representation": parsed_content.get("emoji_representation", ""),
+                "lang": parsed_content.get("lang", "eng"),
+                "markdown": parsed_content.get("markdown", "")
+            },
+            "error": None
+        }
+    except json.JSONDecodeError as e:
+        return {
+            "success": False,
+            "error": {
+                "type": "JSONDecodeError",
+                "message": f"Failed to decode JSON: {str(e)}"
             }
-        )
-        # Extract the 'content' field
-        content = summary_text.choices[0].message.content.strip()
+        }
 
-        # Parse the JSON response
-        import json
-        try:
-            parsed_content = json.loads(content)
-            return {
-                "success": True,
-                "data": {
-                    "title": parsed_content.get("title"),
-                    "content_category": parsed_content.get("content_category", ""),
-                    "emoji_representation": parsed_content.get("emoji_representation", ""),
-                    "lang": parsed_content.get("lang", "eng"),
-                    "markdown": parsed_content.get("markdown", "")
-                },
-                "error": None
-            }
-        except json.JSONDecodeError as e:
-            return {
-                "success": False,
-                "error": {
-                    "type": "JSONDecodeError",
-                    "message": f"Failed to decode JSON: {str(e)}"
-                }
+def build_chunk_summary_messages(chunk: str, part: int, total: int, language: str = "", context: str = "") -> list:
+    """Build the messages for the map step: notes on one part of a long transcript."""
+    return [
+        {
+            "role": "system",
+            "content": f"You are taking notes on part {part} of {total} of a long recording. Write detailed markdown notes of this part only, using the language of {language}. If the language is empty or not provided, then autodetect the language."
+        },
+        {
+            "role": "user",
+            "content": f"""
+                {chunk}
+
+                The context of the recording is context = {context}. If the context is not provided, then interpret it from the transcript.
+
+                Keep every key point, definition, example and number. Do not add an introduction or a conclusion, only the notes.
+            """
+        }
+    ]
+
+async def summarize_transcript_chunks_async(transcript: str, language: str = "", context: str = "") -> dict:
+    """Map step of the long-transcript mode: summarize token-bounded chunks concurrently, in order."""
+    chunks = chunk_text(transcript, settings.SUMMARY_CHUNK_TOKENS)
+    semaphore = asyncio.Semaphore(settings.SUMMARY_MAX_PARALLEL_CHUNKS)
+
+    async def summarize_chunk(part: int, chunk: str) -> str:
+        async with semaphore:
+            response = await chat_completion_async(
+                model="gpt-4o-mini",
+                messages=build_chunk_summary_messages(chunk, part, len(chunks), language, context),
+            )
+            return response.choices[0].message.content.strip()
+
+    try:
+        notes = await asyncio.gather(*[summarize_chunk(i + 1, chunk) for i, chunk in enumerate(chunks)])
+        return {
+            "success": True,
+            "data": {
+                "notes": "\n\n".join(f"Part {i + 1}:\n{part_notes}" for i, part_notes in enumerate(notes))
+            },
+            "error": None
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": {
+                "type": "SummaryGenerationError",
+                "message": f"Failed to summarize transcript chunks: {str(e)}"
             }
+        }
+
+def is_long_transcript(transcript: str) -> bool:
+    return estimate_tokens(transcript) > settings.SUMMARY_LONG_TRANSCRIPT_TOKENS
+
+async def prepare_summary_input_async(transcript: str, language: str = "", context: str = "") -> dict:
+    """Return the text the final summary is generated from: the transcript itself, or its chunk notes when it is long."""
+    if not is_long_transcript(transcript):
+        return {"success": True, "data": {"transcript": transcript}, "error": None}
+
+    chunk_notes = await summarize_transcript_chunks_async(transcript, language, context)
+    if not chunk_notes['success']:
+        return chunk_notes
+    return {
+        "success": True,
+        "data": {
+            "transcript": f"The following are notes on consecutive parts of one long recording, in order:\n\n{chunk_notes['data']['notes']}"
+        },
+        "error": None
+    }
+
+async def generate_summary_async(transcript: str, language: str = "", context: str = "") -> dict:
+    """Generate a summary without blocking the event loop, through the async LLM gateway.
+
+    Transcripts longer than SUMMARY_LONG_TRANSCRIPT_TOKENS are summarized map-reduce
+    style: chunk notes are produced in parallel, then reduced into the usual summary.
+    """
+    summary_input = await prepare_summary_input_async(transcript, language, context)
+    if not summary_input['success']:
+        return summary_input
+    transcript = summary_input['data']['transcript']
+
+    try:
+        summary_text = await chat_completion_async(
+            model="gpt-4o-mini",
+            messages=build_summary_messages(transcript, language, context),
+            response_format=SUMMARY_RESPONSE_FORMAT
+        )
+        content = summary_text.choices[0].message.content.strip()
+        return parse_summary_content(content)
 
     except Exception as e:
         return {
@@ -105,4 +190,59 @@ def generate_summary(transcript: str, language: str="", context: str = "") -> di
                 "type": "SummaryGenerationError",
                 "message": str(e)
             }
-        }
\ No newline at end of file
+        }
+
+async def stream_markdown_completion_async(messages: list, response_format: dict, parse_content):
+    """Run a streamed JSON completion, yielding deltas of its `markdown` field as they arrive.
+
+    Yields {"type": "partial", "delta": ...} events, then a single
+    {"type": "complete", "response": parse_content(full_content)} event.
+    """
+    try:
+        stream = chat_completion_stream_async(
+            model="gpt-4o-mini",
+            messages=messages,
+            response_format=response_format
+        )
+        markdown_stream = JsonStringFieldStream("markdown")
+        content = []
+        async for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            content.append(chunk.choices[0].delta.content)
+            delta = markdown_stream.feed(chunk.choices[0].delta.content)
+            if delta:
+                yield {"type": "partial", "delta": delta}
+
+        yield {"type": "complete", "response": parse_content("".join(content).strip())}
+
+    except Exception as e:
+        yield {
+            "type": "complete",
+            "response": {
+                "success": False,
+                "error": {
+                    "type": "SummaryGenerationError",
+                    "message": str(e)
+                }
+            }
+        }
+
+async def stream_summary_async(transcript: str, language: str = "", context: str = ""):
+    """Stream a summary as it is generated.
+
+    Yields {"type": "partial", "delta": ...} events carrying new characters of the
+    `markdown` field, then a single {"type": "complete", "response": ...} event with
+    the same response generate_summary_async would have returned.
+    """
+    summary_input = await prepare_summary_input_async(transcript, language, context)
+    if not summary_input['success']:
+        yield {"type": "complete", "response": summary_input}
+        return
+
+    async for event in stream_markdown_completion_async(
+        build_summary_messages(summary_input['data']['transcript'], language, context),
+        SUMMARY_RESPONSE_FORMAT,
+        parse_summary_content,
+    ):
+        yield event
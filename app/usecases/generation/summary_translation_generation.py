@@ -1,32 +1,37 @@
 from app.commons.environment_manager import load_env
-from openai import OpenAI
-import os
+from app.commons.text_chunking import split_paragraph_segments
+from app.config import settings
+from app.usecases.generation.llm_gateway import chat_completion_async
+from redis.asyncio import Redis as AsyncRedis
+import asyncio
+import hashlib
 
 load_env()
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
 
-def translate_summary(summary: str, lang: str) -> dict:
-    """Translate a summary from the provided summary using OpenAI."""
+# Translation memory: translated segments keyed by (segment hash, target language)
+async_redis_client = AsyncRedis.from_url(settings.REDIS_URL)
+
+def build_translation_messages(summary: str, lang: str) -> list:
+    return [
+        {
+            "role": "user",
+            "content": f"""
+                Translate the following transcript into the language of {lang}:
+
+                {summary}                
+            """,
+        }
+    ]
+
+async def translate_summary_async(summary: str, lang: str) -> dict:
+    """Translate a summary without blocking the event loop, through the async LLM gateway."""
     try:
-        translation_response = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""
-                        Translate the following transcript into the language of {lang}:
-
-                        {summary}                
-                    """,
-                }
-            ],
+        translation_response = await chat_completion_async(
+            messages=build_translation_messages(summary, lang),
             model="gpt-4o-mini",
         )
-        
-        # Access the 'content' field correctly
         content = translation_response.choices[0].message.content.strip()
-    
+
         return {
             "success": True,
             "data": {
@@ -42,3 +47,62 @@ def translate_summary(summary: str, lang: str) -> dict:
                 "message": str(e)
             }
         }
+
+def translation_memory_key(segment: str, lang: str) -> str:
+    return f"translation_memory:{hashlib.sha256(segment.encode()).hexdigest()}:{lang.strip().lower()}"
+
+async def translate_transcript_events_async(transcript: str, lang: str):
+    """Translate a transcript paragraph by paragraph, with bounded parallelism and a translation memory.
+
+    Segments already translated into `lang` (by any note) are reused from Redis.
+    Yields {"type": "progress", "completed": n, "total": total} as segments finish,
+    then {"type": "complete", "response": ...} with the segments reassembled in order.
+    """
+    segments = split_paragraph_segments(transcript, settings.TRANSLATION_SEGMENT_TOKENS)
+    keys = [translation_memory_key(segment, lang) for segment in segments]
+    try:
+        remembered = await async_redis_client.mget(keys) if keys else []
+    except Exception as e:
+        print(f"Translation memory lookup failed: {str(e)}")
+        remembered = [None] * len(segments)
+
+    translations = [translation.decode() if translation else None for translation in remembered]
+    completed = sum(1 for translation in translations if translation is not None)
+    yield {"type": "progress", "completed": completed, "total": len(segments)}
+
+    semaphore = asyncio.Semaphore(settings.TRANSLATION_MAX_PARALLEL_SEGMENTS)
+
+    async def translate_segment(index: int) -> tuple:
+        async with semaphore:
+            return index, await translate_summary_async(segments[index], lang)
+
+    pending = [asyncio.create_task(translate_segment(i)) for i, translation in enumerate(translations) if translation is None]
+    try:
+        for next_done in asyncio.as_completed(pending):
+            index, translation = await next_done
+            if not translation['success']:
+                yield {"type": "complete", "response": translation}
+                return
+
+            translations[index] = translation['data']['translated_text']
+            try:
+                await async_redis_client.set(keys[index], translations[index], ex=settings.TRANSLATION_MEMORY_TTL)
+            except Exception as e:
+                print(f"Translation memory write failed: {str(e)}")
+            completed += 1
+            yield {"type": "progress", "completed": completed, "total": len(segments)}
+    finally:
+        # Also when the client disconnects and the generator is closed mid-translation
+        for task in pending:
+            task.cancel()
+
+    yield {
+        "type": "complete",
+        "response": {
+            "success": True,
+            "data": {
+                "translated_text": "\n\n".join(translations)
+            },
+            "error": None
+        }
+    }
@@ -0,0 +1,79 @@
+# Content-addressed transcript cache shared across users
+from typing import Optional
+
+from redis import Redis
+
+from app.config import settings
+from app.usecases.storage.audio_store import own_object_name
+
+redis_client = Redis.from_url(settings.REDIS_URL)
+
+# Cached source hashes are kept as long as the transcripts they point to
+AUDIO_HASH_TTL = settings.TRANSCRIPT_CACHE_TTL
+
+def youtube_cache_key(video_id: str, lang: str = "") -> str:
+    """Cache key for a YouTube transcript; `lang` is the caption language, or empty for speech recognition."""
+    return f"transcript:youtube:{video_id}:{lang or 'asr'}"
+
+def audio_cache_key(audio_sha256: str) -> str:
+    return f"transcript:audio:{audio_sha256}"
+
+def get_cached_transcript(key: str) -> Optional[str]:
+    try:
+        transcript = redis_client.get(key)
+        if transcript is not None:
+            # Keep popular content warm
+            redis_client.expire(key, settings.TRANSCRIPT_CACHE_TTL)
+            return transcript.decode()
+    except Exception as e:
+        print(f"Transcript cache lookup failed for {key}: {str(e)}")
+    return None
+
+def cache_transcript(key: str, transcript: str):
+    if not transcript:
+        return
+    try:
+        redis_client.set(key, transcript, ex=settings.TRANSCRIPT_CACHE_TTL)
+    except Exception as e:
+        print(f"Transcript cache write failed for {key}: {str(e)}")
+
+def cached_transcript_response(transcript: str, **data) -> dict:
+    return {
+        "success": True,
+        "data": {
+            "transcript": transcript,
+            "cached": True,
+            **data
+        },
+        "error": None
+    }
+
+def _audio_hash_key(audio_url: str) -> str:
+    # Stored object URLs come with and without a scheme, so key on what follows it
+    return f"audio_hash:{audio_url.split('://', 1)[-1]}"
+
+def remember_audio_hash(audio_url: str, audio_sha256: str):
+    """Remember the SHA-256 of the bytes behind an audio URL, e.g. when the file is uploaded.
+
+    Only objects in our bucket are remembered: their names are never reused, so the bytes behind
+    the URL can't change. Anything else may be replaced (a re-uploaded podcast episode) and has to
+    be fetched again.
+    """
+    if own_object_name(audio_url) is None:
+        return
+    try:
+        redis_client.set(_audio_hash_key(audio_url), audio_sha256, ex=AUDIO_HASH_TTL)
+    except Exception as e:
+        print(f"Failed to remember audio hash for {audio_url}: {str(e)}")
+
+def lookup_audio_hash(audio_url: str) -> Optional[str]:
+    """Return the SHA-256 already recorded for the audio URL, if any (only objects in our bucket have one)."""
+    if own_object_name(audio_url) is None:
+        return None
+    try:
+        known_hash = redis_client.get(_audio_hash_key(audio_url))
+        if known_hash:
+            return known_hash.decode()
+    except Exception as e:
+        print(f"Audio hash lookup failed for {audio_url}: {str(e)}")
+    return None
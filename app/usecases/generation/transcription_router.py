@@ -0,0 +1,226 @@
+# Picks the transcription backend for a request from live latency and error stats.
+#
+# Every backend call records its latency and outcome in Redis (a rolling window shared by
+# all workers). Requests go to the healthy backend with the lowest p50; if it hasn't answered
+# by its p95, a hedged request is sent to the next one and whichever succeeds first wins.
+# An unhealthy backend still gets one probe request per TRANSCRIPTION_PROBE_INTERVAL_SECONDS;
+# if the probe succeeds its error history is cleared and it competes normally again.
+#
+# Once a request is settled, calls still running for it are told to stop: a Salad job is canceled
+# on Salad. Calls that can't be interrupted (a plain HTTP request) run to the end on their own
+# thread, never taking a thread from the calls of other requests.
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Dict, List, Optional
+
+from redis import Redis
+
+from app.config import settings
+from app.usecases.generation.circuit_breaker import SALAD_ENDPOINT_CIRCUIT, SALAD_JOBS_CIRCUIT, is_open
+from app.usecases.generation.audio_transcribe_extraction import (
+    transcribe_audio,
+    transcribe_audio_salad,
+    transcribe_audio_whisper_openai,
+)
+from app.usecases.generation.salad_jobs import cancel_event
+from app.usecases.generation.youtube_transcript_extraction import generate_transcript, transcript_with_whisper
+
+redis_client = Redis.from_url(settings.REDIS_URL)
+
+# Candidate backends per kind of source, in order of preference when there are no stats yet
+BACKENDS: Dict[str, Dict[str, Callable[[str], dict]]] = {
+    "audio": {
+        "salad": transcribe_audio,
+        "salad_jobs": transcribe_audio_salad,
+        "whisper": transcribe_audio_whisper_openai,
+    },
+    "youtube": {
+        "youtube": generate_transcript,
+        "youtube_whisper": transcript_with_whisper,
+    },
+}
+
+# Circuit breaker guarding each backend's upstream service, if any
+BACKEND_CIRCUITS = {
+    "salad": SALAD_ENDPOINT_CIRCUIT,
+    "salad_jobs": SALAD_JOBS_CIRCUIT,
+    "youtube": SALAD_ENDPOINT_CIRCUIT,
+}
+
+STATS_TTL = 60 * 60 * 24 * 7
+
+def _latency_key(backend: str) -> str:
+    return f"transcription_stats:{backend}:latency"
+
+def _outcome_key(backend: str) -> str:
+    return f"transcription_stats:{backend}:outcome"
+
+def _probe_key(backend: str) -> str:
+    return f"transcription_probe:{backend}"
+
+def _claim_probe(backend: str) -> bool:
+    """Whether this request may probe the (unhealthy) backend; one request per interval may."""
+    try:
+        return bool(redis_client.set(_probe_key(backend), 1, nx=True, ex=settings.TRANSCRIPTION_PROBE_INTERVAL_SECONDS))
+    except Exception as e:
+        print(f"Failed to claim a transcription probe for {backend}: {str(e)}")
+        return False
+
+def reset_outcomes(backend: str):
+    """Forget a backend's past errors, once a probe shows it has recovered."""
+    try:
+        redis_client.delete(_outcome_key(backend))
+    except Exception as e:
+        print(f"Failed to reset transcription stats for {backend}: {str(e)}")
+
+def record_call(backend: str, seconds: float, success: bool):
+    try:
+        pipeline = redis_client.pipeline()
+        if success:
+            pipeline.lpush(_latency_key(backend), seconds)
+            pipeline.ltrim(_latency_key(backend), 0, settings.TRANSCRIPTION_STATS_WINDOW - 1)
+            pipeline.expire(_latency_key(backend), STATS_TTL)
+        pipeline.lpush(_outcome_key(backend), 1 if success else 0)
+        pipeline.ltrim(_outcome_key(backend), 0, settings.TRANSCRIPTION_STATS_WINDOW - 1)
+        pipeline.expire(_outcome_key(backend), STATS_TTL)
+        pipeline.execute()
+    except Exception as e:
+        print(f"Failed to record transcription stats for {backend}: {str(e)}")
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+def get_backend_stats(backend: str) -> dict:
+    """Rolling p50/p95 latency of successful calls and error rate of all calls for a backend."""
+    try:
+        pipeline = redis_client.pipeline()
+        pipeline.lrange(_latency_key(backend), 0, -1)
+        pipeline.lrange(_outcome_key(backend), 0, -1)
+        latencies, outcomes = pipeline.execute()
+    except Exception as e:
+        print(f"Failed to read transcription stats for {backend}: {str(e)}")
+        latencies, outcomes = [], []
+
+    latencies = [float(value) for value in latencies]
+    outcomes = [int(value) for value in outcomes]
+    return {
+        "p50": _percentile(latencies, 0.5),
+        "p95": _percentile(latencies, 0.95),
+        "error_rate": 1 - sum(outcomes) / len(outcomes) if outcomes else 0.0,
+        "samples": len(outcomes),
+    }
+
+def rank_backends(source: str) -> List[tuple]:
+    """Return (backend, stats) pairs for the source kind, best first.
+
+    Backends whose circuit breaker is open come last, after ones whose error rate is above
+    TRANSCRIPTION_MAX_ERROR_RATE; the rest are ordered by p50. Backends without enough
+    samples yet are tried first, so they get measured, and so is an unhealthy backend
+    when this request wins its probe (its stats are then flagged with "probe").
+    """
+    ranked = []
+    for preference, backend in enumerate(BACKENDS[source]):
+        stats = get_backend_stats(backend)
+        tripped = backend in BACKEND_CIRCUITS and is_open(BACKEND_CIRCUITS[backend])
+        measured = stats["samples"] >= settings.TRANSCRIPTION_MIN_SAMPLES
+        unhealthy = measured and stats["error_rate"] > settings.TRANSCRIPTION_MAX_ERROR_RATE
+        speed = stats["p50"] if measured and stats["p50"] is not None else 0
+        if unhealthy and not tripped and _claim_probe(backend):
+            unhealthy, speed, stats = False, 0, {**stats, "probe": True}
+        ranked.append(((tripped, unhealthy, speed, preference), backend, stats))
+    ranked.sort(key=lambda item: item[0])
+    return [(backend, stats) for _, backend, stats in ranked]
+
+def _timed_call(source: str, backend: str, url: str, probe: bool = False) -> dict:
+    started = time.monotonic()
+    try:
+        response = BACKENDS[source][backend](url)
+    except Exception as e:
+        response = {
+            "success": False,
+            "error": {
+                "type": "TranscriptionError",
+                "message": str(e)
+            }
+        }
+    response = response or {"success": False, "error": {"type": "TranscriptionError", "message": "no response"}}
+    success = bool(response.get("success"))
+    cancelled = cancel_event.get()
+    # Cache hits say nothing about the backend, nor do calls stopped for losing a race
+    if (success and response["data"].get("cached")) or (not success and cancelled is not None and cancelled.is_set()):
+        return response
+    if probe and success:
+        print(f"Transcription backend {backend} recovered")
+        reset_outcomes(backend)
+    record_call(backend, time.monotonic() - started, success)
+    return response
+
+def _submit(source: str, backend: str, url: str, stats: dict, cancelled: threading.Event) -> Future:
+    """Start a backend call on a thread of its own; setting `cancelled` asks it to stop."""
+    future = Future()
+    # In the caller's context, so context-bound state (like the rate limit listener) follows the call
+    context = contextvars.copy_context()
+    context.run(cancel_event.set, cancelled)
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(context.run(_timed_call, source, backend, url, stats.get("probe", False)))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=f"transcribe-{backend}", daemon=True).start()
+    return future
+
+def _hedge_delay(stats: dict) -> float:
+    if stats["samples"] < settings.TRANSCRIPTION_MIN_SAMPLES or stats["p95"] is None:
+        return settings.TRANSCRIPTION_HEDGE_DEFAULT_SECONDS
+    return max(stats["p95"], settings.TRANSCRIPTION_HEDGE_MIN_SECONDS)
+
+def transcribe_routed(url: str, source: str = "audio", hedge: Optional[bool] = None) -> dict:
+    """Transcribe url with the best backend for the source kind ("audio" or "youtube").
+
+    A backend that fails is replaced by the next one. With `hedge`, a backend still
+    running past its p95 gets a second request racing it on the next backend; the
+    loser is canceled once the other one succeeds.
+    """
+    hedge = settings.TRANSCRIPTION_HEDGE if hedge is None else hedge
+    candidates = rank_backends(source)
+    backend, stats = candidates.pop(0)
+    cancelled = threading.Event()
+    running = {_submit(source, backend, url, stats, cancelled): backend}
+    hedge_after = _hedge_delay(stats) if hedge else None
+    last_failure = None
+
+    try:
+        while running:
+            done, _ = wait(running, timeout=hedge_after if candidates else None, return_when=FIRST_COMPLETED)
+            if not done:
+                backend, stats = candidates.pop(0)
+                print(f"Hedging transcription of {url} on {backend}")
+                running[_submit(source, backend, url, stats, cancelled)] = backend
+                hedge_after = None
+                continue
+
+            for future in done:
+                backend = running.pop(future)
+                response = future.result()
+                if response["success"]:
+                    response["data"]["backend"] = backend
+                    return response
+                print(f"Transcription backend {backend} failed: {response['error']}")
+                last_failure = response
+
+            if not running and candidates:
+                backend, stats = candidates.pop(0)
+                running[_submit(source, backend, url, stats, cancelled)] = backend
+
+        return last_failure
+    finally:
+        # Whatever is still running lost the race
+        cancelled.set()
@@ -2,19 +2,25 @@ import json
 import os
 import ssl
 import tempfile
-from openai import OpenAI
 from pytubefix import YouTube
 from pytubefix.captions import Caption
 from pytubefix.cli import on_progress
-import requests
 from urllib.parse import urlparse, parse_qs
 from app.commons.environment_manager import load_env
+from app.usecases.generation.circuit_breaker import SALAD_ENDPOINT_CIRCUIT, guarded_request, salad_timeout
+from app.usecases.generation.chunked_transcription import transcribe_audio_file
+from app.usecases.generation.transcript_cache import (
+    cache_transcript,
+    cached_transcript_response,
+    get_cached_transcript,
+    youtube_cache_key,
+)
 
 ssl._create_default_https_context = ssl._create_stdlib_context
 load_env()
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+
+# Caption language requested from YouTube before falling back to speech recognition
+CAPTIONS_LANG = 'en'
 
 def get_video_id(url):
     parsed_url = urlparse(url)
@@ -36,6 +42,11 @@ def generate_transcript(youtube_url):
             }
         }
     
+    cache_key = youtube_cache_key(video_id)
+    cached_transcript = get_cached_transcript(cache_key)
+    if cached_transcript is not None:
+        return cached_transcript_response(cached_transcript, video_id=video_id)
+
     try:
         url = "https://mustard-cayenne-0hlavnqk8jx0kp7z.salad.cloud/transcribe/"
         
@@ -46,11 +57,12 @@ def generate_transcript(youtube_url):
             'Content-Type': 'application/json'
         }
         
-        response = requests.request("POST", url, headers=headers, data=payload, timeout=3600)
+        response = guarded_request(SALAD_ENDPOINT_CIRCUIT, "POST", url, headers=headers, data=payload, timeout=salad_timeout())
         
         if response.status_code == 200:
             transcription_data = response.json()
             print(f"transcription_data: {transcription_data}")
+            cache_transcript(cache_key, transcription_data["transcription"])
             return {
                 "success": True,
                 "data": {
@@ -59,6 +71,13 @@ def generate_transcript(youtube_url):
                 },
                 "error": None
             }
+        return {
+            "success": False,
+            "error": {
+                "type": "TranscriptionError",
+                "message": f"Transcription server responded with status {response.status_code}."
+            }
+        }
     except Exception as e:
         print(f"Error on generate_transcript: {str(e)}.")
         return {
@@ -80,9 +99,16 @@ def generate_youtube_transcript(youtube_url):
             }
         }
 
+    # Captions first, then any speech recognition transcript of the same video
+    for cache_key in (youtube_cache_key(video_id, CAPTIONS_LANG), youtube_cache_key(video_id)):
+        cached_transcript = get_cached_transcript(cache_key)
+        if cached_transcript is not None:
+            return cached_transcript_response(cached_transcript, video_id=video_id)
+
     try:
-        subtitles = get_srt(youtube_url)
+        subtitles = get_srt(youtube_url, lang=CAPTIONS_LANG)
         print(subtitles)
+        cache_transcript(youtube_cache_key(video_id, CAPTIONS_LANG), subtitles)
         
         return {
             "success": True,
@@ -122,6 +148,12 @@ def generate_youtube_transcript(youtube_url):
 
 def transcript_with_whisper(youtube_url: str):
     out_file = None  # Initialize the variable here
+    video_id = get_video_id(youtube_url)
+    if video_id:
+        cached_transcript = get_cached_transcript(youtube_cache_key(video_id))
+        if cached_transcript is not None:
+            return cached_transcript_response(cached_transcript)
+
     try:
         # Download the audio from YouTube as an MP3 file 
         yt = YouTube(youtube_url, on_progress_callback=on_progress, use_oauth=True, allow_oauth_cache=True)
@@ -137,17 +169,15 @@ def transcript_with_whisper(youtube_url: str):
 
         print(f"Temporary file: {out_file}")
         
-        # Open the file in binary read mode
-        with open(out_file, "rb") as audio_file:
-            transcription = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="text"
-            )
+        # Transcribe the file (in parallel chunks when it is long)
+        transcription = transcribe_audio_file(out_file)
         
         # Clean up the temporary file
         os.unlink(out_file)
 
+        if video_id:
+            cache_transcript(youtube_cache_key(video_id), transcription)
+
         # # Clean up the temporary file
         # os.remove(out_file)
 
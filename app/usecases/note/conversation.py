@@ -0,0 +1,89 @@
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from app.commons.text_chunking import estimate_tokens
+from app.config import settings
+from app.database.models import ChatConversation, ChatMessage, Note
+from app.usecases.generation.chat_generation import summarize_conversation
+
+def create_conversation(db: Session, note: Note, user_id: int) -> ChatConversation:
+    try:
+        conversation = ChatConversation(note_id=note.id, user_id=user_id)
+        db.add(conversation)
+        db.commit()
+        db.refresh(conversation)
+        return conversation
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+def get_conversation(db: Session, conversation_id: int, user_id: int) -> Optional[ChatConversation]:
+    return db.query(ChatConversation).filter(ChatConversation.id == conversation_id, ChatConversation.user_id == user_id).first()
+
+def get_note_conversations(db: Session, note_id: int, user_id: int) -> List[ChatConversation]:
+    return db.query(ChatConversation).filter(ChatConversation.note_id == note_id, ChatConversation.user_id == user_id).all()
+
+def delete_conversation(db: Session, conversation: ChatConversation):
+    try:
+        db.delete(conversation)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+def add_chat_turn(db: Session, conversation: ChatConversation, question: str, answer: str) -> ChatConversation:
+    try:
+        conversation.messages.append(ChatMessage(role="user", content=question, compacted=False))
+        conversation.messages.append(ChatMessage(role="assistant", content=answer, compacted=False))
+        db.commit()
+        db.refresh(conversation)
+        return conversation
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+def _history_tokens(messages: List[ChatMessage]) -> int:
+    return sum(estimate_tokens(message.content) for message in messages)
+
+def _as_history(messages: List[ChatMessage]) -> List[dict]:
+    return [{"role": message.role, "content": message.content} for message in messages]
+
+def compact_conversation(db: Session, conversation: ChatConversation) -> bool:
+    """Roll the oldest turns into the running summary once the uncompacted history exceeds CHAT_HISTORY_TOKENS.
+
+    The last CHAT_HISTORY_KEEP_MESSAGES messages always stay verbatim. Returns whether anything was compacted.
+    """
+    pending = [message for message in conversation.messages if not message.compacted]
+    if _history_tokens(pending) <= settings.CHAT_HISTORY_TOKENS:
+        return False
+
+    to_compact = pending[:-settings.CHAT_HISTORY_KEEP_MESSAGES] if settings.CHAT_HISTORY_KEEP_MESSAGES else pending
+    if not to_compact:
+        return False
+
+    summary_response = summarize_conversation(conversation.summary or "", _as_history(to_compact))
+    if not summary_response['success']:
+        print(f"Failed to compact conversation {conversation.id}: {summary_response['error']}")
+        return False
+
+    try:
+        conversation.summary = summary_response['data']['summary']
+        for message in to_compact:
+            message.compacted = True
+        db.commit()
+        db.refresh(conversation)
+        return True
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+def get_prompt_history(conversation: ChatConversation) -> Tuple[str, List[dict]]:
+    """Return the running summary and the uncompacted messages to send with the next question.
+
+    If compaction is behind (e.g. the summary call failed), the oldest messages are left out
+    so the prompt still stays within CHAT_HISTORY_TOKENS.
+    """
+    pending = [message for message in conversation.messages if not message.compacted]
+    while len(pending) > 1 and _history_tokens(pending) > settings.CHAT_HISTORY_TOKENS:
+        pending = pending[1:]
+    return conversation.summary or "", _as_history(pending)
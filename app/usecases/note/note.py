@@ -2,6 +2,9 @@
 
 from datetime import datetime, timedelta
 from app.usecases.storage.audio_store import delete_object, extract_audio_filename
+from app.usecases.note.study_material import study_material_source_hash
+from app.commons.lexical_index import build_index, is_current_index, top_chunks
+from app.config import settings
 from sqlalchemy.orm import Session
 from app.database.models import Folder, Note, NoteMetadata, User
 from app.database.schemas.note import NoteCreate, NoteMetadataCreate, NoteMetadataUpdate, NoteUpdate
@@ -18,6 +21,7 @@ def add_note(
         new_note = Note(
             user_id=user_id,
             folder_id=folder_id,
+            transcript_index=build_index(note_create.transcript_text, settings.CHAT_INDEX_CHUNK_TOKENS),
             **note_create.dict()  # Unpack the Pydantic model to pass parameters
         )
         db.add(new_note)
@@ -71,6 +75,60 @@ def add_metadata(
         db.rollback()
         raise e
 
+def get_chat_context(db: Session, note: Note, question: str) -> str:
+    """Return the transcript chunks most relevant to question, falling back to the summary when none match.
+
+    Notes without a current index (created before transcripts were indexed, or indexed in an
+    older format) get it built and stored on first use.
+    """
+    if not is_current_index(note.transcript_index):
+        try:
+            note.transcript_index = build_index(note.transcript_text, settings.CHAT_INDEX_CHUNK_TOKENS)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise e
+
+    chunks = top_chunks(note.transcript_index, note.transcript_text or "", question, settings.CHAT_CONTEXT_CHUNKS)
+    if not chunks:
+        return note.summary
+    return "\n\n".join(chunks)
+
+def create_note_with_metadata(
+    db: Session,
+    user_id: int,
+    summary_data: dict,
+    transcript_text: str,
+    content_url: Optional[str],
+    translated: bool = False,
+) -> NoteMetadata:
+    """Persist a generated summary as a new note together with its metadata.
+
+    Flashcards and quizzes are stored as well when the summary came from a study pack.
+    """
+    source_hash = study_material_source_hash(summary_data['markdown'], summary_data['lang'])
+    note_create = NoteCreate(
+        title=summary_data['title'],
+        summary=summary_data['markdown'],
+        transcript_text=transcript_text,
+        language=summary_data['lang'],
+        content_url=content_url,
+        translated=translated,
+        flashcards=summary_data.get('flashcards'),
+        quizzes=summary_data.get('quizzes'),
+        flashcards_source_hash=source_hash if summary_data.get('flashcards') else None,
+        quizzes_source_hash=source_hash if summary_data.get('quizzes') else None,
+    )
+    new_note = add_note(db=db, user_id=user_id, folder_id=None, note_create=note_create)
+
+    metadata_create = NoteMetadataCreate(
+        title=summary_data['title'],
+        content_category=summary_data['content_category'],
+        emoji_representation=summary_data['emoji_representation'],
+        date_created=datetime.now()
+    )
+    return add_metadata(db=db, user_id=user_id, note_id=new_note.id, metadata_create=metadata_create)
+
 def create_welcoming_note(db : Session, user_id : int) :
     welcomeNoteSummary = (
         "# Introduction to Gomemo 📝\n\n"
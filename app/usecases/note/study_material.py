@@ -0,0 +1,77 @@
+# app/usecases/note/study_material.py
+
+import hashlib
+import json
+from sqlalchemy.orm import Session
+from app.database.models import Note
+from app.usecases.generation.flashcard_generation import generate_flashcards_async
+from app.usecases.generation.quiz_generation import generate_quizzes_async
+
+def study_material_source_hash(summary: str, language: str) -> str:
+    """Version of the input flashcards and quizzes are generated from."""
+    return hashlib.sha256(f"{language or ''}\x00{summary or ''}".encode()).hexdigest()
+
+def study_material_etag(artifact) -> str:
+    content = json.dumps(artifact, sort_keys=True, ensure_ascii=False)
+    return f'"{hashlib.sha256(content.encode()).hexdigest()[:32]}"'
+
+def has_current_flashcards(note: Note) -> bool:
+    return bool(note.flashcards) and note.flashcards_source_hash == study_material_source_hash(note.summary, note.language)
+
+def has_current_quizzes(note: Note) -> bool:
+    return bool(note.quizzes) and note.quizzes_source_hash == study_material_source_hash(note.summary, note.language)
+
+async def ensure_flashcards_async(db: Session, note: Note, regenerate: bool = False) -> dict:
+    """Return the note's flashcards, generating and storing them first if they are missing or stale.
+
+    Stored flashcards are reused as long as the summary and language they were
+    generated from are unchanged, unless `regenerate` is set.
+    """
+    if regenerate or not has_current_flashcards(note):
+        source_hash = study_material_source_hash(note.summary, note.language)
+        flashcard_data = await generate_flashcards_async(note.summary, note.language)
+        if not flashcard_data['success']:
+            return flashcard_data
+
+        # A concurrent request (or the background precompute) may have stored a deck meanwhile
+        db.refresh(note)
+        if regenerate or not has_current_flashcards(note):
+            note.flashcards = flashcard_data['data']['flashcards']
+            note.flashcards_source_hash = source_hash
+            db.commit()
+            db.refresh(note)
+
+    return {
+        "success": True,
+        "data": {
+            "flashcards": note.flashcards
+        },
+        "error": None
+    }
+
+async def ensure_quizzes_async(db: Session, note: Note, regenerate: bool = False) -> dict:
+    """Return the note's quizzes, generating and storing them first if they are missing or stale.
+
+    Stored quizzes are reused as long as the summary and language they were
+    generated from are unchanged, unless `regenerate` is set.
+    """
+    if regenerate or not has_current_quizzes(note):
+        source_hash = study_material_source_hash(note.summary, note.language)
+        quiz_data = await generate_quizzes_async(note.summary, note.language)
+        if not quiz_data['success']:
+            return quiz_data
+
+        db.refresh(note)
+        if regenerate or not has_current_quizzes(note):
+            note.quizzes = quiz_data['data']['quizzes']
+            note.quizzes_source_hash = source_hash
+            db.commit()
+            db.refresh(note)
+
+    return {
+        "success": True,
+        "data": {
+            "quizzes": note.quizzes
+        },
+        "error": None
+    }
@@ -1,6 +1,9 @@
+import hashlib
 import os
+import tempfile
 import time
 import uuid
+from typing import Optional, Tuple
 from fastapi import HTTPException
 import requests
 from minio import Minio, S3Error
@@ -8,6 +11,7 @@ import urllib.parse
 
 from app.commons.environment_manager import load_env
 from app.commons.logger import logger
+from app.config import settings
 
 # Create client with access key and secret key with specific region.
 load_env()
@@ -35,25 +39,54 @@ minio_client = Minio(
 
 BUCKET_NAME = "gomemo"
 
-def put_object(audio_file, audio_path) -> str:
+# Objects are streamed from MinIO in pieces of this size
+OBJECT_READ_CHUNK_SIZE = 1024 * 1024
+
+def new_object_name(filename: str) -> str:
+    """Name for a new object holding an upload, unique even for identical names uploaded in the same second."""
+    file_name, file_extension = os.path.splitext(filename)
+    return f"{file_name}_{int(time.time())}_{uuid.uuid4().hex[:8]}{file_extension}"
+
+def public_object_url(object_name: str) -> str:
+    return f"{MINIO_ENDPOINTS}/{BUCKET_NAME}/{object_name}"
+
+class HashingReader:
+    """Read-only file wrapper that counts and hashes the bytes read through it."""
+
+    def __init__(self, file):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.file.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+def put_object(file, filename: str, content_type: Optional[str] = None) -> Tuple[str, str, int]:
+    """Stream a file object into the bucket in multipart parts; return its public URL, SHA-256 and size.
+
+    Only one part (MINIO_UPLOAD_PART_SIZE) is held in memory at a time, however long the file is.
+    """
     try:
-        timestamp = int(time.time())
-        file_extension = os.path.splitext(audio_file.filename)[1]
-        file_name = os.path.splitext(audio_file.filename)[0]
-        minio_file_name = f"{file_name}_{timestamp}{file_extension}"
-        
-        # Upload the file to MinIO
-        print(f"Putting object [{audio_file}] [{minio_file_name}] to MinIO...")
-        minio_client.fput_object(
+        minio_file_name = new_object_name(filename)
+        reader = HashingReader(file)
+
+        print(f"Putting object [{minio_file_name}] to MinIO...")
+        minio_client.put_object(
             BUCKET_NAME,
             minio_file_name,
-            audio_path
+            reader,
+            length=-1,
+            part_size=settings.MINIO_UPLOAD_PART_SIZE,
+            content_type=content_type or "application/octet-stream",
         )
-        
+
         # Generate public URL for the file (without expiration)
-        public_url = f"{MINIO_ENDPOINTS}/{BUCKET_NAME}/{minio_file_name}"
-        print(f"MinIO public url: [{public_url}]")
-        return public_url
+        public_url = public_object_url(minio_file_name)
+        print(f"MinIO public url: [{public_url}] ({reader.size} bytes)")
+        return public_url, reader.sha256.hexdigest(), reader.size
 
     except S3Error as err:
         raise HTTPException(status_code=500, detail=f"Failed to upload file to MinIO: {str(err)}")
@@ -103,6 +136,36 @@ def copy_file_from_url(public_url: str) -> str:
         if 'local_file_path' in locals() and os.path.exists(local_file_path):
             os.remove(local_file_path)
 
+def own_object_name(url: str) -> Optional[str]:
+    """Return the object name if url is the public URL of an object in our bucket, otherwise None."""
+    parsed = urllib.parse.urlparse(url if "://" in url else "https://" + url)
+    prefix = f"/{BUCKET_NAME}/"
+    if parsed.netloc != MINIO_ENDPOINTS or not parsed.path.startswith(prefix):
+        return None
+    return urllib.parse.unquote(parsed.path[len(prefix):]) or None
+
+def read_object(object_name: str) -> Tuple[tempfile.SpooledTemporaryFile, str]:
+    """Stream an object out of the bucket; return it as a rewound spooled temporary file, and its SHA-256.
+
+    Small objects stay in memory; larger ones spill to an anonymous temporary file. The caller closes it.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.AUDIO_SPOOL_MAX_BYTES)
+    sha256 = hashlib.sha256()
+    try:
+        response = minio_client.get_object(BUCKET_NAME, object_name)
+        try:
+            for chunk in response.stream(OBJECT_READ_CHUNK_SIZE):
+                spool.write(chunk)
+                sha256.update(chunk)
+        finally:
+            response.close()
+            response.release_conn()
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, sha256.hexdigest()
+
 def extract_audio_filename(url: str) -> str:
     if not url:
         raise ValueError("Empty URL provided")
@@ -0,0 +1,59 @@
+# Presigned URLs that let clients move audio to and from MinIO directly, without the API in between.
+#
+# An upload is granted a presigned PUT URL for a fresh object name, and the grant is remembered in
+# Redis until the URL expires; once the client has uploaded it confirms, and the object is checked
+# with stat_object before its URL is handed out. Playback gets short-lived presigned GET URLs.
+from datetime import timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from minio import S3Error
+from redis import Redis
+
+from app.config import settings
+from app.usecases.storage.audio_store import BUCKET_NAME, minio_client, new_object_name, own_object_name, public_object_url
+
+redis_client = Redis.from_url(settings.REDIS_URL)
+
+def _grant_key(object_name: str) -> str:
+    return f"presigned_upload:{object_name}"
+
+def create_presigned_upload(user_id: int, filename: str) -> dict:
+    object_name = new_object_name(filename)
+    expires = timedelta(seconds=settings.PRESIGNED_UPLOAD_EXPIRY_SECONDS)
+    upload_url = minio_client.presigned_put_object(BUCKET_NAME, object_name, expires=expires)
+    # Confirmation stays possible for a while after the URL expires, for uploads that started just in time
+    redis_client.set(_grant_key(object_name), user_id, ex=2 * settings.PRESIGNED_UPLOAD_EXPIRY_SECONDS)
+    return {
+        "object_name": object_name,
+        "upload_url": upload_url,
+        "method": "PUT",
+        "expires_in": settings.PRESIGNED_UPLOAD_EXPIRY_SECONDS,
+    }
+
+def confirm_presigned_upload(user_id: int, object_name: str) -> dict:
+    """Check that a granted upload landed in the bucket and return its public URL.
+
+    No content hash is recorded: one reported by the client can't be trusted for the shared
+    transcript cache, so the first transcription hashes the object itself.
+    """
+    grant = redis_client.get(_grant_key(object_name))
+    if grant is None or int(grant) != user_id:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    try:
+        stat = minio_client.stat_object(BUCKET_NAME, object_name)
+    except S3Error as err:
+        if err.code in ("NoSuchKey", "NoSuchObject"):
+            raise HTTPException(status_code=409, detail="The object has not been uploaded yet")
+        raise HTTPException(status_code=500, detail=f"Failed to check upload in MinIO: {str(err)}")
+
+    redis_client.delete(_grant_key(object_name))
+    return {"url": public_object_url(object_name), "size": stat.size, "content_type": stat.content_type}
+
+def presigned_download_url(content_url: str) -> Optional[str]:
+    """A short-lived GET URL for audio stored in our bucket, or None if content_url points elsewhere."""
+    object_name = own_object_name(content_url)
+    if object_name is None:
+        return None
+    expires = timedelta(seconds=settings.PRESIGNED_DOWNLOAD_EXPIRY_SECONDS)
+    return minio_client.presigned_get_object(BUCKET_NAME, object_name, expires=expires)
@@ -0,0 +1,163 @@
+# Resumable uploads of large recordings.
+#
+# A client opens a session (backed by a MinIO multipart upload), sends the file as numbered
+# chunks that each become one part, and completes the session once every chunk is in. After a
+# dropped connection it asks which parts arrived and resends only the missing ones.
+#
+# Session state lives in Redis and expires after UPLOAD_SESSION_TTL of inactivity; abandoned
+# sessions are listed in a sorted set by last activity so the cleanup job can abort their
+# multipart uploads (otherwise MinIO keeps the uploaded parts around).
+import json
+import time
+import uuid
+from typing import List, Optional
+
+from fastapi import HTTPException
+from minio.datatypes import Part
+from redis import Redis
+
+from app.config import settings
+from app.usecases.storage.audio_store import BUCKET_NAME, minio_client, new_object_name, public_object_url
+
+redis_client = Redis.from_url(settings.REDIS_URL)
+
+# Session ids by last activity, and the multipart upload behind each (kept until it is completed or aborted)
+SESSIONS_BY_ACTIVITY = "upload_sessions"
+SESSION_TARGETS = "upload_session_targets"
+
+def _session_key(session_id: str) -> str:
+    return f"upload_session:{session_id}"
+
+def _parts_key(session_id: str) -> str:
+    return f"upload_parts:{session_id}"
+
+def _touch(session_id: str):
+    pipeline = redis_client.pipeline()
+    pipeline.expire(_session_key(session_id), settings.UPLOAD_SESSION_TTL)
+    pipeline.expire(_parts_key(session_id), settings.UPLOAD_SESSION_TTL)
+    pipeline.zadd(SESSIONS_BY_ACTIVITY, {session_id: time.time()})
+    pipeline.execute()
+
+def _load_session(session_id: str, user_id: int) -> dict:
+    session = redis_client.hgetall(_session_key(session_id))
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    session = {key.decode(): value.decode() for key, value in session.items()}
+    if int(session["user_id"]) != user_id:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return session
+
+def _load_parts(session_id: str) -> List[dict]:
+    parts = redis_client.hgetall(_parts_key(session_id))
+    return sorted((json.loads(part) for part in parts.values()), key=lambda part: part["part_number"])
+
+def _describe(session_id: str, session: dict, parts: List[dict]) -> dict:
+    """Progress of a session: the parts received, and where to resume (the first missing part)."""
+    received = {part["part_number"]: part["size"] for part in parts}
+    next_part, offset = 1, 0
+    while next_part in received:
+        offset += received[next_part]
+        next_part += 1
+    return {
+        "session_id": session_id,
+        "filename": session["filename"],
+        "parts": [{"part_number": part["part_number"], "size": part["size"]} for part in parts],
+        "next_part": next_part,
+        "offset": offset,
+        "received_bytes": sum(received.values()),
+        "min_part_size": settings.UPLOAD_MIN_PART_BYTES,
+        "max_part_size": settings.UPLOAD_MAX_PART_BYTES,
+    }
+
+def create_upload_session(user_id: int, filename: str, content_type: Optional[str] = None) -> dict:
+    object_name = new_object_name(filename)
+    upload_id = minio_client._create_multipart_upload(
+        BUCKET_NAME, object_name, {"Content-Type": content_type or "application/octet-stream"}
+    )
+    session_id = uuid.uuid4().hex
+    session = {"user_id": str(user_id), "filename": filename, "object_name": object_name, "upload_id": upload_id}
+
+    pipeline = redis_client.pipeline()
+    pipeline.hset(_session_key(session_id), mapping=session)
+    pipeline.hset(SESSION_TARGETS, session_id, json.dumps({"object_name": object_name, "upload_id": upload_id}))
+    pipeline.execute()
+    _touch(session_id)
+    return _describe(session_id, session, [])
+
+def get_upload_session(session_id: str, user_id: int) -> dict:
+    session = _load_session(session_id, user_id)
+    return _describe(session_id, session, _load_parts(session_id))
+
+def upload_part(session_id: str, user_id: int, part_number: int, data: bytes) -> dict:
+    """Store one chunk as the multipart part `part_number`; resending a part replaces it."""
+    session = _load_session(session_id, user_id)
+    if not 1 <= part_number <= settings.UPLOAD_MAX_PARTS:
+        raise HTTPException(status_code=400, detail=f"Part number must be between 1 and {settings.UPLOAD_MAX_PARTS}")
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty part")
+
+    etag = minio_client._upload_part(BUCKET_NAME, session["object_name"], data, None, session["upload_id"], part_number)
+    redis_client.hset(
+        _parts_key(session_id), str(part_number),
+        json.dumps({"part_number": part_number, "etag": etag, "size": len(data)})
+    )
+    _touch(session_id)
+    return _describe(session_id, session, _load_parts(session_id))
+
+def _forget(session_id: str):
+    pipeline = redis_client.pipeline()
+    pipeline.delete(_session_key(session_id), _parts_key(session_id))
+    pipeline.zrem(SESSIONS_BY_ACTIVITY, session_id)
+    pipeline.hdel(SESSION_TARGETS, session_id)
+    pipeline.execute()
+
+def complete_upload(session_id: str, user_id: int) -> dict:
+    """Assemble the parts into the final object; they must be numbered 1..n with all but the last at least UPLOAD_MIN_PART_BYTES."""
+    session = _load_session(session_id, user_id)
+    parts = _load_parts(session_id)
+    if not parts:
+        raise HTTPException(status_code=400, detail="No parts uploaded")
+    missing = sorted(set(range(1, parts[-1]["part_number"] + 1)) - {part["part_number"] for part in parts})
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing parts: {missing}")
+    too_small = [part["part_number"] for part in parts[:-1] if part["size"] < settings.UPLOAD_MIN_PART_BYTES]
+    if too_small:
+        raise HTTPException(status_code=400, detail=f"Parts smaller than {settings.UPLOAD_MIN_PART_BYTES} bytes: {too_small}")
+
+    minio_client._complete_multipart_upload(
+        BUCKET_NAME, session["object_name"], session["upload_id"],
+        [Part(part["part_number"], part["etag"]) for part in parts]
+    )
+    _forget(session_id)
+    return {"url": public_object_url(session["object_name"]), "size": sum(part["size"] for part in parts)}
+
+def _abort(session_id: str, object_name: str, upload_id: str):
+    try:
+        minio_client._abort_multipart_upload(BUCKET_NAME, object_name, upload_id)
+    except Exception as e:
+        # Already completed or aborted (NoSuchUpload); anything else is retried on the next cleanup
+        if getattr(e, "code", None) != "NoSuchUpload":
+            raise
+    _forget(session_id)
+
+def abort_upload(session_id: str, user_id: int):
+    session = _load_session(session_id, user_id)
+    _abort(session_id, session["object_name"], session["upload_id"])
+
+def abort_abandoned_uploads() -> dict:
+    """Abort the multipart uploads of sessions inactive for longer than UPLOAD_SESSION_TTL."""
+    cutoff = time.time() - settings.UPLOAD_SESSION_TTL
+    aborted, errors = 0, []
+    for session_id in redis_client.zrangebyscore(SESSIONS_BY_ACTIVITY, "-inf", cutoff):
+        session_id = session_id.decode()
+        target = redis_client.hget(SESSION_TARGETS, session_id)
+        if target is None:
+            redis_client.zrem(SESSIONS_BY_ACTIVITY, session_id)
+            continue
+        target = json.loads(target)
+        try:
+            _abort(session_id, target["object_name"], target["upload_id"])
+            aborted += 1
+        except Exception as e:
+            errors.append(f"Failed to abort upload session {session_id}: {str(e)}")
+    return {"aborted_count": aborted, "errors": errors}
@@ -1,4 +1,5 @@
 #!/bin/bash
 redis-server --port 6380 --daemonize yes
 celery -A app.tasks.audio_queue:celery_app worker --loglevel=info --concurrency=10 &
+celery -A app.tasks.audio_queue:celery_app worker --loglevel=info --concurrency=2 -Q low_priority -n low_priority@%h &
 uvicorn app.main:app --host 0.0.0.0 --port 3657
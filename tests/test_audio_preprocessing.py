@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from pydub import AudioSegment
+from pydub.generators import Sine
+from app.usecases.generation import audio_preprocessing
+from app.usecases.generation.audio_preprocessing import ffmpeg_input, format_savings, preprocessed_audio, trim_silence
+
+def speech_with_silence(lead_ms: int, speech_ms: int, tail_ms: int) -> AudioSegment:
+    tone = Sine(440).to_audio_segment(duration=speech_ms, volume=-10).set_frame_rate(16000).set_channels(1)
+    return AudioSegment.silent(lead_ms, frame_rate=16000) + tone + AudioSegment.silent(tail_ms, frame_rate=16000)
+
+class TestAudioPreprocessing(unittest.TestCase):
+    def test_trims_leading_and_trailing_silence_with_padding(self):
+        with patch.object(audio_preprocessing.settings, "AUDIO_SILENCE_PADDING_MS", 100):
+            trimmed = trim_silence(speech_with_silence(2000, 3000, 1500))
+
+        self.assertAlmostEqual(len(trimmed), 3200, delta=30)
+
+    def test_keeps_silent_audio(self):
+        silence = AudioSegment.silent(1000, frame_rate=16000)
+        self.assertEqual(len(trim_silence(silence)), 1000)
+
+    def test_format_savings(self):
+        self.assertEqual(format_savings(50_000_000, 5_000_000), "50.0 MB -> 5.0 MB (90% smaller)")
+
+    def test_spools_on_disk_are_decoded_from_a_path(self):
+        with tempfile.SpooledTemporaryFile(max_size=10) as spool:
+            spool.write(b"audio bytes past the spool size")
+            spool.seek(5)
+            path = ffmpeg_input(spool)
+
+            self.assertIsInstance(path, str)
+            with open(path, "rb") as audio_file:
+                self.assertEqual(audio_file.read(), b"audio bytes past the spool size")
+
+    def test_spools_in_memory_are_piped(self):
+        with tempfile.SpooledTemporaryFile(max_size=1000) as spool:
+            spool.write(b"short")
+            self.assertIs(ffmpeg_input(spool), spool)
+            self.assertEqual(spool.tell(), 0)
+
+    def test_falls_back_to_original_file(self):
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp:
+            path = temp.name
+        self.addCleanup(os.remove, path)
+
+        with patch("app.usecases.generation.audio_preprocessing.preprocess_audio", side_effect=RuntimeError("no ffmpeg")):
+            with preprocessed_audio(path) as audio_path:
+                self.assertEqual(audio_path, path)
+
+    def test_removes_preprocessed_copy(self):
+        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp:
+            out_path = temp.name
+        stats = {"original_bytes": 1000, "processed_bytes": 100, "duration_seconds": 1, "trimmed_seconds": 0}
+
+        with patch("app.usecases.generation.audio_preprocessing.preprocess_audio", return_value=(out_path, stats)):
+            with preprocessed_audio("voice.wav") as audio_path:
+                self.assertEqual(audio_path, out_path)
+        self.assertFalse(os.path.exists(out_path))
+
+if __name__ == "__main__":
+    unittest.main()
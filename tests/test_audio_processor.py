@@ -0,0 +1,39 @@
+import unittest
+from unittest.mock import patch
+from app.tasks import audio_processor
+
+class TestAudioNoteFailure(unittest.TestCase):
+    def fail(self, status, followers):
+        with patch("app.tasks.audio_processor.get_task_status", return_value=(status, None)), \
+                patch("app.tasks.audio_processor.set_task_status") as set_status, \
+                patch("app.tasks.audio_processor.fail_flight", return_value=followers) as fail_flight, \
+                patch("app.tasks.audio_processor._dispatch_followers") as dispatch:
+            audio_processor.audio_note_failed.run(None, RuntimeError("worker lost"), None, task_id="task", flight="flight")
+        return set_status, fail_flight, dispatch
+
+    def test_unexpected_failure_fails_task_and_flight(self):
+        followers = [{"task_id": "other"}]
+        set_status, fail_flight, dispatch = self.fail("SUMMARIZING", followers)
+
+        set_status.assert_called_once_with("task", "FAILED", {"error": "Note generation failed: worker lost"})
+        fail_flight.assert_called_once_with("flight", "task")
+        dispatch.assert_called_once_with(followers)
+
+    def test_already_failed_task_is_left_alone(self):
+        set_status, _, dispatch = self.fail("FAILED", [])
+
+        set_status.assert_not_called()
+        dispatch.assert_called_once_with([])
+
+    def test_chain_has_errback(self):
+        with patch("app.tasks.audio_processor.set_task_owner"), \
+                patch("app.tasks.audio_processor.set_task_status"), \
+                patch("app.tasks.audio_processor.chain") as chain:
+            task_id = audio_processor.enqueue_audio_note("url", 7, flight="flight")
+
+        errback = chain.return_value.apply_async.call_args.kwargs["link_error"]
+        self.assertEqual(errback.task, "audio_note_failed")
+        self.assertEqual(errback.kwargs, {"task_id": task_id, "flight": "flight"})
+
+if __name__ == "__main__":
+    unittest.main()
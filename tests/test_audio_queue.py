@@ -0,0 +1,26 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from app.tasks import audio_queue
+from app.tasks.audio_queue import run_async
+
+class TestAudioQueue(unittest.TestCase):
+    def test_event_loop_is_reused_within_a_process(self):
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        self.assertIs(run_async(current_loop()), run_async(current_loop()))
+
+    def test_forked_process_gets_its_own_event_loop(self):
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        parent_loop = run_async(current_loop())
+        with patch("app.tasks.audio_queue.os.getpid", return_value=-1):
+            child_loop = run_async(current_loop())
+
+        self.assertIsNot(child_loop, parent_loop)
+        self.assertIs(audio_queue._event_loop, child_loop)
+
+if __name__ == "__main__":
+    unittest.main()
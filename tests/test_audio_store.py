@@ -0,0 +1,28 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from app.usecases.storage import audio_store
+from app.usecases.storage.audio_store import BUCKET_NAME, MINIO_ENDPOINTS, own_object_name, read_object
+
+class TestAudioStore(unittest.TestCase):
+    def test_own_object_name(self):
+        self.assertEqual(own_object_name(f"{MINIO_ENDPOINTS}/{BUCKET_NAME}/memo%20one_1.m4a"), "memo one_1.m4a")
+        self.assertEqual(own_object_name(f"https://{MINIO_ENDPOINTS}/{BUCKET_NAME}/memo.m4a"), "memo.m4a")
+        self.assertIsNone(own_object_name(f"https://{MINIO_ENDPOINTS}/other-bucket/memo.m4a"))
+        self.assertIsNone(own_object_name(f"https://example.com/{BUCKET_NAME}/memo.m4a"))
+
+    def test_read_object_streams_into_spool(self):
+        response = MagicMock()
+        response.stream.return_value = iter([b"abc", b"def"])
+
+        with patch.object(audio_store.minio_client, "get_object", return_value=response) as get_object, \
+                patch.object(audio_store.settings, "AUDIO_SPOOL_MAX_BYTES", 4):
+            spool, sha256 = read_object("memo.m4a")
+
+        with spool:
+            self.assertEqual(spool.read(), b"abcdef")
+        self.assertEqual(sha256, "bef57ec7f53a6d40beb640a780a639c83bc29ac8a9816f1fc6c5c6dcd93c4721")
+        get_object.assert_called_once_with(BUCKET_NAME, "memo.m4a")
+        response.release_conn.assert_called_once()
+
+if __name__ == "__main__":
+    unittest.main()
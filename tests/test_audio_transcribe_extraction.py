@@ -0,0 +1,31 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from app.usecases.generation.audio_transcribe_extraction import transcribe_audio
+
+class TestTranscribeAudio(unittest.TestCase):
+    def transcribe(self, known_hash, cached=None):
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"transcription": "hello"}
+        with patch("app.usecases.generation.audio_transcribe_extraction.lookup_audio_hash", return_value=known_hash), \
+                patch("app.usecases.generation.audio_transcribe_extraction.get_cached_transcript", return_value=cached), \
+                patch("app.usecases.generation.audio_transcribe_extraction.cache_transcript") as cache, \
+                patch("app.usecases.generation.audio_transcribe_extraction.guarded_request", return_value=response) as salad, \
+                patch("requests.get") as download:
+            result = transcribe_audio("files.example.com/a.mp3")
+        download.assert_not_called()
+        return result, salad, cache
+
+    def test_unknown_audio_is_not_downloaded_to_hash(self):
+        result, salad, cache = self.transcribe(None)
+
+        self.assertEqual(result["data"]["transcript"], "hello")
+        salad.assert_called_once()
+        cache.assert_not_called()
+
+    def test_known_hash_uses_cache(self):
+        result, salad, cache = self.transcribe("deadbeef")
+
+        cache.assert_called_once_with("transcript:audio:deadbeef", "hello")
+
+if __name__ == "__main__":
+    unittest.main()
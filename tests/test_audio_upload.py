@@ -0,0 +1,44 @@
+import hashlib
+import io
+import unittest
+from unittest.mock import patch
+from app.usecases.storage import audio_store
+from app.usecases.storage.audio_store import BUCKET_NAME, HashingReader, put_object
+
+class TestAudioUpload(unittest.TestCase):
+    def test_hashing_reader_counts_and_hashes(self):
+        reader = HashingReader(io.BytesIO(b"x" * 10))
+
+        self.assertEqual(reader.read(4), b"xxxx")
+        self.assertEqual(reader.read(), b"x" * 6)
+        self.assertEqual(reader.read(4), b"")
+        self.assertEqual(reader.size, 10)
+        self.assertEqual(reader.sha256.hexdigest(), hashlib.sha256(b"x" * 10).hexdigest())
+
+    def test_put_object_streams_in_parts(self):
+        data = b"audio" * 1000
+
+        def consume(bucket, name, reader, length, part_size, content_type):
+            # MinIO reads one part at a time until the stream is exhausted
+            while reader.read(part_size):
+                pass
+
+        with patch.object(audio_store.minio_client, "put_object", side_effect=consume) as minio_put:
+            url, sha256, size = put_object(io.BytesIO(data), "lecture one.m4a", "audio/mp4")
+
+        bucket, name = minio_put.call_args.args[:2]
+        self.assertEqual(bucket, BUCKET_NAME)
+        self.assertTrue(name.startswith("lecture one_") and name.endswith(".m4a"))
+        self.assertEqual(minio_put.call_args.kwargs["length"], -1)
+        self.assertEqual(url, f"{audio_store.MINIO_ENDPOINTS}/{BUCKET_NAME}/{name}")
+        self.assertEqual((sha256, size), (hashlib.sha256(data).hexdigest(), len(data)))
+
+    def test_concurrent_uploads_get_distinct_names(self):
+        with patch.object(audio_store.minio_client, "put_object"):
+            first, _, _ = put_object(io.BytesIO(b""), "memo.m4a")
+            second, _, _ = put_object(io.BytesIO(b""), "memo.m4a")
+
+        self.assertNotEqual(first, second)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+from app.database.models import Note
+from app.usecases.generation.chat_cache import chat_answer_key, normalize_question, note_content_hash
+
+class TestChatCache(unittest.TestCase):
+    def test_normalize_question(self):
+        self.assertEqual(normalize_question("  What is   Gomemo?? "), "what is gomemo")
+        self.assertEqual(normalize_question("what is gomemo"), "what is gomemo")
+
+    def test_key_depends_on_note_content(self):
+        note = Note(id=1, summary="Summary", transcript_text="Transcript", language="en")
+        key = chat_answer_key(note.id, note_content_hash(note), "What is Gomemo?")
+        self.assertEqual(key, chat_answer_key(note.id, note_content_hash(note), "what is gomemo"))
+
+        note.summary = "Edited summary"
+        self.assertNotEqual(key, chat_answer_key(note.id, note_content_hash(note), "What is Gomemo?"))
+
+if __name__ == '__main__':
+    unittest.main()
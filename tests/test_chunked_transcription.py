@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import patch
+from pydub import AudioSegment
+from app.usecases.generation import chunked_transcription
+from app.usecases.generation.chunked_transcription import plan_chunks, stitch_transcripts, transcribe_chunked
+
+class TestChunkedTranscription(unittest.TestCase):
+    def test_short_audio_is_one_chunk(self):
+        self.assertEqual(plan_chunks(30_000, [], 60_000, 1000), [(0, 30_000)])
+
+    def test_cuts_at_latest_pause_within_limit(self):
+        silences = [(20_000, 21_000), (50_000, 52_000), (90_000, 90_500)]
+
+        spans = plan_chunks(150_000, silences, 60_000, 1000)
+
+        self.assertEqual(spans, [(0, 51_000), (50_000, 90_250), (89_250, 150_000)])
+
+    def test_hard_cut_without_pauses(self):
+        silences = [(5_000, 6_000)]  # too early to cut at without leaving a tiny chunk
+
+        spans = plan_chunks(130_000, silences, 60_000, 1000)
+
+        self.assertEqual(spans, [(0, 60_000), (59_000, 120_000), (119_000, 130_000)])
+
+    def test_stitch_removes_repeated_words_at_seams(self):
+        transcripts = [
+            "Today we talk about the cell membrane and",
+            "membrane and its proteins. Proteins move",
+            "proteins move freely.",
+        ]
+
+        self.assertEqual(
+            stitch_transcripts(transcripts),
+            "Today we talk about the cell membrane and its proteins. Proteins move freely."
+        )
+
+    def test_stitch_keeps_words_without_overlap(self):
+        self.assertEqual(stitch_transcripts(["first part.", "Second part."]), "first part. Second part.")
+
+    def test_retries_failed_chunk_alone(self):
+        audio = AudioSegment.silent(130_000, frame_rate=16000)
+        exports = []
+
+        def flaky_export(chunk):
+            exports.append(chunk)
+            if len(exports) == 2:
+                raise RuntimeError("upload failed")
+            return "/nonexistent"
+
+        with patch.object(chunked_transcription.settings, "CHUNK_MAX_SECONDS", 60), \
+                patch("app.usecases.generation.chunked_transcription.export_audio", side_effect=flaky_export), \
+                patch("app.usecases.generation.chunked_transcription.open", create=True), \
+                patch("app.usecases.generation.chunked_transcription.transcribe_with_openai", side_effect=["a", "b", "c"]) as whisper, \
+                patch.object(chunked_transcription.settings, "CHUNKED_TRANSCRIPTION_WORKERS", 1):
+            transcript = transcribe_chunked(audio)
+
+        self.assertEqual(transcript, "a b c")
+        self.assertEqual(whisper.call_count, 3)
+        self.assertEqual(len(exports), 4)
+
+    def test_short_audio_is_decoded_once(self):
+        audio = AudioSegment.silent(10_000, frame_rate=16000)
+
+        with patch("app.usecases.generation.chunked_transcription.load_audio", return_value=audio) as load, \
+                patch("app.usecases.generation.chunked_transcription.preprocessed_audio") as preprocessed, \
+                patch("app.usecases.generation.chunked_transcription._transcribe_whole", return_value="hello"):
+            transcript = chunked_transcription.transcribe_audio_file("voice.wav")
+
+        self.assertEqual(transcript, "hello")
+        load.assert_called_once_with("voice.wav")
+        preprocessed.assert_called_once_with("voice.wav", audio)
+
+if __name__ == "__main__":
+    unittest.main()
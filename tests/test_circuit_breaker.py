@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import requests
+from app.usecases.generation import circuit_breaker
+from app.usecases.generation.circuit_breaker import (
+    CircuitOpenError,
+    allow_request,
+    guarded_request,
+    record_failure,
+    record_success,
+)
+
+class FakeRedis:
+    """Just enough of Redis for the breaker's state keys (expiry is left to the tests)."""
+
+    def __init__(self):
+        self.values = {}
+
+    def exists(self, *keys):
+        return sum(key in self.values for key in keys)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def delete(self, *keys):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def expire(self, key, seconds):
+        return key in self.values
+
+    def pipeline(self):
+        fake = self
+
+        class Pipeline:
+            def __getattr__(self, name):
+                return getattr(fake, name)
+
+            def execute(self):
+                return []
+
+        return Pipeline()
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch.object(circuit_breaker, "redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        threshold = patch.object(circuit_breaker.settings, "CIRCUIT_FAILURE_THRESHOLD", 3)
+        threshold.start()
+        self.addCleanup(threshold.stop)
+
+    def test_opens_after_threshold_failures(self):
+        record_failure("test")
+        record_failure("test")
+        self.assertTrue(allow_request("test"))
+        record_failure("test")
+        self.assertFalse(allow_request("test"))
+
+    def test_success_resets_failure_count(self):
+        record_failure("test")
+        record_failure("test")
+        record_success("test")
+        record_failure("test")
+        self.assertTrue(allow_request("test"))
+
+    def test_half_open_lets_one_probe_through(self):
+        for _ in range(3):
+            record_failure("test")
+        # The open period elapses
+        self.redis.delete("circuit:test:open")
+
+        self.assertTrue(allow_request("test"))
+        self.assertFalse(allow_request("test"))
+        record_success("test")
+        self.assertTrue(allow_request("test"))
+        self.assertTrue(allow_request("test"))
+
+    def test_failed_probe_reopens(self):
+        for _ in range(3):
+            record_failure("test")
+        self.redis.delete("circuit:test:open")
+
+        self.assertTrue(allow_request("test"))
+        record_failure("test")
+        self.assertFalse(allow_request("test"))
+
+    def test_fails_open_without_redis(self):
+        broken = MagicMock()
+        broken.exists.side_effect = ConnectionError("redis down")
+        with patch.object(circuit_breaker, "redis_client", broken):
+            self.assertTrue(allow_request("test"))
+
+    def test_guarded_request_records_outcomes(self):
+        responses = [MagicMock(status_code=503), MagicMock(status_code=429), MagicMock(status_code=200)]
+        with patch("app.usecases.generation.circuit_breaker.requests.request", side_effect=responses):
+            guarded_request("test", "GET", "url")
+            guarded_request("test", "GET", "url")
+            self.assertEqual(self.redis.values["circuit:test:failures"], 2)
+            guarded_request("test", "GET", "url")
+        self.assertNotIn("circuit:test:failures", self.redis.values)
+
+    def test_guarded_request_refuses_while_open(self):
+        with patch("app.usecases.generation.circuit_breaker.requests.request", side_effect=requests.Timeout("slow")) as request:
+            for _ in range(3):
+                with self.assertRaises(requests.Timeout):
+                    guarded_request("test", "POST", "url", timeout=(1, 1))
+            with self.assertRaises(CircuitOpenError):
+                guarded_request("test", "POST", "url", timeout=(1, 1))
+        self.assertEqual(request.call_count, 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+from app.tasks import audio_processor
+from app.tasks.coalescing import flight_key
+
+RESULT = {"transcript": "Transcript", "summary": {"title": "Title"}}
+
+class TestCoalescing(unittest.TestCase):
+    def test_flight_key_normalizes_request(self):
+        key = flight_key("youtube:abc", "EN", "Lecture  on\\nbiology")
+        self.assertEqual(key, flight_key("youtube:abc", "en ", "Lecture on\\nbiology"))
+        self.assertNotEqual(key, flight_key("youtube:abc", "fr", "Lecture on\\nbiology"))
+        self.assertNotEqual(key, flight_key("youtube:abc", "en", "Lecture on\\nbiology", study_pack=True))
+
+    def test_generation_source(self):
+        with patch("app.tasks.audio_processor.lookup_audio_hash", return_value=None):
+            self.assertEqual(audio_processor.generation_source("https://youtu.be/abc123", "youtube"), "youtube:abc123")
+            self.assertEqual(
+                audio_processor.generation_source("https://www.youtube.com/watch?v=abc123", "youtube_captions"),
+                "youtube:abc123"
+            )
+            self.assertEqual(audio_processor.generation_source("https://files.example.com/a.mp3", "salad"), "url:files.example.com/a.mp3")
+        with patch("app.tasks.audio_processor.lookup_audio_hash", return_value="deadbeef"):
+            self.assertEqual(audio_processor.generation_source("files.example.com/a.mp3", "whisper"), "audio:deadbeef")
+
+    def enqueue(self, role, result=None):
+        with patch("app.tasks.audio_processor.lookup_audio_hash", return_value=None), \
+                patch("app.tasks.audio_processor.set_task_owner"), \
+                patch("app.tasks.audio_processor.set_task_status"), \
+                patch("app.tasks.audio_processor.publish_task_event") as publish, \
+                patch("app.tasks.audio_processor.join_flight", return_value=(role, result)) as join, \
+                patch.object(audio_processor.persist_audio_note, "apply_async") as persist, \
+                patch("app.tasks.audio_processor.enqueue_audio_note") as enqueue:
+            task_id = audio_processor.enqueue_coalesced_audio_note("https://files.example.com/a.mp3", 7, lang="en")
+        return task_id, join, persist, enqueue, publish
+
+    def test_leader_runs_pipeline(self):
+        task_id, join, persist, enqueue, _ = self.enqueue("lead")
+
+        flight = join.call_args.args[0]
+        enqueue.assert_called_once_with(
+            "https://files.example.com/a.mp3", 7, task_id=task_id, flight=flight,
+            lang="en", context="", backend="salad", stream=False, study_pack=False
+        )
+        persist.assert_not_called()
+
+    def test_follower_is_queued_on_flight(self):
+        task_id, join, persist, enqueue, publish = self.enqueue("follow")
+
+        follower = join.call_args.args[2]
+        self.assertEqual(follower["task_id"], task_id)
+        self.assertEqual(follower["user_id"], 7)
+        enqueue.assert_not_called()
+        persist.assert_not_called()
+        publish.assert_called_once()
+
+    def test_shared_result_is_persisted(self):
+        task_id, _, persist, enqueue, _ = self.enqueue("done", RESULT)
+
+        persist.assert_called_once_with(args=[RESULT, 7, "https://files.example.com/a.mp3"], kwargs={"task_id": task_id})
+        enqueue.assert_not_called()
+
+    def dispatch(self, result):
+        followers = [{"task_id": "task", "user_id": 7, "audio_url": "url", "enqueue_kwargs": {"lang": "en"}}]
+        with patch.object(audio_processor.persist_audio_note, "apply_async") as persist, \
+                patch("app.tasks.audio_processor.enqueue_audio_note") as enqueue:
+            audio_processor._dispatch_followers(followers, result)
+        return persist, enqueue
+
+    def test_followers_persist_leader_result(self):
+        persist, enqueue = self.dispatch(RESULT)
+
+        persist.assert_called_once_with(args=[RESULT, 7, "url"], kwargs={"task_id": "task"})
+        enqueue.assert_not_called()
+
+    def test_followers_run_pipeline_when_leader_fails(self):
+        persist, enqueue = self.dispatch(None)
+
+        persist.assert_not_called()
+        enqueue.assert_called_once_with("url", 7, task_id="task", lang="en")
+
+if __name__ == '__main__':
+    unittest.main()
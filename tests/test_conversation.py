@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.database.models import Base, ChatConversation
+from app.database.schemas.note import NoteCreate
+from app.database.schemas.user import UserCreate
+from app.usecases.note.conversation import add_chat_turn, compact_conversation, create_conversation, get_prompt_history
+from app.usecases.note.note import add_note
+from app.usecases.user.user import create_user
+
+class TestConversation(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Session = sessionmaker(bind=self.engine)
+        self.db = Session()
+        Base.metadata.create_all(self.engine)
+
+        self.user = create_user(self.db, UserCreate(username="testuser", email="test@example.com", hashed_password="hashedpassword"))
+        self.note = add_note(
+            db=self.db,
+            user_id=self.user.id,
+            folder_id=None,
+            note_create=NoteCreate(title="Test Note", summary="Test Summary", transcript_text="Test Transcript", language="en")
+        )
+        self.conversation = create_conversation(self.db, self.note, self.user.id)
+
+    def tearDown(self):
+        self.db.close()
+        Base.metadata.drop_all(self.engine)
+
+    def add_turns(self, count: int, length: int = 400):
+        for i in range(count):
+            add_chat_turn(self.db, self.conversation, f"Question {i} " + "q" * length, f"Answer {i} " + "a" * length)
+
+    def test_short_history_is_not_compacted(self):
+        self.add_turns(2, length=10)
+
+        with patch("app.usecases.note.conversation.summarize_conversation") as summarize:
+            self.assertFalse(compact_conversation(self.db, self.conversation))
+        summarize.assert_not_called()
+
+        history_summary, history = get_prompt_history(self.conversation)
+        self.assertEqual(history_summary, "")
+        self.assertEqual([message["role"] for message in history], ["user", "assistant"] * 2)
+
+    def test_long_history_is_rolled_into_summary(self):
+        self.add_turns(10)
+
+        summary_response = {"success": True, "data": {"summary": "Earlier turns"}, "error": None}
+        with patch("app.usecases.note.conversation.summarize_conversation", return_value=summary_response) as summarize:
+            self.assertTrue(compact_conversation(self.db, self.conversation))
+        self.assertEqual(len(summarize.call_args[0][1]), 20 - settings.CHAT_HISTORY_KEEP_MESSAGES)
+
+        history_summary, history = get_prompt_history(self.conversation)
+        self.assertEqual(history_summary, "Earlier turns")
+        self.assertEqual(len(history), settings.CHAT_HISTORY_KEEP_MESSAGES)
+        self.assertTrue(history[-1]["content"].startswith("Answer 9"))
+
+    def test_prompt_stays_bounded_when_compaction_fails(self):
+        self.add_turns(10)
+
+        failure = {"success": False, "error": {"type": "ChatSummaryError", "message": "down"}}
+        with patch("app.usecases.note.conversation.summarize_conversation", return_value=failure):
+            self.assertFalse(compact_conversation(self.db, self.conversation))
+
+        _, history = get_prompt_history(self.conversation)
+        self.assertLessEqual(sum(len(message["content"]) for message in history) // 4, settings.CHAT_HISTORY_TOKENS)
+        self.assertTrue(history[-1]["content"].startswith("Answer 9"))
+
+    def test_deleting_note_deletes_conversations(self):
+        self.add_turns(1)
+
+        self.db.delete(self.note)
+        self.db.commit()
+        self.assertEqual(self.db.query(ChatConversation).count(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+from minio import S3Error
+from app.usecases.storage import direct_transfer
+from app.usecases.storage.direct_transfer import (
+    BUCKET_NAME,
+    confirm_presigned_upload,
+    create_presigned_upload,
+    presigned_download_url,
+)
+from app.usecases.storage.audio_store import MINIO_ENDPOINTS
+
+def missing_object() -> S3Error:
+    return S3Error(
+        response=MagicMock(), code="NoSuchKey", message="missing", resource="memo.m4a", request_id="request", host_id="host"
+    )
+
+class TestDirectTransfer(unittest.TestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        patcher = patch.object(direct_transfer, "redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_create_grants_upload_to_fresh_object(self):
+        with patch.object(direct_transfer.minio_client, "presigned_put_object", return_value="https://signed") as presign:
+            grant = create_presigned_upload(7, "memo.m4a")
+
+        object_name = presign.call_args.args[1]
+        self.assertTrue(object_name.startswith("memo_") and object_name.endswith(".m4a"))
+        self.assertEqual(grant["upload_url"], "https://signed")
+        self.redis.set.assert_called_once()
+        self.assertEqual(self.redis.set.call_args.args, (f"presigned_upload:{object_name}", 7))
+
+    def test_confirm_checks_owner_and_object(self):
+        self.redis.get.return_value = b"7"
+        stat = MagicMock(size=1234, content_type="audio/mp4")
+        with patch.object(direct_transfer.minio_client, "stat_object", return_value=stat):
+            result = confirm_presigned_upload(7, "memo_1_abc.m4a")
+
+        self.assertEqual(result, {"url": f"{MINIO_ENDPOINTS}/{BUCKET_NAME}/memo_1_abc.m4a", "size": 1234, "content_type": "audio/mp4"})
+        self.redis.delete.assert_called_once_with("presigned_upload:memo_1_abc.m4a")
+
+        with self.assertRaises(HTTPException) as raised:
+            confirm_presigned_upload(8, "memo_1_abc.m4a")
+        self.assertEqual(raised.exception.status_code, 404)
+
+    def test_confirm_before_upload_finished(self):
+        self.redis.get.return_value = b"7"
+        with patch.object(direct_transfer.minio_client, "stat_object", side_effect=missing_object()):
+            with self.assertRaises(HTTPException) as raised:
+                confirm_presigned_upload(7, "memo_1_abc.m4a")
+
+        self.assertEqual(raised.exception.status_code, 409)
+        self.redis.delete.assert_not_called()
+
+    def test_presigned_download_only_for_own_objects(self):
+        with patch.object(direct_transfer.minio_client, "presigned_get_object", return_value="https://signed-get") as presign:
+            self.assertEqual(presigned_download_url(f"{MINIO_ENDPOINTS}/{BUCKET_NAME}/memo.m4a"), "https://signed-get")
+            self.assertIsNone(presigned_download_url("https://www.youtube.com/watch?v=abc"))
+
+        presign.assert_called_once_with(BUCKET_NAME, "memo.m4a", expires=timedelta(seconds=direct_transfer.settings.PRESIGNED_DOWNLOAD_EXPIRY_SECONDS))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import json
+import unittest
+from app.commons.incremental_json import JsonStringFieldStream
+
+class TestJsonStringFieldStream(unittest.TestCase):
+    def stream(self, document: str, field: str, chunk_size: int) -> str:
+        parser = JsonStringFieldStream(field)
+        return "".join(parser.feed(document[i:i + chunk_size]) for i in range(0, len(document), chunk_size))
+
+    def test_extracts_field_across_any_chunking(self):
+        markdown = '# Title 📝\n\n## Part "one"\n- tab\there\n- back\\slash\n- été'
+        document = json.dumps({
+            "title": "markdown",
+            "content_category": "Test",
+            "emoji_representation": "📝",
+            "lang": "eng",
+            "markdown": markdown,
+        })
+        for chunk_size in (1, 2, 3, 7, len(document)):
+            self.assertEqual(self.stream(document, "markdown", chunk_size), markdown)
+
+    def test_ascii_escaped_unicode_and_surrogate_pairs(self):
+        document = json.dumps({"markdown": "café 😀 done"}, ensure_ascii=True)
+        self.assertEqual(self.stream(document, "markdown", 1), "café 😀 done")
+
+    def test_ignores_nested_fields_with_the_same_name(self):
+        document = json.dumps({"other": {"markdown": "nested"}, "list": ["markdown"], "markdown": "top"})
+        self.assertEqual(self.stream(document, "markdown", 4), "top")
+
+    def test_returns_nothing_before_the_field(self):
+        parser = JsonStringFieldStream("markdown")
+        self.assertEqual(parser.feed('{"title": "A", "mark'), "")
+        self.assertEqual(parser.feed('down": "Hel'), "Hel")
+        self.assertEqual(parser.feed('lo"}'), "lo")
+
+if __name__ == '__main__':
+    unittest.main()
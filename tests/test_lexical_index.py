@@ -0,0 +1,60 @@
+import json
+import unittest
+from app.commons.lexical_index import build_index, chunk_spans, search, tokenize, top_chunks
+
+TRANSCRIPT = (
+    "Photosynthesis turns light into chemical energy. Chlorophyll absorbs mostly red and blue light. "
+    "The Calvin cycle fixes carbon dioxide into sugar. "
+    "Mitochondria release that energy through cellular respiration. "
+    "Respiration consumes oxygen and produces carbon dioxide."
+)
+
+class TestLexicalIndex(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Hello, World! it's_42"), ["hello", "world", "it", "s", "42"])
+        self.assertEqual(tokenize("光合作用"), ["光", "合", "作", "用"])
+
+    def test_chunk_spans_cover_sentences_within_budget(self):
+        spans = chunk_spans(TRANSCRIPT, max_tokens=20)
+
+        self.assertTrue(len(spans) > 1)
+        for start, end in spans:
+            self.assertLessEqual(end - start, 80)
+        # Chunks are taken in order and only whitespace between them is dropped
+        self.assertEqual(" ".join(TRANSCRIPT[start:end] for start, end in spans), TRANSCRIPT)
+
+    def test_unpunctuated_text_is_cut_on_characters(self):
+        text = "a" * 250
+        spans = chunk_spans(text, max_tokens=25)
+
+        self.assertEqual(spans, [(0, 100), (100, 200), (200, 250)])
+
+    def test_search_ranks_matching_chunks(self):
+        index = build_index(TRANSCRIPT, max_tokens=15)
+
+        results = search(index, TRANSCRIPT, "What does chlorophyll absorb?", k=3)
+        best = TRANSCRIPT[slice(*index["spans"][results[0][0]])]
+        self.assertIn("Chlorophyll", best)
+        self.assertEqual(search(index, TRANSCRIPT, "unrelated question", k=3), [])
+
+    def test_top_chunks_keep_transcript_order(self):
+        index = build_index(TRANSCRIPT, max_tokens=15)
+
+        chunks = top_chunks(index, TRANSCRIPT, "carbon dioxide respiration", k=2)
+        self.assertEqual(len(chunks), 2)
+        self.assertLess(TRANSCRIPT.index(chunks[0]), TRANSCRIPT.index(chunks[1]))
+
+    def test_index_is_json_serializable(self):
+        index = build_index(TRANSCRIPT, max_tokens=15)
+
+        self.assertEqual(json.loads(json.dumps(index)), index)
+        self.assertEqual(build_index("", max_tokens=15)["spans"], [])
+
+    def test_stored_index_is_small(self):
+        transcript = " ".join([TRANSCRIPT] * 300)
+        index = build_index(transcript, max_tokens=200)
+
+        self.assertLess(len(json.dumps(index)), len(transcript) / 20)
+
+if __name__ == '__main__':
+    unittest.main()
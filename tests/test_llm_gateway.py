@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from replicate.exceptions import ReplicateError
+from app.config import settings
+from app.usecases.generation import llm_gateway
+from app.usecases.generation.llm_gateway import LLMDeadlineExceeded, backoff_delay, is_retryable
+
+class TestLLMGateway(unittest.TestCase):
+    def test_retryable_errors(self):
+        self.assertTrue(is_retryable(ReplicateError(status=429)))
+        self.assertTrue(is_retryable(ReplicateError(status=503)))
+        self.assertFalse(is_retryable(ReplicateError(status=400)))
+        self.assertFalse(is_retryable(ValueError("bad input")))
+
+    def test_backoff_is_jittered_and_capped(self):
+        for attempt in range(10):
+            delay = backoff_delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(settings.LLM_BACKOFF_MAX_SECONDS, settings.LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    def test_retries_rate_limits_until_success(self):
+        attempts = []
+
+        def call(remaining):
+            attempts.append(remaining)
+            if len(attempts) < 3:
+                raise ReplicateError(status=429)
+            return "ok"
+
+        with patch("app.usecases.generation.llm_gateway.time.sleep") as sleep:
+            self.assertEqual(llm_gateway._call_with_retries("test-model", 30, call), "ok")
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_does_not_retry_client_errors(self):
+        def call(remaining):
+            raise ReplicateError(status=400)
+
+        with patch("app.usecases.generation.llm_gateway.time.sleep") as sleep:
+            with self.assertRaises(ReplicateError):
+                llm_gateway._call_with_retries("test-model", 30, call)
+        sleep.assert_not_called()
+
+    def test_gives_up_after_max_retries(self):
+        calls = []
+
+        def call(remaining):
+            calls.append(remaining)
+            raise ReplicateError(status=503)
+
+        with patch("app.usecases.generation.llm_gateway.time.sleep"):
+            with self.assertRaises(ReplicateError):
+                llm_gateway._call_with_retries("test-model", 30, call)
+        self.assertEqual(len(calls), settings.LLM_MAX_RETRIES + 1)
+
+    def test_async_calls_respect_model_concurrency(self):
+        in_flight, peak = 0, 0
+
+        async def call(remaining):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return remaining
+
+        async def run():
+            return await asyncio.gather(*[llm_gateway._call_with_retries_async("limited-model", 30, call) for _ in range(10)])
+
+        with patch.dict(settings.LLM_MODEL_CONCURRENCY, {"limited-model": 4}):
+            asyncio.run(run())
+        self.assertEqual(peak, 4)
+
+    def test_waiting_for_a_slot_respects_the_deadline(self):
+        async def slow(remaining):
+            await asyncio.sleep(1)
+
+        async def run():
+            with patch.dict(settings.LLM_MODEL_CONCURRENCY, {"slow-model": 1}):
+                blocker = asyncio.create_task(llm_gateway._call_with_retries_async("slow-model", 5, slow))
+                await asyncio.sleep(0)
+                with self.assertRaises(LLMDeadlineExceeded):
+                    await llm_gateway._call_with_retries_async("slow-model", 0.05, slow)
+                blocker.cancel()
+
+        asyncio.run(run())
+
+if __name__ == '__main__':
+    unittest.main()
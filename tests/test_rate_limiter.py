@@ -0,0 +1,149 @@
+import asyncio
+import unittest
+import uuid
+from unittest.mock import patch
+from app.usecases.generation import llm_gateway, rate_limiter
+from app.usecases.generation.llm_gateway import LLMDeadlineExceeded
+from app.usecases.generation.rate_limiter import (
+    _reconcile_args,
+    notify_wait,
+    on_rate_limit_wait,
+    rate_limit_key,
+    reconcile,
+    try_acquire,
+    with_rate_limit_waits,
+)
+
+class TestRateLimiter(unittest.TestCase):
+    def test_waits_are_interleaved_with_events(self):
+        async def events():
+            yield {"type": "partial", "delta": "a"}
+            # Waits reported from worker threads reach the stream too
+            await asyncio.to_thread(notify_wait, "openai", "gpt-4o-mini", 2.5)
+            await asyncio.sleep(0)
+            yield {"type": "complete", "response": {"success": True}}
+
+        async def collect():
+            return [event async for event in with_rate_limit_waits(events())]
+
+        self.assertEqual(asyncio.run(collect()), [
+            {"type": "partial", "delta": "a"},
+            {"type": "rate_limited", "model": "gpt-4o-mini", "wait": 2.5},
+            {"type": "complete", "response": {"success": True}},
+        ])
+
+    def test_errors_are_raised_to_the_consumer(self):
+        async def events():
+            yield {"type": "partial", "delta": "a"}
+            raise ValueError("boom")
+
+        async def collect():
+            return [event async for event in with_rate_limit_waits(events())]
+
+        with self.assertRaises(ValueError):
+            asyncio.run(collect())
+
+    def test_calls_queue_until_budget_is_available(self):
+        waits = []
+        responses = iter([1.5, 0.5, 0])
+
+        with patch("app.usecases.generation.llm_gateway.try_acquire", side_effect=lambda *args: next(responses)), \
+                patch("app.usecases.generation.llm_gateway.time.sleep") as sleep, \
+                on_rate_limit_wait(lambda provider, model, seconds: waits.append((provider, model, seconds))):
+            self.assertEqual(llm_gateway._call_with_retries("gpt-4o-mini", 30, lambda remaining: "ok"), "ok")
+
+        self.assertEqual(sleep.call_count, 2)
+        # Only the first wait is reported
+        self.assertEqual(waits, [("openai", "gpt-4o-mini", 1.5)])
+
+    def test_waits_past_the_deadline_fail(self):
+        with patch("app.usecases.generation.llm_gateway.try_acquire", return_value=60):
+            with self.assertRaises(LLMDeadlineExceeded):
+                llm_gateway._call_with_retries("gpt-4o-mini", 5, lambda remaining: "ok")
+
+    def test_failed_calls_give_back_their_request(self):
+        limits = {"rpm": 60, "tpm": 1000}
+        self.assertEqual(_reconcile_args(limits, 300, 0, failed=True), [1000, 300, 60, 1])
+        self.assertEqual(_reconcile_args(limits, 300, 200, failed=False), [1000, 100, 60, 0])
+        self.assertIsNone(_reconcile_args(limits, 300, 300, failed=False))
+        self.assertEqual(_reconcile_args({"rpm": 60}, 300, 0, failed=True), [0, 0, 60, 1])
+        self.assertIsNone(_reconcile_args(None, 300, 0, failed=True))
+
+    def test_failed_call_settles_as_failed(self):
+        def call(remaining):
+            raise ValueError("bad input")
+
+        with patch("app.usecases.generation.llm_gateway.try_acquire", return_value=0), \
+                patch("app.usecases.generation.llm_gateway.reconcile") as reconcile:
+            with self.assertRaises(ValueError):
+                llm_gateway._call_with_retries("gpt-4o-mini", 30, call, tokens=300)
+
+        reconcile.assert_called_once_with("openai", "gpt-4o-mini", 300, 0, failed=True)
+
+class TestReplicateStreamRefund(unittest.TestCase):
+    def test_failed_start_gives_back_its_request(self):
+        async def consume():
+            return [event async for event in llm_gateway.replicate_stream_async("owner/model", {})]
+
+        with patch("app.usecases.generation.llm_gateway.try_acquire_async", return_value=0), \
+                patch("replicate.model.ModelsPredictions.async_create", side_effect=ValueError("bad input")), \
+                patch("app.usecases.generation.llm_gateway.reconcile_async") as reconcile:
+            with self.assertRaises(ValueError):
+                asyncio.run(consume())
+
+        reconcile.assert_awaited_once_with("replicate", "owner/model", 0, 0, failed=True)
+
+def redis_available() -> bool:
+    try:
+        return bool(rate_limiter.redis_client.ping())
+    except Exception:
+        return False
+
+@unittest.skipUnless(redis_available(), "needs the Redis server at REDIS_URL")
+class TestRateLimitScripts(unittest.TestCase):
+    """The bucket scripts themselves, run on Redis."""
+
+    def setUp(self):
+        self.model = f"test-{uuid.uuid4().hex}"
+        self.key = rate_limit_key("openai", self.model)
+        self.addCleanup(rate_limiter.redis_client.delete, self.key)
+
+    def limits(self, **limits):
+        return patch.dict(rate_limiter.settings.RATE_LIMITS, {f"openai:{self.model}": limits})
+
+    def test_over_limit_calls_wait_for_refill(self):
+        with self.limits(rpm=2):
+            self.assertEqual(try_acquire("openai", self.model, 0), 0)
+            self.assertEqual(try_acquire("openai", self.model, 0), 0)
+            wait = try_acquire("openai", self.model, 0)
+
+        # One request short at 2 per minute
+        self.assertGreater(wait, 29)
+        self.assertLessEqual(wait, 30)
+
+    def test_buckets_refill_over_time(self):
+        with self.limits(rpm=2):
+            try_acquire("openai", self.model, 0)
+            try_acquire("openai", self.model, 0)
+            # Thirty seconds later one request is back
+            seconds, _ = rate_limiter.redis_client.time()
+            rate_limiter.redis_client.hset(self.key, "ts", seconds - 30)
+            self.assertEqual(try_acquire("openai", self.model, 0), 0)
+            self.assertGreater(try_acquire("openai", self.model, 0), 0)
+
+    def test_failed_call_gives_back_request_and_tokens(self):
+        with self.limits(rpm=1, tpm=1000):
+            self.assertEqual(try_acquire("openai", self.model, 800), 0)
+            self.assertGreater(try_acquire("openai", self.model, 800), 0)
+            reconcile("openai", self.model, 800, 0, failed=True)
+            self.assertEqual(try_acquire("openai", self.model, 800), 0)
+
+    def test_unused_tokens_are_given_back(self):
+        with self.limits(tpm=1000):
+            self.assertEqual(try_acquire("openai", self.model, 800), 0)
+            self.assertGreater(try_acquire("openai", self.model, 800), 0)
+            reconcile("openai", self.model, 800, 100)
+            self.assertEqual(try_acquire("openai", self.model, 800), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from unittest.mock import patch
+from fastapi import HTTPException
+from app.usecases.storage import resumable_upload
+from app.usecases.storage.resumable_upload import BUCKET_NAME, abort_upload, complete_upload, get_upload_session
+
+MIB = 1024 * 1024
+SESSION = {"user_id": "7", "filename": "memo.m4a", "object_name": "memo_1_abc.m4a", "upload_id": "upload"}
+
+def part(number: int, size: int) -> dict:
+    return {"part_number": number, "etag": f"etag{number}", "size": size}
+
+class TestResumableUpload(unittest.TestCase):
+    def session(self, parts):
+        return patch.multiple(
+            resumable_upload,
+            _load_session=lambda session_id, user_id: SESSION,
+            _load_parts=lambda session_id: parts,
+            _forget=lambda session_id: None,
+        )
+
+    def test_reports_where_to_resume(self):
+        with self.session([part(1, 5 * MIB), part(2, 5 * MIB), part(4, MIB)]):
+            progress = get_upload_session("session", 7)
+
+        self.assertEqual(progress["next_part"], 3)
+        self.assertEqual(progress["offset"], 10 * MIB)
+        self.assertEqual(progress["received_bytes"], 11 * MIB)
+
+    def test_complete_assembles_parts_in_order(self):
+        with self.session([part(1, 5 * MIB), part(2, MIB)]), \
+                patch.object(resumable_upload.minio_client, "_complete_multipart_upload") as complete:
+            result = complete_upload("session", 7)
+
+        bucket, object_name, upload_id, parts = complete.call_args.args
+        self.assertEqual((bucket, object_name, upload_id), (BUCKET_NAME, "memo_1_abc.m4a", "upload"))
+        self.assertEqual([(p.part_number, p.etag) for p in parts], [(1, "etag1"), (2, "etag2")])
+        self.assertEqual(result["size"], 6 * MIB)
+        self.assertTrue(result["url"].endswith(f"/{BUCKET_NAME}/memo_1_abc.m4a"))
+
+    def test_complete_rejects_missing_parts(self):
+        with self.session([part(1, 5 * MIB), part(3, MIB)]), \
+                patch.object(resumable_upload.minio_client, "_complete_multipart_upload") as complete:
+            with self.assertRaises(HTTPException) as raised:
+                complete_upload("session", 7)
+
+        self.assertIn("[2]", raised.exception.detail)
+        complete.assert_not_called()
+
+    def test_complete_rejects_small_middle_parts(self):
+        with self.session([part(1, MIB), part(2, MIB)]):
+            with self.assertRaises(HTTPException) as raised:
+                complete_upload("session", 7)
+
+        self.assertIn("[1]", raised.exception.detail)
+
+    def test_abort_tolerates_finished_uploads(self):
+        class NoSuchUpload(Exception):
+            code = "NoSuchUpload"
+
+        with self.session([]), \
+                patch.object(resumable_upload.minio_client, "_abort_multipart_upload", side_effect=NoSuchUpload()) as abort, \
+                patch.object(resumable_upload, "_forget") as forget:
+            abort_upload("session", 7)
+
+        abort.assert_called_once_with(BUCKET_NAME, "memo_1_abc.m4a", "upload")
+        forget.assert_called_once_with("session")
+
+if __name__ == "__main__":
+    unittest.main()
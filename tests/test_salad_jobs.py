@@ -0,0 +1,166 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import threading
+import time
+import unittest
+import requests
+from unittest.mock import patch
+from app.usecases.generation import salad_jobs
+from app.usecases.generation.salad_jobs import poll_delays, verify_webhook_signature, wait_for_job
+
+SECRET = base64.b64encode(b"webhook secret").decode()
+
+def sign(webhook_id: str, timestamp: str, body: bytes) -> str:
+    digest = hmac.new(b"webhook secret", f"{webhook_id}.{timestamp}.".encode() + body, hashlib.sha256).digest()
+    return "v1," + base64.b64encode(digest).decode()
+
+class FakePubSub:
+    def __init__(self, client):
+        self.client = client
+
+    async def subscribe(self, channel):
+        pass
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        # Nothing is published while the wait lasts
+        await asyncio.sleep(timeout)
+        return None
+
+    async def reset(self):
+        pass
+
+class FakeAsyncRedis:
+    """Remembers whether the webhook flagged the job finished."""
+    done = False
+
+    @classmethod
+    def from_url(cls, url):
+        return cls()
+
+    def __init__(self):
+        self.connection_pool = self
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def exists(self, key):
+        return int(FakeAsyncRedis.done)
+
+    async def disconnect(self):
+        pass
+
+class TestSaladJobs(unittest.TestCase):
+    def setUp(self):
+        FakeAsyncRedis.done = False
+        patcher = patch.object(salad_jobs, "AsyncRedis", FakeAsyncRedis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_webhook_needs_a_secret(self):
+        with patch.object(salad_jobs.settings, "SALAD_WEBHOOK_URL", "https://api.example.com/webhooks/salad"), \
+                patch.object(salad_jobs.settings, "SALAD_WEBHOOK_SECRET", ""):
+            self.assertFalse(salad_jobs.webhook_enabled())
+        with patch.object(salad_jobs.settings, "SALAD_WEBHOOK_URL", "https://api.example.com/webhooks/salad"), \
+                patch.object(salad_jobs.settings, "SALAD_WEBHOOK_SECRET", SECRET):
+            self.assertTrue(salad_jobs.webhook_enabled())
+
+    def test_poll_delays_start_near_expected_time_and_back_off(self):
+        with patch.object(salad_jobs.settings, "SALAD_JOB_REALTIME_FACTOR", 0.1), \
+                patch.object(salad_jobs.settings, "SALAD_JOB_POLL_MIN_SECONDS", 2), \
+                patch.object(salad_jobs.settings, "SALAD_JOB_POLL_MAX_SECONDS", 30):
+            delays = poll_delays(100)
+            self.assertEqual([next(delays) for _ in range(4)], [10, 15, 22.5, 30])
+            self.assertEqual(next(poll_delays(5)), 2)
+            self.assertEqual(next(poll_delays(3600)), 30)
+
+    def test_verify_webhook_signature(self):
+        body = b'{"data": {"id": "job"}}'
+        now = str(int(time.time()))
+        self.assertTrue(verify_webhook_signature(SECRET, "msg", now, "v1,bogus " + sign("msg", now, body), body))
+        self.assertFalse(verify_webhook_signature(SECRET, "msg", now, sign("msg", now, body), b"{}"))
+        stale = str(int(time.time()) - 3600)
+        self.assertFalse(verify_webhook_signature(SECRET, "msg", stale, sign("msg", stale, body), body))
+
+    def test_polls_until_job_finishes(self):
+        statuses = iter(["pending", "running", "succeeded"])
+        with patch("app.usecases.generation.salad_jobs.poll_delays", return_value=iter([0, 0, 0, 0])), \
+                patch("app.usecases.generation.salad_jobs.get_job", side_effect=lambda job_id: {"id": job_id, "status": next(statuses)}) as get_job:
+            job = asyncio.run(wait_for_job("job", 60))
+
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(get_job.call_count, 3)
+
+    def test_webhook_wakes_wait_but_job_is_refetched(self):
+        FakeAsyncRedis.done = True
+        job = {"id": "job", "status": "succeeded", "output": {"text": "from the jobs API"}}
+        with patch("app.usecases.generation.salad_jobs.poll_delays", return_value=iter([60])), \
+                patch("app.usecases.generation.salad_jobs.get_job", return_value=job) as get_job:
+            result = asyncio.run(asyncio.wait_for(wait_for_job("job", 60), timeout=5))
+
+        self.assertEqual(result["output"]["text"], "from the jobs API")
+        get_job.assert_called_once_with("job")
+
+    def test_done_flag_only_skips_one_wait(self):
+        # The webhook arrived before the jobs API shows the job finished
+        FakeAsyncRedis.done = True
+        statuses = iter(["running", "running", "succeeded"])
+        with patch("app.usecases.generation.salad_jobs.poll_delays", return_value=iter([0.1] * 10)), \
+                patch("app.usecases.generation.salad_jobs.get_job", side_effect=lambda job_id: {"id": job_id, "status": next(statuses)}):
+            started = time.monotonic()
+            job = asyncio.run(wait_for_job("job", 60))
+
+        self.assertEqual(job["status"], "succeeded")
+        # Only the first poll is early, the others follow the schedule
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    def test_keeps_polling_through_salad_errors(self):
+        responses = iter([requests.ConnectionError("down"), {"id": "job", "status": "succeeded"}])
+
+        def get_job(job_id):
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        with patch("app.usecases.generation.salad_jobs.poll_delays", return_value=iter([0, 0])), \
+                patch("app.usecases.generation.salad_jobs.get_job", side_effect=get_job):
+            job = asyncio.run(wait_for_job("job", 60))
+
+        self.assertEqual(job["status"], "succeeded")
+
+    def test_polls_bypass_circuit_breaker(self):
+        with patch("app.usecases.generation.salad_jobs.requests.get") as get, \
+                patch("app.usecases.generation.salad_jobs.guarded_request") as guarded:
+            get.return_value.json.return_value = {"id": "job", "status": "running"}
+            salad_jobs.get_job("job")
+
+        guarded.assert_not_called()
+        get.assert_called_once()
+
+    def test_cancelled_wait_cancels_job(self):
+        cancelled = threading.Event()
+
+        async def wait():
+            salad_jobs.cancel_event.set(cancelled)
+            asyncio.get_running_loop().call_later(0.05, cancelled.set)
+            return await wait_for_job("job", 60)
+
+        with patch("app.usecases.generation.salad_jobs.poll_delays", return_value=iter([60])), \
+                patch("app.usecases.generation.salad_jobs.get_job") as get_job, \
+                patch("app.usecases.generation.salad_jobs.cancel_job") as cancel_job:
+            with self.assertRaises(salad_jobs.JobCanceledError):
+                asyncio.run(asyncio.wait_for(wait(), timeout=5))
+
+        cancel_job.assert_called_once_with("job")
+        get_job.assert_not_called()
+
+    def test_times_out(self):
+        with patch("app.usecases.generation.salad_jobs.poll_delays", return_value=iter([0.01] * 100)), \
+                patch("app.usecases.generation.salad_jobs.get_job", return_value={"id": "job", "status": "running"}):
+            with self.assertRaises(TimeoutError):
+                asyncio.run(wait_for_job("job", 60, timeout=0.05))
+
+if __name__ == "__main__":
+    unittest.main()
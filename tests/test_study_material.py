@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database.models import Base
+from app.database.schemas.note import NoteCreate
+from app.database.schemas.user import UserCreate
+from app.usecases.note.note import add_note
+from app.usecases.note.study_material import ensure_flashcards_async, study_material_etag
+from app.usecases.user.user import create_user
+
+FLASHCARDS = [{"question": "Q1", "answer": "A1"}]
+
+class TestStudyMaterial(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Session = sessionmaker(bind=self.engine)
+        self.db = Session()
+        Base.metadata.create_all(self.engine)
+
+        user = create_user(self.db, UserCreate(username="testuser", email="test@example.com", hashed_password="hashedpassword"))
+        self.note = add_note(
+            db=self.db,
+            user_id=user.id,
+            folder_id=None,
+            note_create=NoteCreate(title="Test Note", summary="Test Summary", transcript_text="Test Transcript", language="en")
+        )
+
+    def tearDown(self):
+        self.db.close()
+        Base.metadata.drop_all(self.engine)
+
+    def ensure_flashcards(self, regenerate: bool = False) -> AsyncMock:
+        generate = AsyncMock(return_value={"success": True, "data": {"flashcards": FLASHCARDS}, "error": None})
+        with patch("app.usecases.note.study_material.generate_flashcards_async", generate):
+            result = asyncio.run(ensure_flashcards_async(self.db, self.note, regenerate=regenerate))
+        self.assertEqual(result["data"]["flashcards"], FLASHCARDS)
+        return generate
+
+    def test_generates_once_then_reuses_stored_flashcards(self):
+        self.assertEqual(self.ensure_flashcards().await_count, 1)
+        self.assertIsNotNone(self.note.flashcards_source_hash)
+        self.assertEqual(self.ensure_flashcards().await_count, 0)
+
+    def test_regenerates_when_summary_changes(self):
+        self.ensure_flashcards()
+        self.note.summary = "Edited Summary"
+        self.db.commit()
+        self.assertEqual(self.ensure_flashcards().await_count, 1)
+
+    def test_regenerates_on_request(self):
+        self.ensure_flashcards()
+        self.assertEqual(self.ensure_flashcards(regenerate=True).await_count, 1)
+
+    def test_etag_follows_content(self):
+        self.assertEqual(study_material_etag(FLASHCARDS), study_material_etag([dict(FLASHCARDS[0])]))
+        self.assertNotEqual(study_material_etag(FLASHCARDS), study_material_etag([{"question": "Q2", "answer": "A1"}]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+from app.usecases.generation import summary_translation_generation
+from app.usecases.generation.summary_translation_generation import translate_transcript_events_async
+
+def translated(text: str) -> dict:
+    return {"success": True, "data": {"translated_text": text}, "error": None}
+
+class TestTranscriptTranslation(unittest.TestCase):
+    def translate(self, remembered, translate, consume):
+        redis = AsyncMock()
+        redis.mget.return_value = remembered
+        with patch("app.usecases.generation.summary_translation_generation.split_paragraph_segments", return_value=["one", "two"]), \
+                patch.object(summary_translation_generation, "async_redis_client", redis), \
+                patch("app.usecases.generation.summary_translation_generation.translate_summary_async", side_effect=translate):
+            result = asyncio.run(consume(translate_transcript_events_async("one\n\ntwo", "fr")))
+        return result, redis
+
+    def test_reuses_translation_memory(self):
+        async def translate(segment, lang):
+            return translated(segment.upper())
+
+        async def consume(events):
+            return [event async for event in events]
+
+        events, redis = self.translate([b"un", None], translate, consume)
+
+        self.assertEqual(events[-1]["response"]["data"]["translated_text"], "un\n\nTWO")
+        redis.set.assert_awaited_once()
+        self.assertEqual(redis.set.await_args.args[1], "TWO")
+
+    def test_closing_cancels_pending_segments(self):
+        cancelled = []
+
+        async def translate(segment, lang):
+            if segment == "one":
+                return translated("un")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(segment)
+                raise
+
+        async def consume(events):
+            # The client disconnects after the first segment is done
+            received = [await events.__anext__(), await events.__anext__()]
+            await events.aclose()
+            await asyncio.sleep(0)
+            return received
+
+        received, _ = self.translate([None, None], translate, consume)
+
+        self.assertEqual(received[-1], {"type": "progress", "completed": 1, "total": 2})
+        self.assertEqual(cancelled, ["two"])
+
+if __name__ == "__main__":
+    unittest.main()
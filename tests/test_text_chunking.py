@@ -0,0 +1,47 @@
+import unittest
+from app.commons.text_chunking import chunk_text, estimate_tokens, split_paragraph_segments, split_sentences
+
+class TestTextChunking(unittest.TestCase):
+    def test_split_sentences(self):
+        text = "First sentence. Second one!  Third?\nFourth"
+        self.assertEqual(split_sentences(text), ["First sentence.", "Second one!", "Third?", "Fourth"])
+
+    def test_chunks_respect_token_budget_and_sentence_boundaries(self):
+        sentences = [f"This is sentence number {i}." for i in range(200)]
+        chunks = chunk_text(" ".join(sentences), max_tokens=50)
+
+        self.assertTrue(len(chunks) > 1)
+        for chunk in chunks:
+            self.assertLessEqual(estimate_tokens(chunk), 51)
+            self.assertTrue(chunk.endswith("."))
+        # Nothing is lost or reordered
+        self.assertEqual(" ".join(chunks), " ".join(sentences))
+
+    def test_oversized_sentence_is_split_on_words(self):
+        text = " ".join(["word"] * 500)
+        chunks = chunk_text(text, max_tokens=25)
+
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        self.assertEqual(" ".join(chunks), text)
+
+    def test_text_without_spaces_is_split_on_characters(self):
+        text = "字" * 250
+        chunks = chunk_text(text, max_tokens=25)
+
+        self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 50])
+
+    def test_short_text_is_a_single_chunk(self):
+        self.assertEqual(chunk_text("Hello there. Bye.", max_tokens=1000), ["Hello there. Bye."])
+        self.assertEqual(chunk_text("", max_tokens=1000), [])
+
+    def test_paragraph_segments(self):
+        long_paragraph = " ".join(f"Sentence {i}." for i in range(100))
+        text = f"  First paragraph.\n\nSecond\nparagraph.\n \n\n{long_paragraph}"
+        segments = split_paragraph_segments(text, max_tokens=50)
+
+        self.assertEqual(segments[:2], ["First paragraph.", "Second\nparagraph."])
+        self.assertTrue(len(segments) > 3)
+        self.assertEqual(" ".join(segments[2:]), long_paragraph)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from unittest.mock import patch
+from app.usecases.generation import transcript_cache
+from app.usecases.generation.transcript_cache import lookup_audio_hash, remember_audio_hash
+from app.usecases.storage.audio_store import public_object_url
+
+class TestAudioHashes(unittest.TestCase):
+    def test_own_objects_are_remembered(self):
+        url = public_object_url("lecture_1700000000_abcd1234.mp3")
+        with patch.object(transcript_cache, "redis_client") as redis:
+            redis.get.return_value = b"deadbeef"
+            remember_audio_hash(url, "deadbeef")
+            self.assertEqual(lookup_audio_hash(url), "deadbeef")
+
+        redis.set.assert_called_once()
+
+    def test_external_urls_are_never_remembered(self):
+        # The bytes behind an external URL can change, so its hash can't be reused
+        with patch.object(transcript_cache, "redis_client") as redis:
+            redis.get.return_value = b"deadbeef"
+            remember_audio_hash("https://podcasts.example.com/latest.mp3", "deadbeef")
+            self.assertIsNone(lookup_audio_hash("https://podcasts.example.com/latest.mp3"))
+
+        redis.set.assert_not_called()
+        redis.get.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import contextvars
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from app.usecases.generation import salad_jobs, transcription_router
+from app.usecases.generation.transcription_router import rank_backends, transcribe_routed
+
+def transcript(text: str, cached: bool = False) -> dict:
+    data = {"transcript": text}
+    if cached:
+        data["cached"] = True
+    return {"success": True, "data": data, "error": None}
+
+FAILURE = {"success": False, "error": {"type": "TranscriptionError", "message": "down"}}
+
+def stats(p50=None, p95=None, error_rate=0.0, samples=0) -> dict:
+    return {"p50": p50, "p95": p95, "error_rate": error_rate, "samples": samples}
+
+class TestTranscriptionRouter(unittest.TestCase):
+    def setUp(self):
+        self.recorded = []
+        # Patched for the whole test: losing hedged calls finish after transcribe_routed returns
+        patcher = patch("app.usecases.generation.transcription_router.record_call", side_effect=lambda *args: self.recorded.append(args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, backends: dict, backend_stats: dict, **kwargs):
+        with patch.dict(transcription_router.BACKENDS, {"test": backends}), \
+                patch("app.usecases.generation.transcription_router.get_backend_stats", side_effect=backend_stats.get):
+            response = transcribe_routed("url", "test", **kwargs)
+        return response, self.recorded
+
+    def test_ranks_healthy_backends_by_p50(self):
+        backend_stats = {
+            "slow": stats(p50=20, p95=40, samples=50),
+            "fast": stats(p50=5, p95=10, samples=50),
+            "broken": stats(p50=1, p95=2, error_rate=0.9, samples=50),
+        }
+        with patch.dict(transcription_router.BACKENDS, {"test": dict.fromkeys(backend_stats)}), \
+                patch("app.usecases.generation.transcription_router.get_backend_stats", side_effect=backend_stats.get), \
+                patch("app.usecases.generation.transcription_router._claim_probe", return_value=False):
+            self.assertEqual([backend for backend, _ in rank_backends("test")], ["fast", "slow", "broken"])
+
+    def test_unhealthy_backend_is_probed_first(self):
+        backend_stats = {"fast": stats(p50=5, p95=10, samples=50), "broken": stats(p50=1, p95=2, error_rate=0.9, samples=50)}
+        with patch.dict(transcription_router.BACKENDS, {"test": dict.fromkeys(backend_stats)}), \
+                patch("app.usecases.generation.transcription_router.get_backend_stats", side_effect=backend_stats.get), \
+                patch("app.usecases.generation.transcription_router._claim_probe", return_value=True) as claim:
+            ranked = rank_backends("test")
+
+        self.assertEqual([backend for backend, _ in ranked], ["broken", "fast"])
+        self.assertTrue(ranked[0][1]["probe"])
+        claim.assert_called_once_with("broken")
+
+    def test_successful_probe_resets_error_history(self):
+        with patch("app.usecases.generation.transcription_router.reset_outcomes") as reset, \
+                patch("app.usecases.generation.transcription_router._claim_probe", return_value=True):
+            response, recorded = self.route(
+                {"broken": lambda url: transcript("hello")},
+                {"broken": stats(p50=1, p95=2, error_rate=0.9, samples=50)},
+                hedge=False,
+            )
+
+        self.assertEqual(response["data"]["backend"], "broken")
+        reset.assert_called_once_with("broken")
+        self.assertEqual([(backend, success) for backend, _, success in recorded], [("broken", True)])
+
+    def test_calls_run_in_callers_context(self):
+        request_id = contextvars.ContextVar("request_id", default=None)
+        request_id.set("abc")
+        response, _ = self.route({"only": lambda url: transcript(request_id.get())}, {"only": stats()}, hedge=False)
+
+        self.assertEqual(response["data"]["transcript"], "abc")
+
+    def test_ranks_backends_with_open_circuit_last(self):
+        backend_stats = {"salad": stats(p50=5, p95=10, samples=50), "whisper": stats(p50=20, p95=40, samples=50)}
+        with patch.dict(transcription_router.BACKENDS, {"test": dict.fromkeys(backend_stats)}), \
+                patch("app.usecases.generation.transcription_router.get_backend_stats", side_effect=backend_stats.get), \
+                patch("app.usecases.generation.transcription_router.is_open", return_value=True):
+            self.assertEqual([backend for backend, _ in rank_backends("test")], ["whisper", "salad"])
+
+    def test_fails_over_to_next_backend(self):
+        response, recorded = self.route(
+            {"first": lambda url: FAILURE, "second": lambda url: transcript("hello")},
+            {"first": stats(), "second": stats()},
+            hedge=False,
+        )
+
+        self.assertEqual(response["data"], {"transcript": "hello", "backend": "second"})
+        self.assertEqual([(backend, success) for backend, _, success in recorded], [("first", False), ("second", True)])
+
+    def test_hedges_slow_backend(self):
+        released = threading.Event()
+
+        def slow(url):
+            released.wait(1)
+            return transcript("slow")
+
+        with patch.object(transcription_router.settings, "TRANSCRIPTION_HEDGE_MIN_SECONDS", 0.05):
+            response, _ = self.route(
+                {"primary": slow, "secondary": lambda url: transcript("fast")},
+                {"primary": stats(p50=0.01, p95=0.05, samples=50), "secondary": stats(p50=1, p95=2, samples=50)},
+                hedge=True,
+            )
+
+        self.assertEqual(response["data"]["backend"], "secondary")
+        released.set()
+        time.sleep(0.05)
+        self.assertEqual(sorted(backend for backend, _, _ in self.recorded), ["primary", "secondary"])
+
+    def test_hedge_loser_is_cancelled(self):
+        stopped = threading.Event()
+
+        def slow(url):
+            # Like a Salad job wait: runs until told its result is no longer needed
+            if salad_jobs.cancel_event.get().wait(1):
+                stopped.set()
+            return FAILURE
+
+        with patch.object(transcription_router.settings, "TRANSCRIPTION_HEDGE_MIN_SECONDS", 0.05):
+            response, _ = self.route(
+                {"primary": slow, "secondary": lambda url: transcript("fast")},
+                {"primary": stats(p50=0.01, p95=0.05, samples=50), "secondary": stats(p50=1, p95=2, samples=50)},
+                hedge=True,
+            )
+
+        self.assertEqual(response["data"]["backend"], "secondary")
+        self.assertTrue(stopped.wait(1))
+        time.sleep(0.05)
+        # The cancelled call's failure isn't held against its backend
+        self.assertEqual([backend for backend, _, _ in self.recorded], ["secondary"])
+
+    def test_running_losers_do_not_hold_up_other_requests(self):
+        released = threading.Event()
+
+        def stuck(url):
+            released.wait(2)
+            return transcript("late")
+
+        with patch.object(transcription_router.settings, "TRANSCRIPTION_HEDGE_MIN_SECONDS", 0.01):
+            for _ in range(10):
+                self.route(
+                    {"primary": stuck, "secondary": lambda url: transcript("fast")},
+                    {"primary": stats(p50=0.001, p95=0.01, samples=50), "secondary": stats(p50=1, p95=2, samples=50)},
+                    hedge=True,
+                )
+            started = time.monotonic()
+            response, _ = self.route({"only": lambda url: transcript("hello")}, {"only": stats()}, hedge=False)
+
+        self.assertEqual(response["data"]["transcript"], "hello")
+        self.assertLess(time.monotonic() - started, 0.5)
+        released.set()
+        time.sleep(0.05)
+
+    def test_cache_hits_are_not_recorded(self):
+        response, recorded = self.route({"only": lambda url: transcript("hello", cached=True)}, {"only": stats()})
+
+        self.assertTrue(response["success"])
+        self.assertEqual(recorded, [])
+
+if __name__ == '__main__':
+    unittest.main()